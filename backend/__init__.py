@@ -3,9 +3,20 @@ Backend package for the Library Management System.
 
 This module exposes helper functions to make it easier for the Streamlit
 frontend to import backend utilities without worrying about package paths.
+
+Submodules load on first access (``backend.services``) rather than with the
+package, so importing one light helper does not pull in the whole service
+layer and its dependencies.
 """
 
-from . import services  # noqa: F401
+from __future__ import annotations
+
+import importlib
 
 __all__ = ["services"]
 
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
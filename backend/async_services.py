@@ -0,0 +1,272 @@
+"""
+Async counterparts of :mod:`backend.services` for the FastAPI event loop.
+
+Each function mirrors the sync service of the same name and shares its
+validation and result shaping, but awaits the async repository instead of
+blocking a worker thread on the database round trip.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import config, overdue, search
+from .cache import catalog_cache
+from .coalesce import reads
+from .events import MAX_EVENTS
+from .pagination import page_options
+from .services import (
+    BOOK_SORT_KEY,
+    HOLD_SORT_KEY,
+    OVERDUE_SORT_KEY,
+    RECORD_SORT_KEY,
+    STATS_SORT_KEY,
+    STUDENT_SORT_KEY,
+    _batch_result,
+    _book_payload,
+    _hold_filters,
+    _invalidate_book,
+    _invalidate_students,
+    _list_key,
+    _loan_result,
+    _overdue_options,
+    _use_search_index,
+)
+from .storage import get_async_repository, get_repository
+
+
+async def _single(table: str, column: str, value: Any) -> Optional[Dict[str, Any]]:
+    data = await get_async_repository().select(table, filters={column: value}, limit=1)
+    return data[0] if data else None
+
+
+async def _cached_read(key: tuple, loader) -> Any:
+    return await catalog_cache.read_through_async(key, lambda: reads.do_async(key, loader))
+
+
+# ------------------------- BOOK SERVICES ------------------------- #
+async def get_book(book_id: int) -> Optional[Dict[str, Any]]:
+    return await _cached_read(("book", book_id), lambda: _single("books", "id", book_id))
+
+
+async def get_books(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    options = page_options(BOOK_SORT_KEY, after, limit, fields)
+    return await _cached_read(
+        _list_key("books", after, limit, fields),
+        lambda: get_async_repository().select("books", order=BOOK_SORT_KEY, **options),
+    )
+
+
+async def add_book(
+    title: str, author: str, isbn: Optional[str], total_copies: int
+) -> Dict[str, Any]:
+    payload = _book_payload(title, author, isbn, total_copies)
+    data = await get_async_repository().insert("books", payload)
+    _invalidate_book(None)
+    if data:
+        search.index_book(data[0])
+    return data[0] if data else {}
+
+
+async def update_book(book_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    updated = await get_async_repository().update("books", data, {"id": book_id})
+    # Copies put back on the shelf may have been issued to waiting holds.
+    reads.forget("borrow_records", "loans")
+    _invalidate_book(book_id)
+    if updated:
+        search.index_book(updated[0])
+    return updated[0] if updated else {}
+
+
+async def search_books(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    if not query.strip():
+        return []
+    repository = get_async_repository()
+    hits = await repository.search_books(query, limit)
+    if not _use_search_index(repository.sync, hits):
+        return hits
+    # The first fallback search loads the catalog; keep that off the loop.
+    index = await asyncio.to_thread(search.get_index, get_repository())
+    book_ids = index.search(query, limit)
+    books = await asyncio.gather(*(get_book(book_id) for book_id in book_ids))
+    return [book for book in books if book]
+
+
+# ------------------------ STUDENT SERVICES ----------------------- #
+async def get_student(student_id: int) -> Optional[Dict[str, Any]]:
+    return await _cached_read(
+        ("student", student_id), lambda: _single("students", "id", student_id)
+    )
+
+
+async def get_students(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    options = page_options(STUDENT_SORT_KEY, after, limit, fields)
+    return await _cached_read(
+        _list_key("students", after, limit, fields),
+        lambda: get_async_repository().select("students", order=STUDENT_SORT_KEY, **options),
+    )
+
+
+async def add_student(name: str, email: str) -> Dict[str, Any]:
+    payload = {"name": name, "email": email}
+    data = await get_async_repository().insert("students", payload)
+    _invalidate_students()
+    return data[0] if data else {}
+
+
+# --------------------- BORROW RECORD SERVICES -------------------- #
+async def get_borrow_record(record_id: int) -> Optional[Dict[str, Any]]:
+    return await _single("borrow_records", "id", record_id)
+
+
+async def list_borrow_records(
+    status: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    filters = {"status": status} if status else None
+    options = page_options(RECORD_SORT_KEY, after, limit, fields)
+    return await reads.do_async(
+        _list_key("borrow_records", after, limit, fields) + (status,),
+        lambda: get_async_repository().select(
+            "borrow_records", filters=filters, order=RECORD_SORT_KEY, desc=True, **options
+        ),
+    )
+
+
+async def list_loans(
+    status: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    filters = {"status": status} if status else None
+    options = page_options(RECORD_SORT_KEY, after, limit, fields)
+    return await reads.do_async(
+        _list_key("loans", after, limit, fields) + (status,),
+        lambda: get_async_repository().select(
+            "loan_details", filters=filters, order=RECORD_SORT_KEY, desc=True, **options
+        ),
+    )
+
+
+async def list_overdue(
+    status: Optional[str] = "overdue",
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    filters = {"status": status} if status else None
+    rows = await get_async_repository().select(
+        "overdue_details",
+        filters=filters,
+        order=OVERDUE_SORT_KEY,
+        **_overdue_options(after, limit, fields),
+    )
+    return overdue.apply_fines(rows)
+
+
+async def refresh_overdue() -> Dict[str, Any]:
+    return await get_async_repository().refresh_overdue(
+        overdue.overdue_cutoff(), config.LOAN_PERIOD_DAYS
+    )
+
+
+async def borrow_book(student_id: int, book_id: int) -> Dict[str, Any]:
+    result = await get_async_repository().borrow_book(
+        student_id, book_id, str(date.today())
+    )
+    return _loan_result(result, "Book borrowed successfully.")
+
+
+async def return_book(record_id: int) -> Dict[str, Any]:
+    result = await get_async_repository().return_book(record_id, str(date.today()))
+    return _loan_result(result, "Book returned successfully.")
+
+
+async def place_hold(student_id: int, book_id: int) -> Dict[str, Any]:
+    return await get_async_repository().place_hold(student_id, book_id)
+
+
+async def get_hold(hold_id: int) -> Optional[Dict[str, Any]]:
+    return await _single("hold_details", "id", hold_id)
+
+
+async def list_holds(
+    book_id: int,
+    status: Optional[str] = "waiting",
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    options = page_options(HOLD_SORT_KEY, after, limit, fields)
+    return await get_async_repository().select(
+        "hold_details", filters=_hold_filters(book_id, status), order=HOLD_SORT_KEY, **options
+    )
+
+
+async def borrow_books(student_id: int, book_ids: Sequence[int]) -> Dict[str, Any]:
+    result = await get_async_repository().borrow_books(
+        student_id, list(book_ids), str(date.today())
+    )
+    return _batch_result(result)
+
+
+async def return_books(record_ids: Sequence[int]) -> Dict[str, Any]:
+    result = await get_async_repository().return_books(list(record_ids), str(date.today()))
+    return _batch_result(result)
+
+
+# ---------------------- CIRCULATION SERVICES --------------------- #
+async def top_books(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    options = page_options(STATS_SORT_KEY, after, limit, fields)
+    return await get_async_repository().select(
+        "book_circulation", order=STATS_SORT_KEY, desc=True, **options
+    )
+
+
+async def top_students(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    options = page_options(STATS_SORT_KEY, after, limit, fields)
+    return await get_async_repository().select(
+        "student_circulation", order=STATS_SORT_KEY, desc=True, **options
+    )
+
+
+async def rebuild_circulation_stats() -> Dict[str, int]:
+    return await get_async_repository().rebuild_circulation_stats()
+
+
+# ------------------------ EVENT SERVICES ------------------------ #
+async def list_events(since: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    return await get_async_repository().list_events(since, min(limit, MAX_EVENTS))
+
+
+# ----------------------- DASHBOARD SERVICES ---------------------- #
+async def dashboard_summary(
+    inventory_limit: int = 10, top_limit: int = 5, recent_limit: int = 15
+) -> Dict[str, Any]:
+    return await reads.do_async(
+        ("dashboard", inventory_limit, top_limit, recent_limit),
+        lambda: get_async_repository().dashboard_summary(
+            inventory_limit, top_limit, recent_limit
+        ),
+    )
@@ -27,3 +27,8 @@ def sign_out(access_token: str | None = None) -> None:
     client = get_client()
     client.auth.sign_out(access_token)
 
+
+def refresh_session(refresh_token: str) -> Dict[str, Any]:
+    client = get_client()
+    response = client.auth.refresh_session(refresh_token)
+    return response.__dict__
@@ -0,0 +1,216 @@
+"""
+Streaming bulk import of books and students from CSV or JSONL.
+
+Rows are read lazily, validated one at a time with the models in
+:mod:`backend.models`, and written in batches through a single multi-row
+upsert per batch (books keyed on ISBN, students on email). Invalid rows are
+reported with their line number and never abort the rest of the file.
+
+Command line usage::
+
+    python -m backend.bulk_import books catalog.csv
+    python -m backend.bulk_import students roster.jsonl --batch-size 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from . import search
+from .cache import catalog_cache, relay
+from .coalesce import reads
+from .events import changes
+from .models import BookCreate, StudentCreate
+from .storage import StorageError, get_repository
+
+FORMATS = ("csv", "jsonl")
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    upserted: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def fail(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def detect_format(name: str) -> str:
+    """Guess the input format from a file name or content type."""
+    lowered = name.lower()
+    if lowered.endswith((".jsonl", ".ndjson")) or "ndjson" in lowered or "jsonl" in lowered:
+        return "jsonl"
+    return "csv"
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(line number, raw record)`` pairs from CSV or JSONL text."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}. Expected one of: {', '.join(FORMATS)}.")
+
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, exc
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def _clean(raw: Dict[str, Any]) -> Dict[str, Any]:
+    # CSV has no null, so blank cells stand in for missing optional values.
+    return {
+        key.strip(): (value.strip() or None) if isinstance(value, str) else value
+        for key, value in raw.items()
+        if key
+    }
+
+
+def _run(
+    lines: Iterable[str],
+    fmt: str,
+    model: Type[BaseModel],
+    key: str,
+    write: Callable[[List[Dict[str, Any]]], int],
+    batch_size: int,
+) -> ImportReport:
+    report = ImportReport()
+    batch: Dict[Any, Tuple[int, Dict[str, Any]]] = {}
+    unkeyed: List[Tuple[int, Dict[str, Any]]] = []
+
+    def flush() -> None:
+        rows = list(batch.values()) + unkeyed
+        batch.clear()
+        unkeyed.clear()
+        if not rows:
+            return
+        try:
+            report.upserted += write([row for _, row in rows])
+            return
+        except StorageError:
+            pass
+        # The batch was rejected as a whole; replay it row by row so only the
+        # offending rows are reported.
+        for line_no, row in rows:
+            try:
+                report.upserted += write([row])
+            except StorageError as exc:
+                report.fail(line_no, str(exc))
+
+    for line_no, raw in iter_records(lines, fmt):
+        report.processed += 1
+        if isinstance(raw, Exception):
+            report.fail(line_no, f"Invalid JSON: {raw}")
+            continue
+        if not isinstance(raw, dict):
+            report.fail(line_no, "Expected an object per line.")
+            continue
+        try:
+            row = model(**_clean(raw)).model_dump()
+        except ValidationError as exc:
+            report.fail(line_no, _describe(exc))
+            continue
+
+        # A key repeated inside one batch would hit the same row twice in a
+        # single statement; the later line wins, as it would across batches.
+        if row.get(key) is None:
+            unkeyed.append((line_no, row))
+        else:
+            batch[row[key]] = (line_no, row)
+        if len(batch) + len(unkeyed) >= batch_size:
+            flush()
+
+    flush()
+    return report
+
+
+def import_books(
+    lines: Iterable[str], fmt: str = "csv", batch_size: int = DEFAULT_BATCH_SIZE
+) -> Dict[str, Any]:
+    """Upsert books from CSV/JSONL lines. Columns: title, author, isbn, total_copies."""
+    report = _run(
+        lines, fmt, BookCreate, "isbn", get_repository().upsert_books, batch_size
+    )
+    catalog_cache.invalidate_namespace("book")
+    catalog_cache.invalidate_namespace("books")
+    reads.forget("book", "books", "dashboard", "borrow_records", "loans")
+    relay.record(namespaces=["book", "books"])
+    search.reset_index()
+    changes.notify()
+    return report.as_dict()
+
+
+def import_students(
+    lines: Iterable[str], fmt: str = "csv", batch_size: int = DEFAULT_BATCH_SIZE
+) -> Dict[str, Any]:
+    """Upsert students from CSV/JSONL lines. Columns: name, email."""
+    report = _run(
+        lines, fmt, StudentCreate, "email", get_repository().upsert_students, batch_size
+    )
+    catalog_cache.invalidate_namespace("student")
+    catalog_cache.invalidate_namespace("students")
+    reads.forget("student", "students", "dashboard")
+    relay.record(namespaces=["student", "students"])
+    changes.notify()
+    return report.as_dict()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import books or students.")
+    parser.add_argument("kind", choices=("books", "students"))
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    importer = import_books if args.kind == "books" else import_students
+    fmt = args.format or detect_format(args.path.name)
+    with args.path.open(newline="", encoding="utf-8") as handle:
+        report = importer(handle, fmt, args.batch_size)
+
+    print(
+        f"processed={report['processed']} upserted={report['upserted']} "
+        f"failed={report['failed']}"
+    )
+    for error in report["errors"]:
+        print(f"  line {error['line']}: {error['error']}", file=sys.stderr)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+In-process read-through cache for catalog and student lookups.
+
+Entries expire after a fixed TTL and the least recently used entry is evicted
+once the cache is full. Keys are tuples whose first element is a namespace
+(``"book"``, ``"books"``, ...) so writes can drop every entry a change might
+affect in one call. Each invalidation also bumps a generation counter, and a
+read-through load that overlapped one is returned but not cached, so a row
+read before a write cannot outlive it. Cached values are shared between
+callers and must be treated as read-only.
+
+Each worker process has its own cache. With a shared ``STATE_BACKEND``,
+:data:`relay` passes the invalidations made by one worker's writes on to the
+others every ``STATE_POLL_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from . import config, shared_state
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache"
+RELAY_BATCH = 1000
+
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe TTL + LRU cache with hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        self._namespaces: Dict[Hashable, Set[Tuple[Hashable, ...]]] = {}
+        # Bumped by invalidate() per key, invalidate_namespace() per namespace
+        # and clear() for everything.
+        self._key_generations: Dict[Tuple[Hashable, ...], int] = {}
+        self._namespace_generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Any:
+        """Return the cached value for ``key`` or :data:`MISSING`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return MISSING
+
+    def generation(self, key: Tuple[Hashable, ...]) -> Tuple[int, int, int]:
+        """Changes whenever ``key`` is invalidated; pass it back to :meth:`set`."""
+        with self._lock:
+            return self._generation(key)
+
+    def set(
+        self,
+        key: Tuple[Hashable, ...],
+        value: Any,
+        generation: Optional[Tuple[int, int, int]] = None,
+    ) -> None:
+        """Cache ``value``, unless ``key`` was invalidated since ``generation``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation(key):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._namespaces.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def read_through(self, key: Tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        """Return the cached value or call ``loader`` and cache its result.
+
+        ``None`` results are not cached so a later insert is visible at once.
+        """
+        value = self.get(key)
+        if value is MISSING:
+            generation = self.generation(key)
+            value = loader()
+            if value is not None:
+                self.set(key, value, generation)
+        return value
+
+    async def read_through_async(
+        self, key: Tuple[Hashable, ...], loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = self.get(key)
+        if value is MISSING:
+            generation = self.generation(key)
+            value = await loader()
+            if value is not None:
+                self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key: Tuple[Hashable, ...]) -> None:
+        with self._lock:
+            self._key_generations[key] = self._key_generations.get(key, 0) + 1
+            if key in self._entries:
+                self._discard(key)
+                self.invalidations += 1
+
+    def invalidate_namespace(self, namespace: Hashable) -> None:
+        with self._lock:
+            self._namespace_generations[namespace] = (
+                self._namespace_generations.get(namespace, 0) + 1
+            )
+            for key in list(self._namespaces.get(namespace, ())):
+                self._discard(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._namespaces.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _generation(self, key: Tuple[Hashable, ...]) -> Tuple[int, int, int]:
+        return (
+            self._epoch,
+            self._namespace_generations.get(key[0], 0),
+            self._key_generations.get(key, 0),
+        )
+
+    def _discard(self, key: Tuple[Hashable, ...]) -> None:
+        del self._entries[key]
+        keys = self._namespaces.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespaces[key[0]]
+
+
+catalog_cache = TTLCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS)
+
+
+class InvalidationRelay:
+    """Publish this worker's cache invalidations and apply everyone else's.
+
+    :meth:`record` only queues (writes never wait on the shared state); the
+    :meth:`run` loop publishes the queue and reads the other workers'
+    messages. Nothing is queued while the loop is not running.
+    """
+
+    def __init__(self, cache: TTLCache) -> None:
+        self.cache = cache
+        self.running = False
+        self._keys: Set[Tuple[Hashable, ...]] = set()
+        self._namespaces: Set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def record(
+        self, keys: Iterable[Tuple[Hashable, ...]] = (), namespaces: Iterable[Hashable] = ()
+    ) -> None:
+        if not self.running:
+            return
+        with self._lock:
+            self._keys.update(keys)
+            self._namespaces.update(namespaces)
+
+    async def run(self, state: shared_state.SharedState, interval: float) -> None:
+        self.running = True
+        try:
+            last = await asyncio.to_thread(state.last_id, INVALIDATION_CHANNEL)
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    last = await asyncio.to_thread(self._exchange, state, last)
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("Cache invalidation relay failed")
+        finally:
+            self.running = False
+
+    def _exchange(self, state: shared_state.SharedState, last: int) -> int:
+        with self._lock:
+            keys: List[List[Hashable]] = [list(key) for key in self._keys]
+            namespaces = list(self._namespaces)
+            self._keys.clear()
+            self._namespaces.clear()
+        if keys or namespaces:
+            state.publish(
+                INVALIDATION_CHANNEL,
+                {"origin": shared_state.OWNER, "keys": keys, "namespaces": namespaces},
+            )
+        while True:
+            messages = state.read(INVALIDATION_CHANNEL, last, RELAY_BATCH)
+            for message_id, message in messages:
+                last = message_id
+                if message.get("origin") == shared_state.OWNER:
+                    continue
+                for key in message.get("keys", ()):
+                    self.cache.invalidate(tuple(key))
+                for namespace in message.get("namespaces", ()):
+                    self.cache.invalidate_namespace(namespace)
+            if len(messages) < RELAY_BATCH:
+                return last
+
+
+relay = InvalidationRelay(catalog_cache)
@@ -0,0 +1,36 @@
+"""
+Materialized circulation statistics.
+
+``book_stats`` and ``student_stats`` hold total borrows, active loans and the
+last borrow date per book and per student. The storage layer keeps them
+current inside each borrow and return transaction, so "top borrowed" and
+"most active students" are an index scan over titles or students instead of
+an aggregate over every loan ever made. :func:`rebuild` recomputes them from
+``borrow_records`` after manual edits or a restore.
+
+Command line usage::
+
+    python -m backend.circulation
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Dict
+
+from .storage import get_repository
+
+
+def rebuild() -> Dict[str, int]:
+    """Recompute every counter from borrow history in one transaction."""
+    return get_repository().rebuild_circulation_stats()
+
+
+def main() -> int:
+    result = rebuild()
+    print(f"book_stats={result['book_stats']} student_stats={result['student_stats']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
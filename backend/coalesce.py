@@ -0,0 +1,126 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+When many callers ask for the same page at the same moment (a burst of
+dashboard refreshes, say), only the first one queries the database; the rest
+wait for that query and share its result. Nothing is kept once the query
+finishes, so this complements the TTL cache in :mod:`backend.cache` rather
+than replacing it: the cache absorbs repeats over time, single-flight absorbs
+the stampede on a miss.
+
+Shared results are handed to every waiter and must be treated as read-only.
+Writes call :meth:`SingleFlight.forget` for the namespaces they touch, so a
+caller arriving after a write starts a fresh query instead of joining one
+that began before it. ``COALESCE_READS=false`` turns coalescing off.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from . import config, metrics
+
+CALLS = metrics.Counter(
+    "lms_coalesced_calls_total",
+    "Coalesced reads by operation; role=leader ran the query, role=follower shared it.",
+)
+metrics.REGISTRY.append(CALLS)
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run at most one loader per key at a time; concurrent callers share it."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        """Blocking variant for the sync services (Streamlit, scripts, threads)."""
+        if not self.enabled:
+            return loader()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        _count(key, leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                # forget() may already have detached this call.
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.value
+
+    async def do_async(
+        self, key: Tuple[Hashable, ...], loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Event-loop variant for :mod:`backend.async_services`.
+
+        The query runs as its own task, so a caller that is cancelled (client
+        disconnect) does not cancel it for the others still waiting.
+        """
+        if not self.enabled:
+            return await loader()
+        slot = (id(asyncio.get_running_loop()), key)
+        # forget() may run on a worker thread, so the loop takes the lock too.
+        with self._lock:
+            task = self._tasks.get(slot)
+            leader = task is None
+            if leader:
+                task = self._tasks[slot] = asyncio.ensure_future(loader())
+        if leader:
+            task.add_done_callback(lambda done: self._finished(slot, done))
+        _count(key, leader)
+        return await asyncio.shield(task)
+
+    def forget(self, *namespaces: Hashable) -> None:
+        """Let new callers of keys in ``namespaces`` start a fresh query.
+
+        Callers already waiting on an in-flight query still get its result;
+        they asked before the write.
+        """
+        with self._lock:
+            for key in [key for key in self._calls if key[0] in namespaces]:
+                del self._calls[key]
+            for slot in [slot for slot in self._tasks if slot[1][0] in namespaces]:
+                del self._tasks[slot]
+
+    def _finished(self, slot: Tuple[int, Hashable], task: "asyncio.Future[Any]") -> None:
+        with self._lock:
+            if self._tasks.get(slot) is task:
+                del self._tasks[slot]
+        if not task.cancelled():
+            # Mark the error retrieved even if every waiter was cancelled.
+            task.exception()
+
+
+def _count(key: Tuple[Hashable, ...], leader: bool) -> None:
+    CALLS.inc((("operation", str(key[0])), ("role", "leader" if leader else "follower")))
+
+
+reads = SingleFlight(config.COALESCE_READS)
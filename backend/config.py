@@ -9,13 +9,123 @@ present.
 from __future__ import annotations
 
 import os
-from dotenv import load_dotenv
+from pathlib import Path
 
-load_dotenv()
+
+def _find_dotenv() -> Path | None:
+    # Same search as dotenv.find_dotenv(): this directory, then its parents.
+    for directory in (Path(__file__).resolve().parent, *Path(__file__).resolve().parents):
+        candidate = directory / ".env"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+# python-dotenv is only imported when there is a file to load, which keeps it
+# off the start-up path of deployments configured through the environment.
+_DOTENV_PATH = _find_dotenv()
+if _DOTENV_PATH is not None:
+    from dotenv import load_dotenv
+
+    load_dotenv(_DOTENV_PATH)
 
 SUPABASE_URL = os.getenv("SUPABASE_URL", "").strip()
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "").strip()
 
+# Pooled HTTP transport for the Supabase clients. Size DB_POOL_MAX_CONNECTIONS
+# for peak concurrent requests per process (see GET /db/pool).
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "50"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "50"))
+DB_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("DB_KEEPALIVE_EXPIRY_SECONDS", "30"))
+DB_HTTP2 = os.getenv("DB_HTTP2", "true").strip().lower() in ("1", "true", "yes")
+DB_CONNECT_TIMEOUT_SECONDS = float(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", "5"))
+DB_READ_TIMEOUT_SECONDS = float(os.getenv("DB_READ_TIMEOUT_SECONDS", "30"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "1"))
+
+# Storage driver used by backend.services: "supabase" or "sqlite".
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").strip().lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "library.db").strip()
+
+STORAGE_BACKENDS = ("supabase", "sqlite")
+
+# In-process read-through cache for book/student lookups (0 disables it).
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+# Loan policy: a loan is due LOAN_PERIOD_DAYS after borrow_date and accrues
+# FINE_PER_DAY for each day late, capped at FINE_CAP (0 means no cap).
+LOAN_PERIOD_DAYS = int(os.getenv("LOAN_PERIOD_DAYS", "14"))
+FINE_PER_DAY = float(os.getenv("FINE_PER_DAY", "0.50"))
+FINE_CAP = float(os.getenv("FINE_CAP", "0"))
+# How often the API server refreshes overdue loans (0 disables the loop).
+OVERDUE_JOB_INTERVAL_SECONDS = float(os.getenv("OVERDUE_JOB_INTERVAL_SECONDS", "3600"))
+
+# Concurrent identical reads share one database query (see backend.coalesce).
+COALESCE_READS = os.getenv("COALESCE_READS", "true").strip().lower() in ("1", "true", "yes")
+
+# Change feed: how often readers without an in-process wakeup re-check the
+# events log, and the longest a GET /events long-poll may wait.
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "1.0"))
+EVENTS_MAX_WAIT_SECONDS = float(os.getenv("EVENTS_MAX_WAIT_SECONDS", "30"))
+
+# API launch (python server.py): API_WORKERS processes (0 = one per CPU).
+# API_RELOAD restarts on code changes and only applies to a single worker.
+API_HOST = os.getenv("API_HOST", "0.0.0.0").strip()
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_RELOAD = os.getenv("API_RELOAD", "true").strip().lower() in ("1", "true", "yes")
+
+# State the workers must agree on (rate limits, idempotency keys, cache
+# invalidations, background job leases; see backend.shared_state). "memory"
+# keeps it per process; "sqlite" shares STATE_SQLITE_PATH between workers.
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").strip().lower()
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", "shared_state.db").strip()
+# How often each worker applies cache invalidations published by the others.
+STATE_POLL_SECONDS = float(os.getenv("STATE_POLL_SECONDS", "1.0"))
+
+# Per-client token bucket for the API: RATE_LIMIT_PER_SECOND sustained,
+# RATE_LIMIT_BURST at once (0 disables). Limits are per worker process unless
+# STATE_BACKEND shares them.
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "0"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "50"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+RATE_LIMIT_TRUST_FORWARDED = (
+    os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").strip().lower() in ("1", "true", "yes")
+)
+
+# Idempotency-Key handling for POST endpoints: responses are kept for
+# IDEMPOTENCY_TTL_SECONDS, at most IDEMPOTENCY_MAX_KEYS of them. "memory" is
+# per process; "sqlite" shares IDEMPOTENCY_SQLITE_PATH between workers and is
+# the default when STATE_BACKEND=sqlite.
+IDEMPOTENCY_BACKEND = (
+    os.getenv("IDEMPOTENCY_BACKEND", "sqlite" if STATE_BACKEND == "sqlite" else "memory")
+    .strip()
+    .lower()
+)
+IDEMPOTENCY_SQLITE_PATH = os.getenv("IDEMPOTENCY_SQLITE_PATH", "idempotency.db").strip()
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# An unfinished request holds its key this long before a retry may run again.
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+
+# Access tokens are verified locally (see backend.tokens): HS256 tokens with
+# SUPABASE_JWT_SECRET, asymmetric ones against SUPABASE_JWKS_URL (defaults to
+# the project's JWKS). AUTH_REQUIRED makes every POST endpoint demand a token.
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "").strip()
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else "",
+).strip()
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "false").strip().lower() in ("1", "true", "yes")
+AUTH_AUDIENCE = os.getenv("AUTH_AUDIENCE", "authenticated").strip()
+AUTH_LEEWAY_SECONDS = float(os.getenv("AUTH_LEEWAY_SECONDS", "30"))
+AUTH_CACHE_MAX_TOKENS = int(os.getenv("AUTH_CACHE_MAX_TOKENS", "10000"))
+AUTH_JWKS_TTL_SECONDS = float(os.getenv("AUTH_JWKS_TTL_SECONDS", "600"))
+
+# Requests slower than this are logged with a timing breakdown (0 disables).
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
 
 def validate_supabase_config() -> None:
     """Ensure Supabase credentials are present."""
@@ -25,3 +135,22 @@ def validate_supabase_config() -> None:
             "SUPABASE_KEY in your environment or .env file."
         )
 
+
+def validate_auth_config() -> None:
+    """Ensure tokens can be verified when the API requires them."""
+    if AUTH_REQUIRED and not (SUPABASE_JWT_SECRET or SUPABASE_JWKS_URL):
+        raise RuntimeError(
+            "AUTH_REQUIRED is set but tokens cannot be verified. Set "
+            "SUPABASE_JWT_SECRET or SUPABASE_JWKS_URL (or SUPABASE_URL)."
+        )
+
+
+def validate_storage_config() -> None:
+    """Ensure the configured storage backend is one we know how to build."""
+    if STORAGE_BACKEND not in STORAGE_BACKENDS:
+        raise RuntimeError(
+            f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}. "
+            f"Expected one of: {', '.join(STORAGE_BACKENDS)}."
+        )
+    if STORAGE_BACKEND == "sqlite" and not SQLITE_PATH:
+        raise RuntimeError("SQLITE_PATH must be set when STORAGE_BACKEND=sqlite.")
@@ -1,27 +1,248 @@
 """
 Database client helpers.
 
-Instantiates a single Supabase client that can be reused across the backend.
+Instantiates a single Supabase client that can be reused across the backend,
+plus an async client for the FastAPI event loop. Both run over a pooled
+``httpx`` transport sized by the ``DB_*`` settings in :mod:`backend.config`,
+with keep-alive and (when the ``h2`` package is installed) HTTP/2, so
+concurrent requests share a few long-lived connections.
+
+The ``supabase`` package is imported when the first client is built, not with
+this module, so processes that never reach Supabase (the SQLite backend, or a
+worker that has not served a request yet) skip its import cost.
+
+Clients are rebuilt after a fork, so pre-forking servers never share a socket
+between worker processes. :func:`pool_stats` reports connection reuse and
+pool occupancy for sizing ``DB_POOL_MAX_CONNECTIONS``.
 """
 
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import importlib.util
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
-from supabase import Client, create_client
+import httpx
 
+from . import config
 from .config import SUPABASE_KEY, SUPABASE_URL, validate_supabase_config
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient, Client
+
 _client: Optional[Client] = None
+_async_client: Optional[AsyncClient] = None
+_async_lock: Optional[asyncio.Lock] = None
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+_owner_pid = os.getpid()
+
+
+class PoolStats:
+    """Request and connection counters for one pooled HTTP client.
+
+    ``in_flight`` includes requests still waiting for a free connection, so a
+    ``peak_in_flight`` above ``DB_POOL_MAX_CONNECTIONS`` means callers queued.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connections_opened = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def connection_event(self, event_name: str) -> None:
+        # httpcore reports each new TCP connection; reused ones skip this step.
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+
+class _PooledTransport(httpx.HTTPTransport):
+    def __init__(self, stats: PoolStats, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = lambda name, info: self.stats.connection_event(name)
+        self.stats.request_started()
+        try:
+            return super().handle_request(request)
+        finally:
+            self.stats.request_finished()
+
+
+class _AsyncPooledTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: PoolStats, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async def trace(name: str, info: Dict[str, Any]) -> None:
+            self.stats.connection_event(name)
+
+        request.extensions["trace"] = trace
+        self.stats.request_started()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.stats.request_finished()
+
+
+_sync_stats = PoolStats()
+_async_stats = PoolStats()
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 is used when configured and the optional ``h2`` package exists."""
+    return config.DB_HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+def _transport_options() -> Dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=config.DB_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=config.DB_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=config.DB_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "http2": http2_enabled(),
+        "retries": config.DB_CONNECT_RETRIES,
+    }
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        config.DB_READ_TIMEOUT_SECONDS,
+        connect=config.DB_CONNECT_TIMEOUT_SECONDS,
+        pool=config.DB_POOL_TIMEOUT_SECONDS,
+    )
+
+
+def _build_http_client() -> httpx.Client:
+    return httpx.Client(
+        transport=_PooledTransport(_sync_stats, **_transport_options()),
+        timeout=_timeout(),
+        follow_redirects=True,
+    )
+
+
+def _build_async_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=_AsyncPooledTransport(_async_stats, **_transport_options()),
+        timeout=_timeout(),
+        follow_redirects=True,
+    )
+
+
+def _reset_after_fork() -> None:
+    # A client inherited from the parent process shares its sockets; drop it
+    # (without closing, which would close the parent's connections too).
+    global _client, _async_client, _async_lock, _owner_pid
+    global _http_client, _async_http_client, _sync_stats, _async_stats
+
+    if os.getpid() != _owner_pid:
+        _client = _async_client = None
+        _http_client = _async_http_client = None
+        _async_lock = None
+        _sync_stats, _async_stats = PoolStats(), PoolStats()
+        _owner_pid = os.getpid()
 
 
 def get_client() -> Client:
     """Return a singleton Supabase client."""
-    global _client
+    global _client, _http_client
 
+    _reset_after_fork()
     if _client is None:
-        validate_supabase_config()
-        _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        with _lock:
+            if _client is None:
+                validate_supabase_config()
+                from supabase import ClientOptions, create_client
+
+                _http_client = _build_http_client()
+                _client = create_client(
+                    SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(httpx_client=_http_client)
+                )
 
     return _client
 
+
+async def get_async_client() -> AsyncClient:
+    """Return a singleton async Supabase client."""
+    global _async_client, _async_lock, _async_http_client
+
+    _reset_after_fork()
+    if _async_client is None:
+        if _async_lock is None:
+            _async_lock = asyncio.Lock()
+        async with _async_lock:
+            if _async_client is None:
+                validate_supabase_config()
+                from supabase import AsyncClientOptions, acreate_client
+
+                _async_http_client = _build_async_http_client()
+                _async_client = await acreate_client(
+                    SUPABASE_URL,
+                    SUPABASE_KEY,
+                    options=AsyncClientOptions(httpx_client=_async_http_client),
+                )
+
+    return _async_client
+
+
+def _pool_occupancy(http_client) -> Dict[str, Any]:
+    # httpx exposes no public pool API; read httpcore's pool when present.
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", None) or [])
+    return {
+        "open": len(connections),
+        "idle": sum(1 for conn in connections if conn.is_idle()),
+        "http2": sum(1 for conn in connections if "HTTP/2" in repr(conn)),
+    }
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection reuse and pool occupancy for the sync and async clients."""
+    stats: Dict[str, Any] = {
+        "config": {
+            "max_connections": config.DB_POOL_MAX_CONNECTIONS,
+            "max_keepalive_connections": config.DB_POOL_MAX_KEEPALIVE,
+            "keepalive_expiry_seconds": config.DB_KEEPALIVE_EXPIRY_SECONDS,
+            "http2": http2_enabled(),
+            "pid": os.getpid(),
+        }
+    }
+    for name, http_client, counters in (
+        ("sync", _http_client, _sync_stats),
+        ("async", _async_http_client, _async_stats),
+    ):
+        stats[name] = {
+            **counters.as_dict(),
+            "pool": _pool_occupancy(http_client) if http_client is not None else None,
+        }
+    return stats
@@ -0,0 +1,171 @@
+"""
+Change feed helpers: long-polling and following the ``events`` log.
+
+The database appends an event for every new book, new student, borrow and
+return (see :meth:`Repository.list_events`). Readers keep the last ``seq``
+they saw and ask only for what came after it, which is a primary-key range
+read instead of a re-sort of the borrow table.
+
+Writes made through the service layer in this process wake waiting readers
+at once (:data:`changes`); writes from other processes (other API workers,
+the Streamlit app) are picked up by polling every ``EVENTS_POLL_SECONDS``.
+:class:`EventFollower` tails the log in the background and hands each batch
+to its subscribers; the API uses one to drop catalog cache entries that
+another process made stale.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from . import config, metrics
+from .cache import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+EVENT_KINDS = ("book_added", "student_added", "borrowed", "returned")
+MAX_EVENTS = 500
+
+POLLS = metrics.Counter(
+    "lms_event_polls_total", "Long-polls on GET /events by result (events or timeout)."
+)
+metrics.REGISTRY.append(POLLS)
+
+Events = List[Dict[str, Any]]
+Fetch = Callable[[Optional[int], int], Awaitable[Events]]
+
+
+class ChangeNotifier:
+    """Wakes event-loop waiters when this process writes a change.
+
+    ``notify`` may be called from any thread (the sync services run in
+    worker threads); waiters are woken on their own loops.
+    """
+
+    def __init__(self) -> None:
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    def notify(self) -> None:
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop has closed.
+                pass
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds; True if a change was notified."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+changes = ChangeNotifier()
+
+
+async def wait_for_events(fetch: Fetch, since: Optional[int], limit: int, timeout: float) -> Events:
+    """Return events after ``since``, waiting up to ``timeout`` for the first.
+
+    ``since=None`` returns the latest ``limit`` events without waiting.
+    """
+    events = await fetch(since, limit)
+    if since is None or timeout <= 0:
+        return events
+    deadline = time.monotonic() + timeout
+    while not events:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            POLLS.inc((("result", "timeout"),))
+            return events
+        waited = time.monotonic()
+        await changes.wait(min(config.EVENTS_POLL_SECONDS, remaining))
+        metrics.record_idle(time.monotonic() - waited)
+        events = await fetch(since, limit)
+    POLLS.inc((("result", "events"),))
+    return events
+
+
+Subscriber = Callable[[Events], None]
+
+
+class EventFollower:
+    """Tail the event log and pass each new batch to the subscribers.
+
+    Starts from the end of the log: subscribers see changes made after
+    :meth:`start`, not history.
+    """
+
+    def __init__(self, fetch: Fetch, interval: Optional[float] = None) -> None:
+        self.fetch = fetch
+        self.interval = config.EVENTS_POLL_SECONDS if interval is None else interval
+        self.seq: Optional[int] = None
+        self._subscribers: List[Subscriber] = []
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    async def start(self) -> None:
+        latest = await self.fetch(None, 1)
+        self.seq = latest[-1]["seq"] if latest else 0
+
+    async def poll(self) -> int:
+        """Deliver everything after the last seen event; return how many."""
+        if self.seq is None:
+            await self.start()
+        delivered = 0
+        while True:
+            events = await self.fetch(self.seq, MAX_EVENTS)
+            if not events:
+                return delivered
+            for subscriber in self._subscribers:
+                try:
+                    subscriber(events)
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("Event subscriber %r failed", subscriber)
+            self.seq = events[-1]["seq"]
+            delivered += len(events)
+            if len(events) < MAX_EVENTS:
+                return delivered
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Event follower poll failed")
+            await changes.wait(self.interval)
+
+
+def invalidate_cache(events: Events) -> None:
+    """Drop catalog cache entries the events made stale.
+
+    Changes made through this process's services have already done this;
+    the point is catching changes written by other processes.
+    """
+    books_changed = students_changed = False
+    for event in events:
+        if event["kind"] == "student_added":
+            students_changed = True
+            continue
+        books_changed = True
+        if event.get("book_id") is not None:
+            catalog_cache.invalidate(("book", event["book_id"]))
+    if books_changed:
+        catalog_cache.invalidate_namespace("books")
+    if students_changed:
+        catalog_cache.invalidate_namespace("students")
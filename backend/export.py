@@ -0,0 +1,195 @@
+"""
+Streaming export of whole tables as NDJSON or CSV.
+
+Rows are read a page at a time by keyset pagination and encoded as they
+arrive, so memory stays bounded by the page size however large the table is.
+Borrow history can be limited to a ``borrow_date`` range for audits.
+
+Command line usage::
+
+    python -m backend.export borrow_records --format csv --since 2025-01-01 > audit.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .storage import get_async_repository, get_repository
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+EXPORT_PAGE_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    source: str
+    sort_key: str
+    columns: Tuple[str, ...]
+
+    @property
+    def dated(self) -> bool:
+        return "borrow_date" in self.columns
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "books": ExportSpec(
+        "books",
+        "title",
+        ("id", "title", "author", "isbn", "total_copies", "available_copies"),
+    ),
+    "students": ExportSpec("students", "name", ("id", "name", "email", "created_at")),
+    "borrow_records": ExportSpec(
+        "borrow_records",
+        "borrow_date",
+        ("id", "student_id", "book_id", "borrow_date", "return_date", "status"),
+    ),
+    "loans": ExportSpec(
+        "loan_details",
+        "borrow_date",
+        (
+            "id",
+            "student_id",
+            "book_id",
+            "borrow_date",
+            "return_date",
+            "status",
+            "student_name",
+            "student_email",
+            "book_title",
+            "book_author",
+        ),
+    ),
+}
+
+
+def resolve(
+    table: str, fmt: str, since: Optional[str] = None, until: Optional[str] = None
+) -> Tuple[ExportSpec, Optional[Dict[str, Tuple[Any, Any]]]]:
+    """Validate export arguments; raise ValueError with a user-facing message."""
+    spec = EXPORTS.get(table)
+    if spec is None:
+        raise ValueError(f"Unknown export {table!r}. Expected one of: {', '.join(EXPORTS)}.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}. Expected one of: {', '.join(FORMATS)}.")
+    if since is None and until is None:
+        return spec, None
+    if not spec.dated:
+        raise ValueError(f"{table!r} has no borrow_date to filter on.")
+    return spec, {"borrow_date": (_iso_date(since), _iso_date(until))}
+
+
+def _iso_date(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError as exc:
+        raise ValueError(f"Invalid date {value!r}; expected YYYY-MM-DD.") from exc
+
+
+def _select_options(spec: ExportSpec, bounds, after) -> Dict[str, Any]:
+    return {
+        "order": spec.sort_key,
+        "limit": EXPORT_PAGE_SIZE,
+        "columns": list(spec.columns),
+        "after": after,
+        "bounds": bounds,
+    }
+
+
+def _next_after(spec: ExportSpec, page: List[Dict[str, Any]]):
+    if len(page) < EXPORT_PAGE_SIZE:
+        return None
+    return (page[-1][spec.sort_key], page[-1]["id"])
+
+
+def iter_pages(spec: ExportSpec, bounds=None) -> Iterator[List[Dict[str, Any]]]:
+    repository = get_repository()
+    after = None
+    while True:
+        page = repository.select(spec.source, **_select_options(spec, bounds, after))
+        if page:
+            yield page
+        after = _next_after(spec, page)
+        if after is None:
+            return
+
+
+async def aiter_pages(spec: ExportSpec, bounds=None) -> AsyncIterator[List[Dict[str, Any]]]:
+    repository = get_async_repository()
+    after = None
+    while True:
+        page = await repository.select(spec.source, **_select_options(spec, bounds, after))
+        if page:
+            yield page
+        after = _next_after(spec, page)
+        if after is None:
+            return
+
+
+def encode_header(spec: ExportSpec, fmt: str) -> str:
+    if fmt != "csv":
+        return ""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(spec.columns)
+    return buffer.getvalue()
+
+
+def encode_page(spec: ExportSpec, fmt: str, page: Iterable[Dict[str, Any]]) -> str:
+    """Encode one page as a single chunk, so the stream writes once per page."""
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(row, separators=(",", ":"), default=str) + "\n" for row in page
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([row.get(column) for column in spec.columns] for row in page)
+    return buffer.getvalue()
+
+
+def stream(
+    table: str, fmt: str, since: Optional[str] = None, until: Optional[str] = None
+) -> Iterator[str]:
+    spec, bounds = resolve(table, fmt, since, until)
+    header = encode_header(spec, fmt)
+    if header:
+        yield header
+    for page in iter_pages(spec, bounds):
+        yield encode_page(spec, fmt, page)
+
+
+async def astream(spec: ExportSpec, fmt: str, bounds=None) -> AsyncIterator[str]:
+    """Async chunk stream for ``StreamingResponse``; call :func:`resolve` first."""
+    header = encode_header(spec, fmt)
+    if header:
+        yield header
+    async for page in aiter_pages(spec, bounds):
+        yield encode_page(spec, fmt, page)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export a table as NDJSON or CSV.")
+    parser.add_argument("table", choices=tuple(EXPORTS))
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--since", help="first borrow_date to include (YYYY-MM-DD)")
+    parser.add_argument("--until", help="last borrow_date to include (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    try:
+        for chunk in stream(args.table, args.format, args.since, args.until):
+            sys.stdout.write(chunk)
+    except ValueError as exc:
+        parser.error(str(exc))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
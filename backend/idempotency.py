@@ -0,0 +1,412 @@
+"""
+``Idempotency-Key`` support for the mutation endpoints.
+
+A client that sends ``Idempotency-Key: <unique value>`` with a ``POST`` can
+retry it after a timeout or dropped connection: the first request runs, its
+response is stored, and every retry with the same key gets that stored
+response back (marked ``Idempotent-Replayed: true``) without touching the
+database again. A retry that arrives while the first attempt is still running
+gets ``409``; reusing a key for a different request gets ``422``. Responses
+with a 5xx, 401 or 403 status are not stored, so those can be retried for
+real. Keys are scoped to the caller, the token's subject or else the client
+address as the rate limiter sees it, so two clients that pick the same key
+never see each other's responses.
+
+Keys live in a bounded store with TTL eviction. ``IDEMPOTENCY_BACKEND``
+selects it: ``memory`` (per process, the default) or ``sqlite`` (a file
+shared by every worker on the host, the default when ``STATE_BACKEND`` is
+``sqlite``). :func:`set_store` swaps in any other
+:class:`IdempotencyStore`, e.g. one backed by a shared cache service.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import config, metrics, tokens
+from .ratelimit import client_address
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# reserve() outcomes.
+NEW = "new"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+StoredResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+OUTCOMES = metrics.Counter(
+    "lms_idempotency_requests_total", "Requests carrying an Idempotency-Key, by outcome."
+)
+metrics.REGISTRY.append(OUTCOMES)
+
+
+class IdempotencyStore:
+    """Where keys, request fingerprints and finished responses are kept.
+
+    ``reserve`` must be atomic: of two concurrent calls with the same new key,
+    exactly one may see :data:`NEW`. A reservation that is never completed or
+    released (the worker died) lapses after ``lease_seconds``.
+    """
+
+    blocking = False
+
+    def __init__(self, ttl: float, max_keys: int, lease_seconds: float) -> None:
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.lease_seconds = lease_seconds
+
+    def reserve(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        raise NotImplementedError
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        raise NotImplementedError
+
+    def release(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Per-process store: TTL expiry plus least-recently-used eviction."""
+
+    def __init__(self, ttl: float, max_keys: int, lease_seconds: float) -> None:
+        super().__init__(ttl, max_keys, lease_seconds)
+        # key -> (expires_at, fingerprint, response or None while in flight)
+        self._entries: "OrderedDict[str, Tuple[float, str, Optional[StoredResponse]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                if entry[1] != fingerprint:
+                    return MISMATCH, None
+                if entry[2] is None:
+                    return IN_PROGRESS, None
+                return REPLAY, entry[2]
+            self._entries[key] = (now + self.lease_seconds, fingerprint, None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            return NEW, None
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (time.monotonic() + self.ttl, entry[1], response)
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """Store in a SQLite file, shared by every worker process on the host."""
+
+    blocking = True
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        status_code INTEGER,
+        headers TEXT,
+        body BLOB
+    );
+    CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at
+        ON idempotency_keys (expires_at);
+    """
+
+    def __init__(self, path: str, ttl: float, max_keys: int, lease_seconds: float) -> None:
+        super().__init__(ttl, max_keys, lease_seconds)
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = self._reserve(conn, key, fingerprint)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _reserve(
+        self, conn: sqlite3.Connection, key: str, fingerprint: str
+    ) -> Tuple[str, Optional[StoredResponse]]:
+        # Wall-clock time, since expiries are compared across processes.
+        now = time.time()
+        conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        row = conn.execute(
+            "SELECT fingerprint, status_code, headers, body FROM idempotency_keys WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is not None:
+            if row[0] != fingerprint:
+                return MISMATCH, None
+            if row[1] is None:
+                return IN_PROGRESS, None
+            headers = [(name.encode(), value.encode()) for name, value in json.loads(row[2])]
+            return REPLAY, (row[1], headers, row[3])
+        conn.execute(
+            "INSERT INTO idempotency_keys (key, fingerprint, expires_at) VALUES (?, ?, ?)",
+            (key, fingerprint, now + self.lease_seconds),
+        )
+        # Trim to max_keys, soonest to expire first.
+        conn.execute(
+            "DELETE FROM idempotency_keys WHERE key IN ("
+            "  SELECT key FROM idempotency_keys ORDER BY expires_at"
+            "  LIMIT MAX((SELECT COUNT(*) FROM idempotency_keys) - ?, 0))",
+            (self.max_keys,),
+        )
+        return NEW, None
+
+    def complete(self, key: str, response: StoredResponse) -> None:
+        status, headers, body = response
+        self._connect().execute(
+            "UPDATE idempotency_keys SET status_code = ?, headers = ?, body = ?, expires_at = ? "
+            "WHERE key = ?",
+            (
+                status,
+                json.dumps([(name.decode(), value.decode()) for name, value in headers]),
+                body,
+                time.time() + self.ttl,
+                key,
+            ),
+        )
+
+    def release(self, key: str) -> None:
+        self._connect().execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+
+_store: Optional[IdempotencyStore] = None
+_lock = threading.Lock()
+
+
+def _build_store() -> IdempotencyStore:
+    options = {
+        "ttl": config.IDEMPOTENCY_TTL_SECONDS,
+        "max_keys": config.IDEMPOTENCY_MAX_KEYS,
+        "lease_seconds": config.IDEMPOTENCY_LEASE_SECONDS,
+    }
+    if config.IDEMPOTENCY_BACKEND == "sqlite":
+        return SQLiteIdempotencyStore(config.IDEMPOTENCY_SQLITE_PATH, **options)
+    if config.IDEMPOTENCY_BACKEND != "memory":
+        raise RuntimeError(
+            f"Unknown IDEMPOTENCY_BACKEND {config.IDEMPOTENCY_BACKEND!r}. "
+            "Expected one of: memory, sqlite."
+        )
+    return MemoryIdempotencyStore(**options)
+
+
+def get_store() -> IdempotencyStore:
+    """Return the singleton store for the configured backend."""
+    global _store
+
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = _build_store()
+    return _store
+
+
+def set_store(store: Optional[IdempotencyStore]) -> None:
+    """Swap the active store, e.g. for a shared backend of your own."""
+    global _store
+
+    with _lock:
+        _store = store
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+async def _call(store: IdempotencyStore, method, *args):
+    if store.blocking:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+def _json_response(status: int, detail: str, extra: Iterable[Tuple[bytes, bytes]] = ()):
+    body = json.dumps({"detail": detail}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        *extra,
+    ]
+    return status, headers, body
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware that makes ``POST`` to ``paths`` safe to retry."""
+
+    def __init__(self, app, paths: Iterable[str]) -> None:
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send) -> None:
+        key = self._key(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            OUTCOMES.inc((("outcome", "invalid"),))
+            await self._send(
+                send,
+                _json_response(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters."),
+            )
+            return
+
+        key = f"{await _owner(scope)}\n{key}"
+        body, receive = await _buffer_body(receive)
+        store = get_store()
+        request_print = fingerprint(
+            scope["method"], scope["path"], scope.get("query_string", b""), body
+        )
+        state, stored = await _call(store, store.reserve, key, request_print)
+        OUTCOMES.inc((("outcome", state),))
+        if state == REPLAY:
+            status, headers, payload = stored
+            await self._send(send, (status, [*headers, (b"idempotent-replayed", b"true")], payload))
+            return
+        if state == IN_PROGRESS:
+            await self._send(
+                send,
+                _json_response(
+                    409,
+                    "A request with this Idempotency-Key is still in progress.",
+                    [(b"retry-after", b"1")],
+                ),
+            )
+            return
+        if state == MISMATCH:
+            await self._send(
+                send,
+                _json_response(422, "Idempotency-Key was already used for a different request."),
+            )
+            return
+
+        response: Dict[str, Any] = {"status": 500, "headers": [], "body": []}
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (name, value)
+                    for name, value in message.get("headers", [])
+                    if name.lower() in (b"content-type", b"content-length", b"location")
+                ]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            await _call(store, store.release, key)
+            raise
+        # Auth failures are not stored either: a retry with a valid token must run.
+        if response["status"] >= 500 or response["status"] in (401, 403):
+            await _call(store, store.release, key)
+            return
+        await _call(
+            store,
+            store.complete,
+            key,
+            (response["status"], response["headers"], b"".join(response["body"])),
+        )
+
+    def _key(self, scope) -> Optional[str]:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return None
+        if scope["path"] not in self.paths:
+            return None
+        for name, value in scope.get("headers", []):
+            if name == HEADER:
+                return value.decode("latin-1").strip()
+        return None
+
+    @staticmethod
+    async def _send(send, response: StoredResponse) -> None:
+        status, headers, body = response
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def _owner(scope) -> str:
+    """Who the key belongs to: the verified token subject, else the client."""
+    authorization = None
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            authorization = value.decode("latin-1")
+    token = tokens.bearer_token(authorization)
+    verifier = tokens.get_verifier()
+    if token is not None and verifier.configured:
+        try:
+            claims = verifier.cached(token)
+            if claims is None:
+                if verifier.needs_network(token):
+                    claims = await asyncio.to_thread(verifier.verify, token)
+                else:
+                    claims = verifier.verify(token)
+        except tokens.TokenError:
+            # Rejected again by the route; key it like an anonymous client.
+            claims = None
+        if claims and claims.get("sub"):
+            return f"sub:{claims['sub']}"
+    return f"addr:{client_address(scope, config.RATE_LIMIT_TRUST_FORWARDED)}"
+
+
+async def _buffer_body(receive):
+    """Read the whole request body, then hand the app a receive that replays it."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
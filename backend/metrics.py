@@ -0,0 +1,247 @@
+"""
+Request and database timing metrics, exposed in Prometheus text format.
+
+:class:`MetricsMiddleware` times every HTTP request by route template and
+opens a per-request scope. The storage drivers wrap each database round trip
+(a PostgREST request, an RPC, a SQLite statement or transaction) in
+:func:`db_call`, which feeds the global histograms and the active request's
+scope. Requests slower than ``SLOW_REQUEST_SECONDS`` are logged with a
+breakdown of where their time went.
+
+Calls made outside a request (the Streamlit pages, scripts) still count
+towards the database metrics.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by a label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, seconds: float) -> None:
+        # Layout per series: one count per bucket, then +Inf count, then sum.
+        slot = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[slot] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format(labels + (('le', repr(bound)),))} {cumulative:g}"
+                )
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format(labels + (('le', '+Inf'),))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format(labels)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_format(labels)} {cumulative:g}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a label set."""
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._series)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format(labels)} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+REQUEST_SECONDS = Histogram(
+    "lms_http_request_duration_seconds", "HTTP request latency by route."
+)
+REQUEST_DB_CALLS = Counter(
+    "lms_http_request_db_calls_total", "Database round trips made while serving a route."
+)
+DB_SECONDS = Histogram(
+    "lms_db_call_duration_seconds", "Database round-trip latency by operation."
+)
+DB_ERRORS = Counter("lms_db_call_errors_total", "Database round trips that raised.")
+REGISTRY = [REQUEST_SECONDS, REQUEST_DB_CALLS, DB_SECONDS, DB_ERRORS]
+
+
+class RequestScope:
+    """Database round trips made on behalf of one request."""
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, float]] = []
+        self.idle_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, seconds: float) -> None:
+        # Calls may finish on worker threads (asyncio.to_thread copies the context).
+        with self._lock:
+            self.calls.append((operation, seconds))
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.calls)
+
+    def breakdown(self) -> Dict[str, Tuple[int, float]]:
+        totals: Dict[str, Tuple[int, float]] = {}
+        for operation, seconds in self.calls:
+            count, total = totals.get(operation, (0, 0.0))
+            totals[operation] = (count + 1, total + seconds)
+        return totals
+
+
+_scope: ContextVar[Optional[RequestScope]] = ContextVar("lms_request_scope", default=None)
+
+
+def record_idle(seconds: float) -> None:
+    """Time the current request spent waiting on purpose (a long-poll).
+
+    It still counts towards the latency histogram but not towards the slow
+    request threshold.
+    """
+    scope = _scope.get()
+    if scope is not None:
+        scope.idle_seconds += seconds
+
+
+@contextmanager
+def db_call(operation: str) -> Iterator[None]:
+    """Time one database round trip, e.g. ``db_call("select books")``."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DB_ERRORS.inc((("operation", operation),))
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        DB_SECONDS.observe((("operation", operation),), elapsed)
+        scope = _scope.get()
+        if scope is not None:
+            scope.record(operation, elapsed)
+
+
+def _log_slow(method: str, route: str, status: int, elapsed: float, scope: RequestScope) -> None:
+    parts = ", ".join(
+        f"{operation} x{count} {total * 1000:.1f}ms"
+        for operation, (count, total) in sorted(
+            scope.breakdown().items(), key=lambda item: item[1][1], reverse=True
+        )
+    )
+    db_seconds = scope.db_seconds
+    logger.warning(
+        "slow request %s %s status=%s total=%.1fms db=%.1fms in %d calls [%s] other=%.1fms",
+        method,
+        route,
+        status,
+        elapsed * 1000,
+        db_seconds * 1000,
+        len(scope.calls),
+        parts,
+        max(elapsed - db_seconds, 0.0) * 1000,
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times requests by route template."""
+
+    def __init__(self, app, slow_seconds: Optional[float] = None) -> None:
+        self.app = app
+        self.slow_seconds = (
+            config.SLOW_REQUEST_SECONDS if slow_seconds is None else slow_seconds
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        request_scope = RequestScope()
+        token = _scope.set(request_scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _scope.reset(token)
+            # The router stores the matched route in the scope; unmatched paths
+            # share one label so stray URLs cannot grow the series without bound.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            labels = (("method", method), ("route", route), ("status", str(status)))
+            REQUEST_SECONDS.observe(labels, elapsed)
+            if request_scope.calls:
+                REQUEST_DB_CALLS.inc(
+                    (("method", method), ("route", route)), len(request_scope.calls)
+                )
+            if self.slow_seconds and elapsed - request_scope.idle_seconds >= self.slow_seconds:
+                _log_slow(method, route, status, elapsed, request_scope)
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
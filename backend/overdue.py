@@ -0,0 +1,74 @@
+"""
+Due dates, overdue detection and fines.
+
+A loan is due ``LOAN_PERIOD_DAYS`` after it was borrowed. :func:`refresh`
+asks the repository to mark loans that have passed their due date since the
+last run and to settle overdue loans that have since been returned; see
+:meth:`Repository.refresh_overdue` for how the scan stays incremental.
+
+Fines are not stored. :func:`apply_fines` derives them for a page of overdue
+rows in one vectorized pass, from ``due_date`` to ``return_date`` (or to
+today while the book is still out), so they never go stale.
+
+Command line usage (e.g. from cron)::
+
+    python -m backend.overdue
+"""
+
+from __future__ import annotations
+
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from . import config
+from .storage import get_repository
+
+
+def overdue_cutoff(today: Optional[date] = None) -> str:
+    """Loans borrowed before this date are past due on ``today``."""
+    return str((today or date.today()) - timedelta(days=config.LOAN_PERIOD_DAYS))
+
+
+def apply_fines(
+    rows: List[Dict[str, Any]], today: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """Add ``days_overdue`` and ``fine`` to each overdue row, in place."""
+    if not rows:
+        return rows
+    import numpy as np
+
+    today_value = np.datetime64(today or date.today(), "D")
+    due = np.array([str(row["due_date"])[:10] for row in rows], dtype="datetime64[D]")
+    returned = np.array(
+        [str(row["return_date"])[:10] if row.get("return_date") else "NaT" for row in rows],
+        dtype="datetime64[D]",
+    )
+    end = np.where(np.isnat(returned), today_value, returned)
+    days = np.maximum((end - due).astype(np.int64), 0)
+    fines = days * config.FINE_PER_DAY
+    if config.FINE_CAP > 0:
+        fines = np.minimum(fines, config.FINE_CAP)
+    fines = np.round(fines, 2)
+    for row, row_days, row_fine in zip(rows, days.tolist(), fines.tolist()):
+        row["days_overdue"] = row_days
+        row["fine"] = row_fine
+    return rows
+
+
+def refresh(today: Optional[date] = None) -> Dict[str, Any]:
+    """Mark newly overdue loans and settle returned ones."""
+    return get_repository().refresh_overdue(overdue_cutoff(today), config.LOAN_PERIOD_DAYS)
+
+
+def main() -> int:
+    result = refresh()
+    print(
+        f"marked={result['marked']} settled={result['settled']} "
+        f"watermark={result['watermark']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
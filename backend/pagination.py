@@ -0,0 +1,59 @@
+"""
+Keyset pagination helpers shared by the service layers and the API.
+
+Lists are ordered by ``(sort_key, id)`` so ties never shuffle between pages.
+A cursor is the opaque, URL-safe encoding of the last row's ``[sort_key, id]``
+pair; the next page starts strictly after it.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(row: Dict[str, Any], sort_key: str) -> str:
+    raw = json.dumps([row[sort_key], row["id"]], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(last_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid pagination cursor.") from exc
+
+
+def next_cursor(
+    rows: List[Dict[str, Any]], sort_key: str, limit: Optional[int]
+) -> Optional[str]:
+    """Return the cursor for the page after ``rows``, or None on the last page."""
+    if not limit or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1], sort_key)
+
+
+def page_options(
+    sort_key: str,
+    after: Optional[str],
+    limit: Optional[int],
+    fields: Optional[Sequence[str]],
+) -> Dict[str, Any]:
+    """Translate API paging arguments into repository ``select`` options.
+
+    Projections always carry the sort key and ``id`` so the caller can build
+    the next cursor from the last row.
+    """
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    columns = list(dict.fromkeys([*fields, sort_key, "id"])) if fields else None
+    return {
+        "columns": columns,
+        "after": decode_cursor(after) if after else None,
+        "limit": limit,
+    }
@@ -0,0 +1,163 @@
+"""
+Per-client token-bucket rate limiting for the API.
+
+Each client gets a bucket of ``RATE_LIMIT_BURST`` tokens refilled at
+``RATE_LIMIT_PER_SECOND``; a request spends one token, and a client with an
+empty bucket gets ``429 Too Many Requests`` with a ``Retry-After`` hint
+instead of reaching the database. Clients are identified by their peer
+address, or by the first ``X-Forwarded-For`` hop when
+``RATE_LIMIT_TRUST_FORWARDED`` is set behind a proxy. Buckets for at most
+``RATE_LIMIT_MAX_CLIENTS`` clients are kept; the least recently seen are
+dropped first, which only ever resets a client to a full bucket.
+
+Limits are per worker process unless ``STATE_BACKEND`` shares the buckets
+between workers (:class:`SharedTokenBucketLimiter`).
+``RATE_LIMIT_PER_SECOND=0`` (the default) disables limiting.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from . import config, metrics, shared_state
+
+DECISIONS = metrics.Counter(
+    "lms_rate_limit_decisions_total", "Rate limiter decisions by method and outcome."
+)
+metrics.REGISTRY.append(DECISIONS)
+
+
+class TokenBucketLimiter:
+    """Thread-safe token buckets keyed by client id."""
+
+    blocking = False
+
+    def __init__(self, rate: float, burst: float, max_clients: int) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        # client -> (tokens, last refill time)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, client: str, now: Optional[float] = None) -> float:
+        """Spend one token; return 0 if allowed, else seconds until one is free."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1.0:
+                tokens -= 1.0
+                wait = 0.0
+            else:
+                wait = (1.0 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            self._buckets.move_to_end(client)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SharedTokenBucketLimiter(TokenBucketLimiter):
+    """Token buckets kept in :mod:`backend.shared_state`, so every worker
+    draws from the same bucket for a client."""
+
+    blocking = True
+
+    def __init__(self, state: shared_state.SharedState, rate: float, burst: float) -> None:
+        super().__init__(rate, burst, 0)
+        self.state = state
+
+    def acquire(self, client: str, now: Optional[float] = None) -> float:
+        return self.state.take_token(f"rate:{client}", self.rate, self.burst)
+
+
+def build_limiter() -> TokenBucketLimiter:
+    """The limiter for the configured ``STATE_BACKEND``."""
+    state = shared_state.get_state()
+    if state is not None and config.RATE_LIMIT_PER_SECOND > 0:
+        return SharedTokenBucketLimiter(
+            state, config.RATE_LIMIT_PER_SECOND, config.RATE_LIMIT_BURST
+        )
+    return TokenBucketLimiter(
+        config.RATE_LIMIT_PER_SECOND,
+        config.RATE_LIMIT_BURST,
+        config.RATE_LIMIT_MAX_CLIENTS,
+    )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying :class:`TokenBucketLimiter` to HTTP requests."""
+
+    def __init__(
+        self,
+        app,
+        limiter: Optional[TokenBucketLimiter] = None,
+        exempt_paths: Iterable[str] = (),
+        trust_forwarded: Optional[bool] = None,
+    ) -> None:
+        self.app = app
+        self.limiter = limiter or build_limiter()
+        self.exempt_paths = frozenset(exempt_paths)
+        self.trust_forwarded = (
+            config.RATE_LIMIT_TRUST_FORWARDED if trust_forwarded is None else trust_forwarded
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self.limiter.enabled
+            or scope["path"] in self.exempt_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        client = self._client(scope)
+        if self.limiter.blocking:
+            wait = await asyncio.to_thread(self.limiter.acquire, client)
+        else:
+            wait = self.limiter.acquire(client)
+        # Routes are not matched yet; label by method to keep the series bounded.
+        labels = (("method", scope["method"]),)
+        if not wait:
+            DECISIONS.inc(labels + (("decision", "allowed"),))
+            await self.app(scope, receive, send)
+            return
+
+        DECISIONS.inc(labels + (("decision", "limited"),))
+        body = json.dumps({"detail": "Too many requests; slow down."}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(wait)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    def _client(self, scope) -> str:
+        return client_address(scope, self.trust_forwarded)
+
+
+def client_address(scope, trust_forwarded: bool) -> str:
+    """The peer address, or the first ``X-Forwarded-For`` hop if trusted."""
+    if trust_forwarded:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
@@ -0,0 +1,263 @@
+"""
+In-process catalog search index.
+
+Used when the storage backend has no full-text index of its own (or only an
+exact-token one). Titles, authors and ISBNs are tokenized into an inverted
+index. Each query term matches, in decreasing weight:
+
+* the exact token,
+* tokens it is a prefix of (found by bisecting the sorted vocabulary),
+* tokens one edit away (insert, delete, substitute or transpose), found via a
+  SymSpell-style index of single-character deletions.
+
+Every query term must match for a book to be returned.
+"""
+
+from __future__ import annotations
+
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+EXACT_WEIGHT = 3.0
+PREFIX_WEIGHT = 2.0
+FUZZY_WEIGHT = 1.0
+MIN_FUZZY_LENGTH = 4
+MAX_PREFIX_EXPANSIONS = 256
+LOAD_PAGE_SIZE = 1000
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return _TOKEN.findall(folded.lower())
+
+
+def _book_tokens(book: Dict[str, Any]) -> Set[str]:
+    tokens = set(tokenize(book.get("title")))
+    tokens.update(tokenize(book.get("author")))
+    isbn = book.get("isbn")
+    if isbn:
+        tokens.update(tokenize(isbn))
+        digits = "".join(ch for ch in isbn if ch.isalnum()).lower()
+        if digits:
+            tokens.add(digits)
+    return tokens
+
+
+def _deletions(token: str) -> Set[str]:
+    return {token[:i] + token[i + 1 :] for i in range(len(token))}
+
+
+def _fuzzy_keys(token: str) -> Set[str]:
+    # Numbers and ISBNs are matched exactly or by prefix; spelling correction
+    # only helps words, and skipping digits keeps the deletion index small.
+    if len(token) < MIN_FUZZY_LENGTH or not token.isalpha():
+        return set()
+    return _deletions(token)
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True when ``a`` and ``b`` differ by at most one edit or adjacent swap."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diffs = [i for i in range(la) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (
+            len(diffs) == 2
+            and diffs[1] == diffs[0] + 1
+            and a[diffs[0]] == b[diffs[1]]
+            and a[diffs[1]] == b[diffs[0]]
+        )
+    if la > lb:
+        a, b = b, a
+    # ``b`` is one character longer: skipping one character must align them.
+    for i in range(len(a)):
+        if a[i] != b[i]:
+            return a[i:] == b[i + 1 :]
+    return True
+
+
+class SearchIndex:
+    """Thread-safe inverted index over book title, author and ISBN."""
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Set[int]] = {}
+        self._vocabulary: List[str] = []
+        self._deletes: Dict[str, Set[str]] = {}
+        self._doc_tokens: Dict[int, Set[str]] = {}
+        self._titles: Dict[int, str] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def add(self, book: Dict[str, Any]) -> None:
+        """Index ``book``, replacing any previous entry with the same id."""
+        with self._lock:
+            for token in self._add(book):
+                insort(self._vocabulary, token)
+
+    def add_many(self, books: Iterable[Dict[str, Any]]) -> None:
+        """Index many books, sorting the vocabulary once instead of per token."""
+        with self._lock:
+            added: List[str] = []
+            for book in books:
+                added.extend(self._add(book))
+            if added:
+                self._vocabulary = sorted(set(self._vocabulary).union(added))
+
+    def _add(self, book: Dict[str, Any]) -> List[str]:
+        """Index ``book`` and return tokens new to the vocabulary (unsorted)."""
+        book_id = book["id"]
+        tokens = _book_tokens(book)
+        self._remove(book_id)
+        self._doc_tokens[book_id] = tokens
+        self._titles[book_id] = (book.get("title") or "").lower()
+        new_tokens = []
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                new_tokens.append(token)
+                for variant in _fuzzy_keys(token):
+                    self._deletes.setdefault(variant, set()).add(token)
+            postings.add(book_id)
+        return new_tokens
+
+    def remove(self, book_id: int) -> None:
+        with self._lock:
+            self._remove(book_id)
+
+    def _remove(self, book_id: int) -> None:
+        tokens = self._doc_tokens.pop(book_id, None)
+        self._titles.pop(book_id, None)
+        for token in tokens or ():
+            postings = self._postings[token]
+            postings.discard(book_id)
+            if postings:
+                continue
+            del self._postings[token]
+            del self._vocabulary[bisect_left(self._vocabulary, token)]
+            for variant in _fuzzy_keys(token):
+                variants = self._deletes.get(variant)
+                if variants is not None:
+                    variants.discard(token)
+                    if not variants:
+                        del self._deletes[variant]
+
+    def _term_matches(self, term: str) -> Dict[int, float]:
+        """Map book id to the best weight with which ``term`` matches it."""
+        weights: Dict[int, float] = {}
+
+        def credit(token: str, weight: float) -> None:
+            for book_id in self._postings.get(token, ()):
+                if weights.get(book_id, 0.0) < weight:
+                    weights[book_id] = weight
+
+        start = bisect_left(self._vocabulary, term)
+        for offset, token in enumerate(self._vocabulary[start : start + MAX_PREFIX_EXPANSIONS]):
+            if not token.startswith(term):
+                break
+            credit(token, EXACT_WEIGHT if offset == 0 and token == term else PREFIX_WEIGHT)
+
+        variants = _fuzzy_keys(term)
+        if variants:
+            candidates = set(self._deletes.get(term, ()))
+            for variant in variants | {term}:
+                if variant in self._postings:
+                    candidates.add(variant)
+                candidates.update(self._deletes.get(variant, ()))
+            for token in candidates:
+                if token != term and _within_one_edit(term, token):
+                    credit(token, FUZZY_WEIGHT)
+
+        return weights
+
+    def search(self, query: str, limit: int = 20) -> List[int]:
+        """Return up to ``limit`` book ids ranked by match quality, then title."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+
+        with self._lock:
+            per_term = sorted((self._term_matches(term) for term in terms), key=len)
+            if not per_term[0]:
+                return []
+            scores = dict(per_term[0])
+            for weights in per_term[1:]:
+                scores = {
+                    book_id: score + weights[book_id]
+                    for book_id, score in scores.items()
+                    if book_id in weights
+                }
+                if not scores:
+                    return []
+            titles = self._titles
+            ranked: List[Tuple[float, str, int]] = heapq.nsmallest(
+                limit,
+                ((-score, titles.get(book_id, ""), book_id) for book_id, score in scores.items()),
+            )
+        return [book_id for _, _, book_id in ranked]
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def _catalog(repository) -> Iterator[Dict[str, Any]]:
+    after = None
+    while True:
+        page = repository.select(
+            "books",
+            order="title",
+            limit=LOAD_PAGE_SIZE,
+            columns=["id", "title", "author", "isbn"],
+            after=after,
+        )
+        yield from page
+        if len(page) < LOAD_PAGE_SIZE:
+            return
+        after = (page[-1]["title"], page[-1]["id"])
+
+
+def _load(repository) -> SearchIndex:
+    index = SearchIndex()
+    index.add_many(_catalog(repository))
+    return index
+
+
+def get_index(repository) -> SearchIndex:
+    """Return the shared index, loading the catalog from ``repository`` once."""
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _load(repository)
+    return _index
+
+
+def index_book(book: Dict[str, Any]) -> None:
+    """Apply a single book change to the index if it has been built."""
+    if _index is not None and book.get("id") is not None:
+        _index.add(book)
+
+
+def reset_index() -> None:
+    """Drop the index so the next search reloads it, e.g. after a bulk import."""
+    global _index
+
+    with _index_lock:
+        _index = None
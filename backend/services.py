@@ -5,87 +5,152 @@ Data access layer for the Library Management System.
 from __future__ import annotations
 
 from datetime import date
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
-from postgrest import APIError
+from . import circulation, overdue, search
+from .cache import catalog_cache, relay
+from .coalesce import reads
+from .events import MAX_EVENTS, changes
+from .pagination import page_options
+from .storage import get_repository
 
-from .db import get_client
-
-
-def _handle_response(response) -> List[Dict[str, Any]]:
-    error = getattr(response, "error", None)
-    if error:
-        raise APIError(error)
-    data = getattr(response, "data", None)
-    if data is None:
-        return []
-    return data
+# Sort keys for list endpoints; ``id`` breaks ties for stable keyset paging.
+BOOK_SORT_KEY = "title"
+STUDENT_SORT_KEY = "name"
+RECORD_SORT_KEY = "borrow_date"
+OVERDUE_SORT_KEY = "due_date"
+STATS_SORT_KEY = "total_borrows"
+HOLD_SORT_KEY = "seq"
 
 
 def _single(table: str, column: str, value: Any) -> Optional[Dict[str, Any]]:
-    client = get_client()
-    response = (
-        client.table(table)
-        .select("*")
-        .eq(column, value)
-        .limit(1)
-        .execute()
-    )
-    data = _handle_response(response)
+    data = get_repository().select(table, filters={column: value}, limit=1)
     return data[0] if data else None
 
 
-# ------------------------- BOOK SERVICES ------------------------- #
-def get_book(book_id: int) -> Optional[Dict[str, Any]]:
-    return _single("books", "id", book_id)
+def _list_key(namespace: str, after, limit, fields) -> tuple:
+    return (namespace, after, limit, tuple(fields) if fields else None)
 
 
-def get_books() -> List[Dict[str, Any]]:
-    client = get_client()
-    response = client.table("books").select("*").order("title").execute()
-    return _handle_response(response)
+def _cached_read(key: tuple, loader) -> Any:
+    """Read through the catalog cache; concurrent misses share one query."""
+    return catalog_cache.read_through(key, lambda: reads.do(key, loader))
 
 
-def add_book(title: str, author: str, isbn: Optional[str], total_copies: int) -> Dict[str, Any]:
+def _invalidate_book(book_id: Optional[int]) -> None:
+    """Drop cached entries a change to ``book_id`` could have made stale."""
+    keys = [] if book_id is None else [("book", book_id)]
+    for key in keys:
+        catalog_cache.invalidate(key)
+    catalog_cache.invalidate_namespace("books")
+    reads.forget("book", "books", "dashboard")
+    relay.record(keys, ["books"])
+    changes.notify()
+
+
+def _invalidate_students() -> None:
+    catalog_cache.invalidate_namespace("students")
+    reads.forget("student", "students", "dashboard")
+    relay.record(namespaces=["students"])
+    changes.notify()
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the catalog cache."""
+    return catalog_cache.stats()
+
+
+# ------------------------- BOOK SERVICES ------------------------- #
+def get_book(book_id: int) -> Optional[Dict[str, Any]]:
+    return _cached_read(("book", book_id), lambda: _single("books", "id", book_id))
+
+
+def get_books(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    options = page_options(BOOK_SORT_KEY, after, limit, fields)
+    return _cached_read(
+        _list_key("books", after, limit, fields),
+        lambda: get_repository().select("books", order=BOOK_SORT_KEY, **options),
+    )
+
+
+def _book_payload(
+    title: str, author: str, isbn: Optional[str], total_copies: int
+) -> Dict[str, Any]:
     if total_copies < 1:
         raise ValueError("Total copies must be at least 1.")
 
-    payload = {
+    return {
         "title": title,
         "author": author,
         "isbn": isbn,
         "total_copies": total_copies,
         "available_copies": total_copies,
     }
-    client = get_client()
-    response = client.table("books").insert(payload).execute()
-    data = _handle_response(response)
+
+
+def add_book(title: str, author: str, isbn: Optional[str], total_copies: int) -> Dict[str, Any]:
+    payload = _book_payload(title, author, isbn, total_copies)
+    data = get_repository().insert("books", payload)
+    _invalidate_book(None)
+    if data:
+        search.index_book(data[0])
     return data[0] if data else {}
 
 
 def update_book(book_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
-    client = get_client()
-    response = client.table("books").update(data).eq("id", book_id).execute()
-    updated = _handle_response(response)
+    updated = get_repository().update("books", data, {"id": book_id})
+    # Copies put back on the shelf may have been issued to waiting holds.
+    reads.forget("borrow_records", "loans")
+    _invalidate_book(book_id)
+    if updated:
+        search.index_book(updated[0])
     return updated[0] if updated else {}
 
 
-# ------------------------ STUDENT SERVICES ----------------------- #
-def get_student(student_id: int) -> Optional[Dict[str, Any]]:
-    return _single("students", "id", student_id)
+def _use_search_index(repository, hits: Optional[List[Dict[str, Any]]]) -> bool:
+    # Fall back when the backend has no text index, or when its index is
+    # exact-token only and found nothing (the query may contain a typo).
+    return hits is None or (not hits and not repository.fuzzy_search)
+
+
+def search_books(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Rank books whose title, author or ISBN match ``query``."""
+    if not query.strip():
+        return []
+    repository = get_repository()
+    hits = repository.search_books(query, limit)
+    if not _use_search_index(repository, hits):
+        return hits
+    book_ids = search.get_index(repository).search(query, limit)
+    books = (get_book(book_id) for book_id in book_ids)
+    return [book for book in books if book]
 
 
-def get_students() -> List[Dict[str, Any]]:
-    client = get_client()
-    response = client.table("students").select("*").order("name").execute()
-    return _handle_response(response)
+# ------------------------ STUDENT SERVICES ----------------------- #
+def get_student(student_id: int) -> Optional[Dict[str, Any]]:
+    return _cached_read(("student", student_id), lambda: _single("students", "id", student_id))
+
+
+def get_students(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    options = page_options(STUDENT_SORT_KEY, after, limit, fields)
+    return _cached_read(
+        _list_key("students", after, limit, fields),
+        lambda: get_repository().select("students", order=STUDENT_SORT_KEY, **options),
+    )
 
 
 def add_student(name: str, email: str) -> Dict[str, Any]:
     payload = {"name": name, "email": email}
-    client = get_client()
-    response = client.table("students").insert(payload).execute()
-    data = _handle_response(response)
+    data = get_repository().insert("students", payload)
+    _invalidate_students()
     return data[0] if data else {}
 
 
@@ -94,78 +159,201 @@ def get_borrow_record(record_id: int) -> Optional[Dict[str, Any]]:
     return _single("borrow_records", "id", record_id)
 
 
-def list_borrow_records(status: Optional[str] = None) -> List[Dict[str, Any]]:
-    client = get_client()
-    query = client.table("borrow_records").select("*").order("borrow_date", desc=True)
-    if status:
-        query = query.eq("status", status)
-    response = query.execute()
-    return _handle_response(response)
+def list_borrow_records(
+    status: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    filters = {"status": status} if status else None
+    options = page_options(RECORD_SORT_KEY, after, limit, fields)
+    return reads.do(
+        _list_key("borrow_records", after, limit, fields) + (status,),
+        lambda: get_repository().select(
+            "borrow_records", filters=filters, order=RECORD_SORT_KEY, desc=True, **options
+        ),
+    )
 
 
-def borrow_book(student_id: int, book_id: int) -> Dict[str, Any]:
-    client = get_client()
-
-    student = get_student(student_id)
-    if not student:
-        return {"success": False, "error": "Student does not exist."}
-
-    book = get_book(book_id)
-    if not book:
-        return {"success": False, "error": "Book does not exist."}
-
-    available = book.get("available_copies", 0)
-    if available <= 0:
-        return {"success": False, "error": "No copies available."}
-
-    response = (
-        client.table("borrow_records")
-        .insert(
-            {
-                "student_id": student_id,
-                "book_id": book_id,
-                "borrow_date": str(date.today()),
-                "status": "borrowed",
-            }
-        )
-        .execute()
+def list_loans(
+    status: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Borrow records joined with student name/email and book title/author.
+
+    Reads the ``loan_details`` view, so a page of loans is one query however
+    many students and books it mentions. Paged like :func:`list_borrow_records`.
+    """
+    filters = {"status": status} if status else None
+    options = page_options(RECORD_SORT_KEY, after, limit, fields)
+    return reads.do(
+        _list_key("loans", after, limit, fields) + (status,),
+        lambda: get_repository().select(
+            "loan_details", filters=filters, order=RECORD_SORT_KEY, desc=True, **options
+        ),
     )
-    try:
-        _handle_response(response)
-    except APIError as exc:
-        return {"success": False, "error": str(exc)}
 
-    new_available = max(available - 1, 0)
-    client.table("books").update({"available_copies": new_available}).eq("id", book_id).execute()
 
-    return {"success": True, "message": "Book borrowed successfully."}
+def _overdue_options(after, limit, fields) -> Dict[str, Any]:
+    # Fines are derived from return_date, so projections must keep it.
+    if fields:
+        fields = [*fields, "return_date"]
+    return page_options(OVERDUE_SORT_KEY, after, limit, fields)
+
+
+def list_overdue(
+    status: Optional[str] = "overdue",
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Overdue loans, longest overdue first, with ``days_overdue`` and ``fine``.
+
+    ``status`` is ``"overdue"`` for loans still out, ``"returned"`` for late
+    returns, or None for both.
+    """
+    filters = {"status": status} if status else None
+    rows = get_repository().select(
+        "overdue_details",
+        filters=filters,
+        order=OVERDUE_SORT_KEY,
+        **_overdue_options(after, limit, fields),
+    )
+    return overdue.apply_fines(rows)
+
+
+def refresh_overdue() -> Dict[str, Any]:
+    """Run the incremental overdue job now."""
+    return overdue.refresh()
+
+
+def _loan_result(result: Dict[str, Any], message: str) -> Dict[str, Any]:
+    if not result.get("success"):
+        return result
+    record = result.get("record") or {}
+    reads.forget("borrow_records", "loans")
+    _invalidate_book(record.get("book_id"))
+    shaped = {"success": True, "message": message, "record": result.get("record")}
+    if result.get("hold"):
+        # The returned copy went straight to the next hold in the queue.
+        shaped["hold"] = result["hold"]
+    return shaped
+
+
+def borrow_book(student_id: int, book_id: int) -> Dict[str, Any]:
+    result = get_repository().borrow_book(student_id, book_id, str(date.today()))
+    return _loan_result(result, "Book borrowed successfully.")
 
 
 def return_book(record_id: int) -> Dict[str, Any]:
-    client = get_client()
+    result = get_repository().return_book(record_id, str(date.today()))
+    return _loan_result(result, "Book returned successfully.")
+
+
+def _hold_filters(book_id: Optional[int], status: Optional[str]) -> Dict[str, Any]:
+    filters: Dict[str, Any] = {"book_id": book_id}
+    if status:
+        filters["status"] = status
+    return filters
+
+
+def place_hold(student_id: int, book_id: int) -> Dict[str, Any]:
+    """Queue ``student_id`` for ``book_id``; the next returned copy is theirs."""
+    return get_repository().place_hold(student_id, book_id)
+
+
+def get_hold(hold_id: int) -> Optional[Dict[str, Any]]:
+    """A hold with its current queue ``position`` (None once fulfilled)."""
+    data = get_repository().select("hold_details", filters={"id": hold_id}, limit=1)
+    return data[0] if data else None
 
-    record = get_borrow_record(record_id)
-    if not record:
-        return {"success": False, "error": "Record not found."}
 
-    if record.get("status") == "returned":
-        return {"success": False, "error": "Book already returned."}
+def list_holds(
+    book_id: int,
+    status: Optional[str] = "waiting",
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """A book's hold queue in service order."""
+    options = page_options(HOLD_SORT_KEY, after, limit, fields)
+    return get_repository().select(
+        "hold_details", filters=_hold_filters(book_id, status), order=HOLD_SORT_KEY, **options
+    )
+
+
+def _batch_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    if not result.get("success"):
+        return result
+    items = result.get("results") or []
+    reads.forget("borrow_records", "loans")
+    for item in items:
+        if item.get("success"):
+            _invalidate_book((item.get("record") or {}).get("book_id"))
+    return {
+        "success": True,
+        "succeeded": sum(1 for item in items if item.get("success")),
+        "failed": sum(1 for item in items if not item.get("success")),
+        "results": items,
+    }
+
+
+def borrow_books(student_id: int, book_ids: Sequence[int]) -> Dict[str, Any]:
+    """Issue several books to one student in one transaction, with per-book results."""
+    result = get_repository().borrow_books(student_id, list(book_ids), str(date.today()))
+    return _batch_result(result)
+
+
+def return_books(record_ids: Sequence[int]) -> Dict[str, Any]:
+    """Close several loans in one transaction, with per-record results."""
+    result = get_repository().return_books(list(record_ids), str(date.today()))
+    return _batch_result(result)
 
-    book = get_book(record["book_id"])
-    if not book:
-        return {"success": False, "error": "Book does not exist."}
 
-    client.table("borrow_records").update(
-        {
-            "return_date": str(date.today()),
-            "status": "returned",
-        }
-    ).eq("id", record_id).execute()
+# ---------------------- CIRCULATION SERVICES --------------------- #
+def top_books(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Books by total borrows, most borrowed first, from ``book_stats``."""
+    options = page_options(STATS_SORT_KEY, after, limit, fields)
+    return get_repository().select(
+        "book_circulation", order=STATS_SORT_KEY, desc=True, **options
+    )
+
+
+def top_students(
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Students by total borrows, most active first, from ``student_stats``."""
+    options = page_options(STATS_SORT_KEY, after, limit, fields)
+    return get_repository().select(
+        "student_circulation", order=STATS_SORT_KEY, desc=True, **options
+    )
 
-    total = book.get("total_copies", 0)
-    available = book.get("available_copies", 0)
-    new_available = min(available + 1, total if total else available + 1)
-    client.table("books").update({"available_copies": new_available}).eq("id", book["id"]).execute()
 
-    return {"success": True, "message": "Book returned successfully."}
+def rebuild_circulation_stats() -> Dict[str, int]:
+    """Recompute the circulation counters from borrow history."""
+    return circulation.rebuild()
 
+
+# ------------------------ EVENT SERVICES ------------------------ #
+def list_events(since: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Events after ``since`` in ``seq`` order, or the latest ``limit`` if None."""
+    return get_repository().list_events(since, min(limit, MAX_EVENTS))
+
+
+# ----------------------- DASHBOARD SERVICES ---------------------- #
+def dashboard_summary(
+    inventory_limit: int = 10, top_limit: int = 5, recent_limit: int = 15
+) -> Dict[str, Any]:
+    """Dashboard KPIs aggregated by the database rather than in pandas."""
+    return reads.do(
+        ("dashboard", inventory_limit, top_limit, recent_limit),
+        lambda: get_repository().dashboard_summary(inventory_limit, top_limit, recent_limit),
+    )
@@ -0,0 +1,229 @@
+"""
+State shared by every API worker process on a host.
+
+A single worker keeps its rate-limit buckets, cache and background jobs in
+memory. With ``API_WORKERS > 1`` each process would have its own copy: a
+client gets N times its rate limit, a write evicts the cache of one worker
+only, and every worker runs the overdue job. ``STATE_BACKEND`` selects where
+the state that must agree lives:
+
+* ``memory`` (default): nothing is shared; fine for one worker.
+* ``sqlite``: a WAL-mode file at ``STATE_SQLITE_PATH`` that every worker on
+  the host opens. Each operation is one short transaction.
+
+:func:`set_state` swaps in any other :class:`SharedState`, e.g. one backed by
+a cache service when the workers span several hosts. Components ask
+:func:`get_state` and keep their in-process behaviour when it returns None.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config
+
+# Identifies this process as a lease holder and as a message origin.
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Broadcast messages kept per channel; readers further behind miss the rest.
+MAX_MESSAGES = 10_000
+
+
+class SharedState:
+    """Primitives the per-process components need to agree across workers.
+
+    Calls may block (file locks, network round trips); async callers run
+    them in a thread.
+    """
+
+    def take_token(self, bucket: str, rate: float, burst: float) -> float:
+        """Spend one token from ``bucket``; 0 if allowed, else seconds to wait."""
+        raise NotImplementedError
+
+    def try_lease(self, name: str, owner: str, seconds: float) -> bool:
+        """Take or renew the lease ``name``; False while someone else holds it."""
+        raise NotImplementedError
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def read(self, channel: str, after: int, limit: int = 1000) -> List[Tuple[int, Dict[str, Any]]]:
+        """Messages on ``channel`` with id above ``after``, oldest first."""
+        raise NotImplementedError
+
+    def last_id(self, channel: str) -> int:
+        raise NotImplementedError
+
+
+class SQLiteSharedState(SharedState):
+    """Shared state in a SQLite file, one connection per thread."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS token_buckets (
+        bucket TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_token_buckets_updated_at ON token_buckets (updated_at);
+
+    CREATE TABLE IF NOT EXISTS leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel TEXT NOT NULL,
+        body TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_channel ON messages (channel, id);
+    """
+
+    # Full buckets are dropped every this many takes per connection; a
+    # missing bucket reads as full, so dropping one changes nothing.
+    TRIM_EVERY = 1000
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.takes = 0
+        return conn
+
+    def _write(self, fn, *args):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def take_token(self, bucket: str, rate: float, burst: float) -> float:
+        return self._write(self._take_token, bucket, rate, burst)
+
+    def _take_token(
+        self, conn: sqlite3.Connection, bucket: str, rate: float, burst: float
+    ) -> float:
+        # Wall-clock time, since buckets are refilled by whichever process is next.
+        now = time.time()
+        row = conn.execute(
+            "SELECT tokens, updated_at FROM token_buckets WHERE bucket = ?", (bucket,)
+        ).fetchone()
+        tokens = burst if row is None else min(burst, row[0] + max(now - row[1], 0.0) * rate)
+        wait = 0.0
+        if tokens >= 1.0:
+            tokens -= 1.0
+        else:
+            wait = (1.0 - tokens) / rate
+        conn.execute(
+            "INSERT INTO token_buckets (bucket, tokens, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (bucket) DO UPDATE SET tokens = excluded.tokens, "
+            "updated_at = excluded.updated_at",
+            (bucket, tokens, now),
+        )
+        self._local.takes += 1
+        if self._local.takes % self.TRIM_EVERY == 0:
+            conn.execute(
+                "DELETE FROM token_buckets WHERE updated_at < ?", (now - burst / rate,)
+            )
+        return wait
+
+    def try_lease(self, name: str, owner: str, seconds: float) -> bool:
+        return self._write(self._try_lease, name, owner, seconds)
+
+    @staticmethod
+    def _try_lease(conn: sqlite3.Connection, name: str, owner: str, seconds: float) -> bool:
+        now = time.time()
+        row = conn.execute(
+            "SELECT owner, expires_at FROM leases WHERE name = ?", (name,)
+        ).fetchone()
+        if row is not None and row[0] != owner and row[1] > now:
+            return False
+        conn.execute(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, "
+            "expires_at = excluded.expires_at",
+            (name, owner, now + seconds),
+        )
+        return True
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        self._write(self._publish, channel, message)
+
+    @staticmethod
+    def _publish(conn: sqlite3.Connection, channel: str, message: Dict[str, Any]) -> None:
+        cursor = conn.execute(
+            "INSERT INTO messages (channel, body) VALUES (?, ?)", (channel, json.dumps(message))
+        )
+        if cursor.lastrowid % 100 == 0:
+            conn.execute(
+                "DELETE FROM messages WHERE channel = ? AND id <= ?",
+                (channel, cursor.lastrowid - MAX_MESSAGES),
+            )
+
+    def read(self, channel: str, after: int, limit: int = 1000) -> List[Tuple[int, Dict[str, Any]]]:
+        rows = self._connect().execute(
+            "SELECT id, body FROM messages WHERE channel = ? AND id > ? ORDER BY id LIMIT ?",
+            (channel, after, limit),
+        )
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def last_id(self, channel: str) -> int:
+        row = self._connect().execute(
+            "SELECT MAX(id) FROM messages WHERE channel = ?", (channel,)
+        ).fetchone()
+        return row[0] or 0
+
+
+_state: Optional[SharedState] = None
+_built = False
+_lock = threading.Lock()
+
+
+def _build_state() -> Optional[SharedState]:
+    if config.STATE_BACKEND == "sqlite":
+        return SQLiteSharedState(config.STATE_SQLITE_PATH)
+    if config.STATE_BACKEND != "memory":
+        raise RuntimeError(
+            f"Unknown STATE_BACKEND {config.STATE_BACKEND!r}. Expected one of: memory, sqlite."
+        )
+    return None
+
+
+def get_state() -> Optional[SharedState]:
+    """Return the shared state, or None when each process keeps its own."""
+    global _state, _built
+
+    if not _built:
+        with _lock:
+            if not _built:
+                _state = _build_state()
+                _built = True
+    return _state
+
+
+def set_state(state: Optional[SharedState]) -> None:
+    """Swap the shared state, e.g. for a backend of your own."""
+    global _state, _built
+
+    with _lock:
+        _state = state
+        _built = True
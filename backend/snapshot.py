@@ -0,0 +1,450 @@
+"""
+Columnar snapshots of the catalog and loan history for offline reporting.
+
+A snapshot is a directory holding one raw NumPy column file per field plus a
+``manifest.json`` describing their types. Tables are read a keyset page at a
+time (see :mod:`backend.export`), so writing one never holds more than a page
+of row dicts. Reading one memory-maps the column files, so a report touches
+only the columns it uses and the OS pages them in on demand:
+
+- integers and codes are stored in the narrowest dtype that fits them;
+- ``status`` is dictionary-encoded (small integer codes plus a category list);
+- ``borrow_records.book_id``/``student_id`` are stored as row numbers into the
+  ``books``/``students`` columns (-1 if the row was not in the snapshot), so
+  joins and per-book counts are array indexing and ``bincount``;
+- dates are ``datetime64[D]`` (``NaT`` for null), ``created_at`` is
+  ``datetime64[s]``;
+- text is UTF-8 bytes plus an offsets array; null text reads back as ``""``.
+
+Tables are read one after another, not in one transaction; a book or student
+added mid-snapshot can show up in loans with code -1.
+
+Command line usage::
+
+    python -m backend.snapshot write snapshots/2025-06-01
+    python -m backend.snapshot report snapshots/2025-06-01 --top 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .export import EXPORTS, iter_pages
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+INT = "int"
+CATEGORY = "category"
+REFERENCE = "reference"
+DATE = "date"
+TIMESTAMP = "timestamp"
+TEXT = "text"
+
+# Coded kinds are written as int64 and narrowed once the value range is known.
+_CODED = (INT, CATEGORY, REFERENCE)
+_DTYPES = {DATE: "datetime64[D]", TIMESTAMP: "datetime64[s]"}
+
+
+@dataclass(frozen=True)
+class SnapshotSpec:
+    table: str
+    columns: Tuple[Tuple[str, str], ...]
+    # column -> referenced table, for REFERENCE columns.
+    references: Tuple[Tuple[str, str], ...] = ()
+
+
+# Written in this order: references must point at tables already written.
+SNAPSHOTS: Dict[str, SnapshotSpec] = {
+    "books": SnapshotSpec(
+        "books",
+        (
+            ("id", INT),
+            ("title", TEXT),
+            ("author", TEXT),
+            ("isbn", TEXT),
+            ("total_copies", INT),
+            ("available_copies", INT),
+        ),
+    ),
+    "students": SnapshotSpec(
+        "students",
+        (("id", INT), ("name", TEXT), ("email", TEXT), ("created_at", TIMESTAMP)),
+    ),
+    "borrow_records": SnapshotSpec(
+        "borrow_records",
+        (
+            ("id", INT),
+            ("student_id", REFERENCE),
+            ("book_id", REFERENCE),
+            ("borrow_date", DATE),
+            ("return_date", DATE),
+            ("status", CATEGORY),
+        ),
+        references=(("student_id", "students"), ("book_id", "books")),
+    ),
+}
+
+
+def _narrowest(low: int, high: int) -> str:
+    for dtype in ("int8", "int16", "int32"):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return "int64"
+
+
+class _IdIndex:
+    """Maps ids of a written table to row numbers, vectorized."""
+
+    def __init__(self, ids: np.ndarray) -> None:
+        self._order = np.argsort(ids, kind="stable")
+        self._sorted = np.asarray(ids)[self._order]
+
+    def codes(self, ids: np.ndarray) -> np.ndarray:
+        if not len(self._sorted):
+            return np.full(len(ids), -1, dtype=np.int64)
+        position = np.searchsorted(self._sorted, ids)
+        position = np.minimum(position, len(self._sorted) - 1)
+        found = self._sorted[position] == ids
+        return np.where(found, self._order[position], -1)
+
+
+class _ColumnWriter:
+    def __init__(self, directory: Path, table: str, name: str, kind: str) -> None:
+        self.name = name
+        self.kind = kind
+        self.file = f"{table}.{name}.bin"
+        self.rows = 0
+        self.low = 0
+        self.high = 0
+        self.categories: Dict[str, int] = {}
+        self.index: Optional[_IdIndex] = None
+        self._handle = open(directory / self.file, "wb")
+        if kind == TEXT:
+            self.data_file = f"{table}.{name}.utf8"
+            self._data = open(directory / self.data_file, "wb")
+            self._offset = 0
+            np.zeros(1, dtype=np.int64).tofile(self._handle)
+
+    def append(self, values: List[Any]) -> None:
+        if self.kind == TEXT:
+            encoded = [(value or "").encode("utf-8") for value in values]
+            self._data.write(b"".join(encoded))
+            ends = self._offset + np.cumsum([len(chunk) for chunk in encoded], dtype=np.int64)
+            if len(ends):
+                self._offset = int(ends[-1])
+            ends.tofile(self._handle)
+        elif self.kind in (DATE, TIMESTAMP):
+            width = 10 if self.kind == DATE else 19
+            array = np.array(
+                [str(value)[:width] if value else "NaT" for value in values],
+                dtype=_DTYPES[self.kind],
+            )
+            array.tofile(self._handle)
+        else:
+            if self.kind == CATEGORY:
+                array = np.array(
+                    [-1 if value is None else self._category(value) for value in values],
+                    dtype=np.int64,
+                )
+            else:
+                array = np.array(values, dtype=np.int64)
+                if self.kind == REFERENCE:
+                    array = self.index.codes(array)
+            if len(array):
+                self.low = min(self.low, int(array.min()))
+                self.high = max(self.high, int(array.max()))
+            array.tofile(self._handle)
+        self.rows += len(values)
+
+    def _category(self, value: str) -> int:
+        code = self.categories.get(value)
+        if code is None:
+            code = self.categories[value] = len(self.categories)
+        return code
+
+    def finish(self, directory: Path) -> Dict[str, Any]:
+        self._handle.close()
+        entry: Dict[str, Any] = {"kind": self.kind, "file": self.file}
+        if self.kind == TEXT:
+            self._data.close()
+            entry.update(dtype="int64", data=self.data_file)
+        elif self.kind in _CODED:
+            entry["dtype"] = _narrowest(self.low, self.high)
+            if entry["dtype"] != "int64" and self.rows:
+                path = directory / self.file
+                wide = np.fromfile(path, dtype=np.int64)
+                wide.astype(entry["dtype"]).tofile(path)
+        else:
+            entry["dtype"] = _DTYPES[self.kind]
+        if self.kind == CATEGORY:
+            entry["categories"] = list(self.categories)
+        return entry
+
+
+def _write_table(
+    directory: Path, spec: SnapshotSpec, indexes: Dict[str, _IdIndex]
+) -> Dict[str, Any]:
+    writers = [_ColumnWriter(directory, spec.table, name, kind) for name, kind in spec.columns]
+    references = dict(spec.references)
+    for writer in writers:
+        if writer.kind == REFERENCE:
+            writer.index = indexes[references[writer.name]]
+    rows = 0
+    for page in iter_pages(EXPORTS[spec.table]):
+        for writer in writers:
+            writer.append([row.get(writer.name) for row in page])
+        rows += len(page)
+    columns = {writer.name: writer.finish(directory) for writer in writers}
+    for name, target in spec.references:
+        columns[name]["references"] = target
+    return {"rows": rows, "columns": columns}
+
+
+def write(path: str, tables: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Write a snapshot of ``tables`` (default: all) to ``path``, replacing it.
+
+    Referenced tables are written too. The new snapshot is built next to
+    ``path`` and moved into place at the end, so readers never see a partial
+    one.
+    """
+    wanted = set(tables or SNAPSHOTS)
+    unknown = wanted - set(SNAPSHOTS)
+    if unknown:
+        raise ValueError(
+            f"Unknown snapshot table(s) {', '.join(sorted(unknown))}. "
+            f"Expected: {', '.join(SNAPSHOTS)}."
+        )
+    for name in list(wanted):
+        wanted.update(target for _, target in SNAPSHOTS[name].references)
+
+    target = Path(path)
+    staging = target.with_name(target.name + ".partial")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    manifest: Dict[str, Any] = {
+        "version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tables": {},
+    }
+    indexes: Dict[str, _IdIndex] = {}
+    try:
+        for name, spec in SNAPSHOTS.items():
+            if name not in wanted:
+                continue
+            manifest["tables"][name] = entry = _write_table(staging, spec, indexes)
+            ids = entry["columns"]["id"]
+            indexes[name] = _IdIndex(
+                np.fromfile(staging / ids["file"], dtype=ids["dtype"]).astype(np.int64)
+            )
+        (staging / MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    shutil.rmtree(target, ignore_errors=True)
+    staging.rename(target)
+    return manifest
+
+
+# --------------------------- reading --------------------------- #
+class TextColumn:
+    """UTF-8 strings decoded on access from a memory-mapped buffer."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray) -> None:
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return bytes(self.data[start:end]).decode("utf-8")
+
+    def take(self, rows: Iterable[int]) -> List[str]:
+        return [self[int(row)] for row in rows]
+
+    def tolist(self) -> List[str]:
+        return self.take(range(len(self)))
+
+
+class CategoryColumn:
+    """Dictionary-encoded strings: integer ``codes`` into ``categories``."""
+
+    def __init__(self, codes: np.ndarray, categories: List[str]) -> None:
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def code(self, value: str) -> int:
+        """The code for ``value``, or -1 if it never occurs."""
+        return self.categories.index(value) if value in self.categories else -1
+
+    def counts(self) -> Dict[str, int]:
+        totals = np.bincount(self.codes[self.codes >= 0], minlength=len(self.categories))
+        return dict(zip(self.categories, totals.tolist()))
+
+    def tolist(self) -> List[Optional[str]]:
+        return [self.categories[code] if code >= 0 else None for code in self.codes.tolist()]
+
+
+def _map(path: Path, dtype: str) -> np.ndarray:
+    # mmap cannot map an empty file.
+    if path.stat().st_size == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class SnapshotTable:
+    def __init__(self, snapshot: "Snapshot", name: str, entry: Dict[str, Any]) -> None:
+        self.snapshot = snapshot
+        self.directory = snapshot.path
+        self.name = name
+        self.rows: int = entry["rows"]
+        self.schema: Dict[str, Dict[str, Any]] = entry["columns"]
+        self._columns: Dict[str, Any] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.schema)
+
+    def __getitem__(self, column: str):
+        """A column as a memory-mapped array, :class:`TextColumn` or :class:`CategoryColumn`."""
+        if column not in self._columns:
+            entry = self.schema.get(column)
+            if entry is None:
+                raise KeyError(f"{self.name!r} snapshot has no column {column!r}.")
+            values = _map(self.directory / entry["file"], entry["dtype"])
+            if entry["kind"] == TEXT:
+                values = TextColumn(values, _map(self.directory / entry["data"], "uint8"))
+            elif entry["kind"] == CATEGORY:
+                values = CategoryColumn(values, entry["categories"])
+            self._columns[column] = values
+        return self._columns[column]
+
+    def ids(self, column: str) -> np.ndarray:
+        """A reference column decoded back to the referenced ids (-1 if missing)."""
+        target = self.schema[column].get("references")
+        if target is None:
+            raise ValueError(f"{self.name}.{column} is not a reference column.")
+        codes = np.asarray(self[column])
+        ids = np.asarray(self.snapshot[target]["id"])
+        if not len(ids):
+            return np.full(len(codes), -1, dtype=np.int64)
+        return np.where(codes >= 0, ids[np.maximum(codes, 0)], -1)
+
+    def to_pandas(self, columns: Optional[Iterable[str]] = None):
+        """A DataFrame view; numeric columns are not copied, text and references are decoded."""
+        import pandas as pd
+
+        data = {}
+        for column in columns or self.columns:
+            values = self[column]
+            if "references" in self.schema[column]:
+                data[column] = self.ids(column)
+            elif isinstance(values, CategoryColumn):
+                data[column] = pd.Categorical.from_codes(values.codes, values.categories)
+            elif isinstance(values, TextColumn):
+                data[column] = values.tolist()
+            else:
+                data[column] = values
+        return pd.DataFrame(data, copy=False)
+
+
+class Snapshot:
+    """A snapshot directory opened for reading."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        manifest_path = self.path / MANIFEST
+        if not manifest_path.is_file():
+            raise FileNotFoundError(f"No snapshot at {path!r} (missing {MANIFEST}).")
+        self.manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if self.manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.manifest.get('version')!r}.")
+        self.tables = {
+            name: SnapshotTable(self, name, entry)
+            for name, entry in self.manifest["tables"].items()
+        }
+
+    def __getitem__(self, table: str) -> SnapshotTable:
+        try:
+            return self.tables[table]
+        except KeyError:
+            raise KeyError(f"Snapshot has no table {table!r}.") from None
+
+
+# --------------------------- reporting --------------------------- #
+def report(snapshot: Snapshot, top: int = 10) -> Dict[str, Any]:
+    """Circulation figures over the whole loan history, computed column-wise."""
+    books = snapshot["books"]
+    records = snapshot["borrow_records"]
+    status = records["status"]
+    book_codes = np.asarray(records["book_id"])
+    student_codes = np.asarray(records["student_id"])
+
+    borrows = np.bincount(book_codes[book_codes >= 0], minlength=books.rows)
+    leaders = np.argsort(-borrows, kind="stable")[:top]
+    leaders = leaders[borrows[leaders] > 0]
+    titles = books["title"]
+    ids = books["id"]
+
+    borrowed = status.codes == status.code("borrowed")
+    months, per_month = np.unique(
+        np.asarray(records["borrow_date"]).astype("datetime64[M]"), return_counts=True
+    )
+    return {
+        "records": records.rows,
+        "status_counts": status.counts(),
+        "active_loans": int(np.count_nonzero(borrowed)),
+        "active_borrowers": int(np.unique(student_codes[borrowed & (student_codes >= 0)]).size),
+        "top_borrowed": [
+            {"id": int(ids[row]), "title": titles[int(row)], "borrows": int(borrows[row])}
+            for row in leaders
+        ],
+        "borrows_per_month": {
+            str(month): int(count)
+            for month, count in zip(months, per_month)
+            if not np.isnat(month)
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write or report on a columnar snapshot.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    write_parser = commands.add_parser("write", help="snapshot the configured backend")
+    write_parser.add_argument("path")
+    write_parser.add_argument("--table", action="append", choices=tuple(SNAPSHOTS))
+    report_parser = commands.add_parser("report", help="print circulation figures as JSON")
+    report_parser.add_argument("path")
+    report_parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "write":
+        manifest = write(args.path, args.table)
+        for name, entry in manifest["tables"].items():
+            print(f"{name}: {entry['rows']} rows")
+        return 0
+    try:
+        snapshot = Snapshot(args.path)
+    except (FileNotFoundError, ValueError) as exc:
+        parser.error(str(exc))
+    print(json.dumps(report(snapshot, args.top), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Storage drivers for the Library Management System.
+
+The service layer talks to a :class:`Repository` instead of a concrete client.
+``STORAGE_BACKEND`` in :mod:`backend.config` picks the driver: ``supabase``
+(PostgREST over HTTP, the default) or ``sqlite`` (a local WAL-mode file).
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from .. import config
+from .base import AsyncRepository, Repository, StorageError
+
+_repository: Optional[Repository] = None
+_async_repository: Optional[AsyncRepository] = None
+_lock = threading.Lock()
+
+
+def _build_repository() -> Repository:
+    config.validate_storage_config()
+    if config.STORAGE_BACKEND == "sqlite":
+        from .sqlite_store import SQLiteRepository
+
+        return SQLiteRepository(config.SQLITE_PATH)
+
+    from .supabase_store import SupabaseRepository
+
+    return SupabaseRepository()
+
+
+def get_repository() -> Repository:
+    """Return the singleton repository for the configured backend."""
+    global _repository
+
+    if _repository is None:
+        with _lock:
+            if _repository is None:
+                _repository = _build_repository()
+
+    return _repository
+
+
+def _build_async_repository(repository: Repository) -> AsyncRepository:
+    if config.STORAGE_BACKEND == "supabase":
+        from .supabase_store import AsyncSupabaseRepository, SupabaseRepository
+
+        if isinstance(repository, SupabaseRepository):
+            return AsyncSupabaseRepository(repository)
+
+    return AsyncRepository(repository)
+
+
+def get_async_repository() -> AsyncRepository:
+    """Return the async view of the configured repository."""
+    global _async_repository
+
+    if _async_repository is None:
+        repository = get_repository()
+        with _lock:
+            if _async_repository is None:
+                _async_repository = _build_async_repository(repository)
+
+    return _async_repository
+
+
+def set_repository(repository: Optional[Repository]) -> None:
+    """Swap the active repository, e.g. to point benchmarks at a scratch file."""
+    global _repository, _async_repository
+
+    with _lock:
+        if _repository is not None and _repository is not repository:
+            _repository.close()
+        _repository = repository
+        _async_repository = None
+
+
+__all__ = [
+    "AsyncRepository",
+    "Repository",
+    "StorageError",
+    "get_async_repository",
+    "get_repository",
+    "set_repository",
+]
@@ -0,0 +1,256 @@
+"""
+Repository interface shared by every storage driver.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class StorageError(Exception):
+    """Raised when a storage driver rejects a read or write."""
+
+
+class Repository(ABC):
+    """Table gateway used by :mod:`backend.services`.
+
+    Filters are equality matches keyed by column name. Every method returns
+    rows as plain dictionaries, matching what PostgREST hands back.
+    """
+
+    #: True when :meth:`search_books` already tolerates typos, so an empty
+    #: result should not be retried against the in-process index.
+    fuzzy_search = False
+
+    @abstractmethod
+    def select(
+        self,
+        table: str,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        bounds: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return rows from ``table`` matching ``filters``.
+
+        When ``order`` is given, ``id`` breaks ties in the same direction so
+        ordering is stable. ``after`` is an ``(order value, id)`` keyset: only
+        rows strictly past it are returned. ``columns`` projects the result.
+        ``bounds`` maps a column to an inclusive ``(low, high)`` range; either
+        end may be None.
+        """
+
+    @abstractmethod
+    def insert(self, table: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Insert one row and return it as stored."""
+
+    @abstractmethod
+    def update(
+        self, table: str, data: Dict[str, Any], filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Update rows matching ``filters`` and return them as stored."""
+
+    @abstractmethod
+    def borrow_book(
+        self, student_id: int, book_id: int, borrow_date: str
+    ) -> Dict[str, Any]:
+        """Atomically issue a copy of ``book_id`` to ``student_id``.
+
+        The availability check and decrement happen in the same transaction
+        as the borrow record insert, so concurrent issues cannot oversell.
+        Returns ``{"success": True, "record": {...}}`` or
+        ``{"success": False, "error": "..."}``.
+        """
+
+    @abstractmethod
+    def return_book(self, record_id: int, return_date: str) -> Dict[str, Any]:
+        """Atomically close ``record_id`` and put its copy back on the shelf.
+
+        When the book has holds waiting, the copy is issued to the first one
+        in the same transaction and the result carries it under ``hold``.
+        """
+
+    @abstractmethod
+    def place_hold(self, student_id: int, book_id: int) -> Dict[str, Any]:
+        """Join the FIFO hold queue for a book with no copies available.
+
+        Returns ``{"success": True, "hold": {...}}`` including the hold's
+        ``position`` (1 = next in line), or a success/error result when the
+        student or book does not exist, copies are available, or the student
+        already holds the book.
+        """
+
+    def search_books(self, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Rank books matching ``query`` using a database text index.
+
+        Returns None when the backend has no text index, in which case the
+        service layer falls back to :mod:`backend.search`.
+        """
+        return None
+
+    @abstractmethod
+    def dashboard_summary(
+        self, inventory_limit: int, top_limit: int, recent_limit: int
+    ) -> Dict[str, Any]:
+        """Compute the dashboard KPIs with server-side aggregates.
+
+        Returns ``titles``, ``total_copies``, ``available_copies``,
+        ``active_loans``, ``status_counts``, plus the ``inventory``,
+        ``top_borrowed`` and ``recent_activity`` lists capped at the given
+        limits.
+        """
+
+    @abstractmethod
+    def borrow_books(
+        self, student_id: int, book_ids: List[int], borrow_date: str
+    ) -> Dict[str, Any]:
+        """Issue several books to one student in a single transaction.
+
+        Each book is checked and decremented like :meth:`borrow_book`; books
+        that cannot be issued are reported without undoing the others.
+        Returns ``{"success": True, "results": [...]}`` with one entry per
+        book id, in request order.
+        """
+
+    @abstractmethod
+    def return_books(self, record_ids: List[int], return_date: str) -> Dict[str, Any]:
+        """Close several loans in a single transaction with per-record results."""
+
+    @abstractmethod
+    def upsert_books(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert or update books keyed on ISBN in one multi-row statement.
+
+        Existing titles keep their loans: ``available_copies`` moves by the
+        change in ``total_copies``. Returns the number of rows written.
+        """
+
+    @abstractmethod
+    def upsert_students(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert or update students keyed on email in one multi-row statement."""
+
+    @abstractmethod
+    def refresh_overdue(self, cutoff: str, loan_period_days: int) -> Dict[str, Any]:
+        """Bring the ``overdue_loans`` table up to date in one transaction.
+
+        Loans still ``borrowed`` with ``borrow_date`` before ``cutoff`` are
+        overdue; loans in the same range already returned after their due
+        date are recorded as ``returned`` so their fine is kept. Only the
+        ``borrow_date`` range between the stored watermark and ``cutoff`` is
+        scanned for new ones, and only open overdue rows are checked for
+        returns. Returns ``marked``, ``settled``, ``watermark``
+        and ``previous_watermark``.
+        """
+
+    @abstractmethod
+    def rebuild_circulation_stats(self) -> Dict[str, int]:
+        """Recompute ``book_stats`` and ``student_stats`` from borrow history.
+
+        The counters are normally kept current by the borrow and return
+        transactions themselves; this repairs them after manual edits or
+        restores. Returns the number of rows written per table.
+        """
+
+    @abstractmethod
+    def list_events(self, since: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        """Read the change feed in ``seq`` order.
+
+        Events (``book_added``, ``student_added``, ``borrowed``, ``returned``)
+        are appended by the database in the same transaction as the change.
+        Returns up to ``limit`` events after ``since``, or the latest
+        ``limit`` events when ``since`` is None. An event is only returned once
+        every event before it is visible, so a reader that resumes from the
+        last ``seq`` it saw never skips one.
+        """
+
+    def close(self) -> None:
+        """Release any resources held by the driver."""
+
+
+class AsyncRepository:
+    """Awaitable counterpart of :class:`Repository`.
+
+    The default implementation runs the wrapped sync driver on a worker
+    thread, which is plenty for local SQLite. Drivers with a native async
+    client override the methods they can serve without a thread hop.
+    """
+
+    def __init__(self, repository: Repository) -> None:
+        self.sync = repository
+
+    async def select(
+        self,
+        table: str,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        bounds: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(
+            self.sync.select,
+            table,
+            filters=filters,
+            order=order,
+            desc=desc,
+            limit=limit,
+            columns=columns,
+            after=after,
+            bounds=bounds,
+        )
+
+    async def insert(self, table: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.sync.insert, table, payload)
+
+    async def update(
+        self, table: str, data: Dict[str, Any], filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.sync.update, table, data, filters)
+
+    async def borrow_book(
+        self, student_id: int, book_id: int, borrow_date: str
+    ) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.sync.borrow_book, student_id, book_id, borrow_date)
+
+    async def return_book(self, record_id: int, return_date: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.sync.return_book, record_id, return_date)
+
+    async def place_hold(self, student_id: int, book_id: int) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.sync.place_hold, student_id, book_id)
+
+    async def borrow_books(
+        self, student_id: int, book_ids: List[int], borrow_date: str
+    ) -> Dict[str, Any]:
+        return await asyncio.to_thread(
+            self.sync.borrow_books, student_id, book_ids, borrow_date
+        )
+
+    async def return_books(self, record_ids: List[int], return_date: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.sync.return_books, record_ids, return_date)
+
+    async def search_books(self, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self.sync.search_books, query, limit)
+
+    async def refresh_overdue(self, cutoff: str, loan_period_days: int) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.sync.refresh_overdue, cutoff, loan_period_days)
+
+    async def rebuild_circulation_stats(self) -> Dict[str, int]:
+        return await asyncio.to_thread(self.sync.rebuild_circulation_stats)
+
+    async def list_events(self, since: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.sync.list_events, since, limit)
+
+    async def dashboard_summary(
+        self, inventory_limit: int, top_limit: int, recent_limit: int
+    ) -> Dict[str, Any]:
+        return await asyncio.to_thread(
+            self.sync.dashboard_summary, inventory_limit, top_limit, recent_limit
+        )
@@ -0,0 +1,878 @@
+"""
+Local SQLite storage driver.
+
+Implements the books/students/borrow_records schema from SRS §6.2 together
+with the §6.3 indexes. The database runs in WAL mode so readers never block
+the single writer, and each thread keeps its own connection.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..metrics import db_call
+from ..search import tokenize
+from .base import Repository, StorageError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    isbn TEXT,
+    total_copies INTEGER NOT NULL CHECK (total_copies >= 1),
+    available_copies INTEGER NOT NULL CHECK (available_copies >= 0),
+    CHECK (available_copies <= total_copies)
+);
+
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS borrow_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL REFERENCES students (id),
+    book_id INTEGER NOT NULL REFERENCES books (id),
+    borrow_date TEXT NOT NULL,
+    return_date TEXT,
+    status TEXT NOT NULL CHECK (status IN ('borrowed', 'returned'))
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_books_isbn ON books (isbn);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_students_email ON students (email);
+CREATE INDEX IF NOT EXISTS idx_borrow_records_student_id ON borrow_records (student_id);
+CREATE INDEX IF NOT EXISTS idx_borrow_records_book_id ON borrow_records (book_id);
+CREATE INDEX IF NOT EXISTS idx_borrow_records_status ON borrow_records (status);
+CREATE INDEX IF NOT EXISTS idx_books_title ON books (title, id);
+CREATE INDEX IF NOT EXISTS idx_students_name ON students (name, id);
+CREATE INDEX IF NOT EXISTS idx_borrow_records_borrow_date ON borrow_records (borrow_date, id);
+CREATE INDEX IF NOT EXISTS idx_books_available_copies ON books (available_copies, id);
+CREATE INDEX IF NOT EXISTS idx_borrow_records_status_borrow_date
+    ON borrow_records (status, borrow_date, id);
+
+-- Loans found overdue by the refresh job; ``id`` is the borrow record id.
+CREATE TABLE IF NOT EXISTS overdue_loans (
+    id INTEGER PRIMARY KEY REFERENCES borrow_records (id),
+    due_date TEXT NOT NULL,
+    return_date TEXT,
+    status TEXT NOT NULL CHECK (status IN ('overdue', 'returned'))
+);
+CREATE INDEX IF NOT EXISTS idx_overdue_loans_status_due_date
+    ON overdue_loans (status, due_date, id);
+
+-- Progress markers for incremental background jobs.
+CREATE TABLE IF NOT EXISTS job_state (
+    name TEXT PRIMARY KEY,
+    watermark TEXT,
+    updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now'))
+);
+
+-- Loans joined with their student and book so lists need no per-row lookups.
+CREATE VIEW IF NOT EXISTS loan_details AS
+SELECT r.id, r.student_id, r.book_id, r.borrow_date, r.return_date, r.status,
+       s.name AS student_name, s.email AS student_email,
+       b.title AS book_title, b.author AS book_author
+  FROM borrow_records r
+  JOIN students s ON s.id = r.student_id
+  JOIN books b ON b.id = r.book_id;
+
+-- FIFO hold queue per book. ``seq`` numbers holds within their book and
+-- ``hold_queues.head_seq`` is the next one to serve, so a hold's position is
+-- ``seq - head_seq + 1``: two primary-key lookups however long the queue.
+CREATE TABLE IF NOT EXISTS hold_queues (
+    book_id INTEGER PRIMARY KEY REFERENCES books (id),
+    next_seq INTEGER NOT NULL DEFAULT 1,
+    head_seq INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS holds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    book_id INTEGER NOT NULL REFERENCES books (id),
+    student_id INTEGER NOT NULL REFERENCES students (id),
+    seq INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'waiting' CHECK (status IN ('waiting', 'fulfilled')),
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now')),
+    fulfilled_at TEXT,
+    record_id INTEGER REFERENCES borrow_records (id),
+    UNIQUE (book_id, seq)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_waiting_student
+    ON holds (book_id, student_id) WHERE status = 'waiting';
+
+CREATE VIEW IF NOT EXISTS hold_details AS
+SELECT h.id, h.book_id, h.student_id, h.seq, h.status, h.created_at,
+       h.fulfilled_at, h.record_id,
+       CASE WHEN h.status = 'waiting' THEN h.seq - q.head_seq + 1 END AS position
+  FROM holds h
+  JOIN hold_queues q ON q.book_id = h.book_id;
+
+CREATE VIEW IF NOT EXISTS overdue_details AS
+SELECT o.id, r.student_id, r.book_id, r.borrow_date, o.due_date, o.return_date,
+       o.status, s.name AS student_name, s.email AS student_email,
+       b.title AS book_title
+  FROM overdue_loans o
+  JOIN borrow_records r ON r.id = o.id
+  JOIN students s ON s.id = r.student_id
+  JOIN books b ON b.id = r.book_id;
+"""
+
+# Append-only change feed, written by triggers in the same transaction as the
+# change. SQLite has a single writer, so rows become visible in ``seq`` order
+# and a reader can resume from the last ``seq`` it saw.
+EVENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    record_id INTEGER,
+    book_id INTEGER,
+    student_id INTEGER,
+    occurred_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now'))
+);
+
+CREATE TRIGGER IF NOT EXISTS events_book_added AFTER INSERT ON books
+BEGIN
+    INSERT INTO events (kind, book_id) VALUES ('book_added', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_student_added AFTER INSERT ON students
+BEGIN
+    INSERT INTO events (kind, student_id) VALUES ('student_added', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_borrowed AFTER INSERT ON borrow_records
+BEGIN
+    INSERT INTO events (kind, record_id, book_id, student_id)
+    VALUES ('borrowed', NEW.id, NEW.book_id, NEW.student_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_returned AFTER UPDATE OF status ON borrow_records
+WHEN NEW.status = 'returned' AND OLD.status <> 'returned'
+BEGIN
+    INSERT INTO events (kind, record_id, book_id, student_id)
+    VALUES ('returned', NEW.id, NEW.book_id, NEW.student_id);
+END;
+"""
+
+# Per-book and per-student circulation counters, maintained by triggers in
+# the same transaction as the borrow or return that changes them.
+STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS book_stats (
+    book_id INTEGER PRIMARY KEY REFERENCES books (id),
+    total_borrows INTEGER NOT NULL DEFAULT 0,
+    active_loans INTEGER NOT NULL DEFAULT 0,
+    last_borrowed TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_book_stats_total_borrows
+    ON book_stats (total_borrows, book_id);
+
+CREATE TABLE IF NOT EXISTS student_stats (
+    student_id INTEGER PRIMARY KEY REFERENCES students (id),
+    total_borrows INTEGER NOT NULL DEFAULT 0,
+    active_loans INTEGER NOT NULL DEFAULT 0,
+    last_borrowed TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_student_stats_total_borrows
+    ON student_stats (total_borrows, student_id);
+
+CREATE TRIGGER IF NOT EXISTS circulation_stats_insert AFTER INSERT ON borrow_records BEGIN
+    INSERT INTO book_stats (book_id, total_borrows, active_loans, last_borrowed)
+    VALUES (new.book_id, 1, new.status = 'borrowed', new.borrow_date)
+    ON CONFLICT (book_id) DO UPDATE SET
+        total_borrows = total_borrows + 1,
+        active_loans = active_loans + (new.status = 'borrowed'),
+        last_borrowed = MAX(COALESCE(last_borrowed, ''), new.borrow_date);
+    INSERT INTO student_stats (student_id, total_borrows, active_loans, last_borrowed)
+    VALUES (new.student_id, 1, new.status = 'borrowed', new.borrow_date)
+    ON CONFLICT (student_id) DO UPDATE SET
+        total_borrows = total_borrows + 1,
+        active_loans = active_loans + (new.status = 'borrowed'),
+        last_borrowed = MAX(COALESCE(last_borrowed, ''), new.borrow_date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS circulation_stats_status AFTER UPDATE OF status ON borrow_records
+WHEN old.status IS NOT new.status BEGIN
+    UPDATE book_stats
+       SET active_loans = active_loans + (new.status = 'borrowed') - (old.status = 'borrowed')
+     WHERE book_id = new.book_id;
+    UPDATE student_stats
+       SET active_loans = active_loans + (new.status = 'borrowed') - (old.status = 'borrowed')
+     WHERE student_id = new.student_id;
+END;
+
+CREATE VIEW IF NOT EXISTS book_circulation AS
+SELECT s.book_id AS id, b.title, b.author, s.total_borrows, s.active_loans, s.last_borrowed
+  FROM book_stats s
+  JOIN books b ON b.id = s.book_id;
+
+CREATE VIEW IF NOT EXISTS student_circulation AS
+SELECT s.student_id AS id, st.name, st.email, s.total_borrows, s.active_loans, s.last_borrowed
+  FROM student_stats s
+  JOIN students st ON st.id = s.student_id;
+"""
+
+# Full-text index over the catalog, kept in sync by triggers. Updates that
+# only touch available_copies (every borrow/return) do not fire them.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title, author, isbn,
+    content='books', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+    INSERT INTO books_fts (rowid, title, author, isbn)
+    VALUES (new.id, new.title, new.author, new.isbn);
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author, isbn)
+    VALUES ('delete', old.id, old.title, old.author, old.isbn);
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author, isbn ON books BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author, isbn)
+    VALUES ('delete', old.id, old.title, old.author, old.isbn);
+    INSERT INTO books_fts (rowid, title, author, isbn)
+    VALUES (new.id, new.title, new.author, new.isbn);
+END;
+"""
+
+# Column weights for bm25(): title matches count most, ISBN least.
+FTS_RANK = "bm25(books_fts, 10.0, 5.0, 1.0)"
+
+COLUMNS = {
+    "books": ("id", "title", "author", "isbn", "total_copies", "available_copies"),
+    "students": ("id", "name", "email", "created_at"),
+    "borrow_records": (
+        "id",
+        "student_id",
+        "book_id",
+        "borrow_date",
+        "return_date",
+        "status",
+    ),
+    "loan_details": (
+        "id",
+        "student_id",
+        "book_id",
+        "borrow_date",
+        "return_date",
+        "status",
+        "student_name",
+        "student_email",
+        "book_title",
+        "book_author",
+    ),
+    "book_circulation": (
+        "id",
+        "title",
+        "author",
+        "total_borrows",
+        "active_loans",
+        "last_borrowed",
+    ),
+    "student_circulation": (
+        "id",
+        "name",
+        "email",
+        "total_borrows",
+        "active_loans",
+        "last_borrowed",
+    ),
+    "hold_details": (
+        "id",
+        "book_id",
+        "student_id",
+        "seq",
+        "status",
+        "created_at",
+        "fulfilled_at",
+        "record_id",
+        "position",
+    ),
+    "overdue_details": (
+        "id",
+        "student_id",
+        "book_id",
+        "borrow_date",
+        "due_date",
+        "return_date",
+        "status",
+        "student_name",
+        "student_email",
+        "book_title",
+    ),
+}
+
+OVERDUE_JOB = "overdue"
+
+
+def _check_columns(table: str, columns) -> None:
+    known = COLUMNS.get(table)
+    if known is None:
+        raise StorageError(f"Unknown table {table!r}.")
+    for column in columns:
+        if column not in known:
+            raise StorageError(f"Unknown column {column!r} on {table!r}.")
+
+
+def _where(
+    table: str,
+    filters: Optional[Dict[str, Any]],
+    bounds: Optional[Dict[str, Tuple[Any, Any]]] = None,
+):
+    clauses: List[str] = []
+    params: List[Any] = []
+    if filters:
+        _check_columns(table, filters)
+        clauses.extend(f"{column} = ?" for column in filters)
+        params.extend(filters.values())
+    if bounds:
+        _check_columns(table, bounds)
+        for column, (low, high) in bounds.items():
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+    if not clauses:
+        return "", []
+    return f" WHERE {' AND '.join(clauses)}", params
+
+
+def _student_exists(conn: sqlite3.Connection, student_id: int) -> bool:
+    row = conn.execute("SELECT 1 FROM students WHERE id = ?", (student_id,)).fetchone()
+    return row is not None
+
+
+def _issue(
+    conn: sqlite3.Connection, student_id: int, book_id: int, borrow_date: str
+) -> Dict[str, Any]:
+    """Take one copy off the shelf and record the loan. Caller holds the write lock."""
+    taken = conn.execute(
+        "UPDATE books SET available_copies = available_copies - 1 "
+        "WHERE id = ? AND available_copies > 0 RETURNING id",
+        (book_id,),
+    ).fetchone()
+    if taken is None:
+        book = conn.execute("SELECT 1 FROM books WHERE id = ?", (book_id,)).fetchone()
+        if book is None:
+            return {"success": False, "error": "Book does not exist."}
+        return {"success": False, "error": "No copies available."}
+
+    record = conn.execute(
+        "INSERT INTO borrow_records (student_id, book_id, borrow_date, status) "
+        "VALUES (?, ?, ?, 'borrowed') RETURNING *",
+        (student_id, book_id, borrow_date),
+    ).fetchone()
+    return {"success": True, "record": dict(record)}
+
+
+def _enqueue_hold(conn: sqlite3.Connection, student_id: int, book_id: int) -> Dict[str, Any]:
+    """Append a hold to the book's queue. Caller holds the write lock."""
+    book = conn.execute(
+        "SELECT available_copies FROM books WHERE id = ?", (book_id,)
+    ).fetchone()
+    if book is None:
+        return {"success": False, "error": "Book does not exist."}
+    if book["available_copies"] > 0:
+        return {"success": False, "error": "Copies are available; borrow the book instead."}
+    waiting = conn.execute(
+        "SELECT 1 FROM holds WHERE book_id = ? AND student_id = ? AND status = 'waiting'",
+        (book_id, student_id),
+    ).fetchone()
+    if waiting is not None:
+        return {"success": False, "error": "Student already has a hold on this book."}
+    # Sequence numbers must stay gapless, or the queue would stall at the gap.
+    queue = conn.execute(
+        "INSERT INTO hold_queues (book_id, next_seq) VALUES (?, 2) "
+        "ON CONFLICT (book_id) DO UPDATE SET next_seq = next_seq + 1 "
+        "RETURNING next_seq - 1 AS seq, head_seq",
+        (book_id,),
+    ).fetchone()
+    hold = conn.execute(
+        "INSERT INTO holds (book_id, student_id, seq) VALUES (?, ?, ?) RETURNING *",
+        (book_id, student_id, queue["seq"]),
+    ).fetchone()
+    return {
+        "success": True,
+        "hold": {**dict(hold), "position": queue["seq"] - queue["head_seq"] + 1},
+    }
+
+
+def _allocate_hold(
+    conn: sqlite3.Connection, book_id: int, borrow_date: str
+) -> Optional[Dict[str, Any]]:
+    """Issue a just-returned copy to the head of the book's hold queue, if any."""
+    head = conn.execute(
+        "SELECT h.id, h.student_id, h.seq FROM hold_queues q "
+        "JOIN holds h ON h.book_id = q.book_id AND h.seq = q.head_seq "
+        "WHERE q.book_id = ? AND h.status = 'waiting'",
+        (book_id,),
+    ).fetchone()
+    if head is None:
+        return None
+    issued = _issue(conn, head["student_id"], book_id, borrow_date)
+    if not issued["success"]:
+        return None
+    hold = conn.execute(
+        "UPDATE holds SET status = 'fulfilled', fulfilled_at = ?, record_id = ? "
+        "WHERE id = ? RETURNING *",
+        (borrow_date, issued["record"]["id"], head["id"]),
+    ).fetchone()
+    conn.execute(
+        "UPDATE hold_queues SET head_seq = ? WHERE book_id = ?", (head["seq"] + 1, book_id)
+    )
+    return {**dict(hold), "position": None}
+
+
+def _serve_holds(conn: sqlite3.Connection, borrow_date: str) -> None:
+    """Issue shelf copies to waiting holds, oldest first. Caller holds the write lock.
+
+    Returns hand their copy over in :func:`_restock`; this covers copies that
+    reach the shelf any other way (an edited count, a re-import), so a walk-in
+    borrow never takes one ahead of the queue.
+    """
+    books = conn.execute(
+        "SELECT q.book_id FROM hold_queues q JOIN books b ON b.id = q.book_id "
+        "WHERE q.head_seq < q.next_seq AND b.available_copies > 0"
+    ).fetchall()
+    for book in books:
+        while _allocate_hold(conn, book["book_id"], borrow_date) is not None:
+            pass
+
+
+def _restock(conn: sqlite3.Connection, record_id: int, return_date: str) -> Dict[str, Any]:
+    """Close one loan and put its copy back. Caller holds the write lock.
+
+    If the book has holds waiting, the copy goes straight to the first one in
+    the same transaction, so it never shows as available in between.
+    """
+    record = conn.execute(
+        "SELECT book_id, status FROM borrow_records WHERE id = ?", (record_id,)
+    ).fetchone()
+    if record is None:
+        return {"success": False, "error": "Record not found."}
+    if record["status"] == "returned":
+        return {"success": False, "error": "Book already returned."}
+
+    restocked = conn.execute(
+        "UPDATE books SET available_copies = "
+        "MIN(available_copies + 1, total_copies) WHERE id = ? RETURNING id",
+        (record["book_id"],),
+    ).fetchone()
+    if restocked is None:
+        return {"success": False, "error": "Book does not exist."}
+
+    closed = conn.execute(
+        "UPDATE borrow_records SET status = 'returned', return_date = ? "
+        "WHERE id = ? RETURNING *",
+        (return_date, record_id),
+    ).fetchone()
+    result = {"success": True, "record": dict(closed)}
+    hold = _allocate_hold(conn, record["book_id"], return_date)
+    if hold is not None:
+        result["hold"] = hold
+    return result
+
+
+def _rebuild_stats(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Recompute every circulation counter from ``borrow_records``."""
+    counts = {}
+    for table, key in (("book_stats", "book_id"), ("student_stats", "student_id")):
+        conn.execute(f"DELETE FROM {table}")
+        counts[table] = conn.execute(
+            f"INSERT INTO {table} ({key}, total_borrows, active_loans, last_borrowed) "
+            f"SELECT {key}, COUNT(*), SUM(status = 'borrowed'), MAX(borrow_date) "
+            f"FROM borrow_records GROUP BY {key}"
+        ).rowcount
+    return counts
+
+
+class SQLiteRepository(Repository):
+    """Repository backed by a local SQLite database file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.executescript(EVENTS_SCHEMA)
+        self._install_stats(conn)
+        self.has_fts = self._install_fts(conn)
+
+    def _install_stats(self, conn: sqlite3.Connection) -> None:
+        existed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'book_stats'"
+        ).fetchone()
+        conn.executescript(STATS_SCHEMA)
+        if existed is None:
+            # Databases created before the counters existed start from history.
+            self.rebuild_circulation_stats()
+
+    @staticmethod
+    def _install_fts(conn: sqlite3.Connection) -> bool:
+        existed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'books_fts'"
+        ).fetchone()
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; search falls back to backend.search.
+            return False
+        if existed is None:
+            conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                isolation_level=None,
+                check_same_thread=False,
+                uri=self.path.startswith("file:"),
+                timeout=30,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(
+        self, mode: str = "IMMEDIATE", operation: str = "transaction"
+    ) -> Iterator[sqlite3.Connection]:
+        """Run a block of statements as one transaction.
+
+        ``IMMEDIATE`` (the default) takes the write lock up front; ``DEFERRED``
+        gives a consistent read snapshot without blocking the writer. The
+        whole block, lock wait included, is timed as one ``operation``.
+        """
+        with db_call(operation):
+            conn = self._connect()
+            conn.execute(f"BEGIN {mode}")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _query(
+        self, sql: str, params=(), operation: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Run one statement; pass ``operation`` unless inside a timed transaction."""
+        try:
+            if operation is None:
+                rows = self._connect().execute(sql, params).fetchall()
+            else:
+                with db_call(operation):
+                    rows = self._connect().execute(sql, params).fetchall()
+        except sqlite3.Error as exc:
+            raise StorageError(str(exc)) from exc
+        return [dict(row) for row in rows]
+
+    def select(
+        self,
+        table: str,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        bounds: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        where, params = _where(table, filters, bounds)
+        projection = "*"
+        if columns:
+            _check_columns(table, columns)
+            projection = ", ".join(columns)
+        sql = f"SELECT {projection} FROM {table}{where}"
+        if order:
+            _check_columns(table, [order])
+            direction = "DESC" if desc else "ASC"
+            if after is not None:
+                sql += " AND " if where else " WHERE "
+                sql += f"({order}, id) {'<' if desc else '>'} (?, ?)"
+                params.extend(after)
+            sql += f" ORDER BY {order} {direction}, id {direction}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._query(sql, params, f"select {table}")
+
+    def insert(self, table: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        _check_columns(table, payload)
+        columns = ", ".join(payload)
+        marks = ", ".join("?" for _ in payload)
+        sql = f"INSERT INTO {table} ({columns}) VALUES ({marks}) RETURNING *"
+        return self._query(sql, list(payload.values()), f"insert {table}")
+
+    def update(
+        self, table: str, data: Dict[str, Any], filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        _check_columns(table, data)
+        assignments = ", ".join(f"{column} = ?" for column in data)
+        where, params = _where(table, filters)
+        sql = f"UPDATE {table} SET {assignments}{where} RETURNING *"
+        if table != "books":
+            return self._query(sql, list(data.values()) + params, f"update {table}")
+        try:
+            with self.transaction(operation="update books") as conn:
+                ids = [row["id"] for row in conn.execute(sql, list(data.values()) + params)]
+                # A raised count may have put copies on the shelf that holds wait for.
+                _serve_holds(conn, date.today().isoformat())
+                marks = ", ".join("?" for _ in ids)
+                rows = conn.execute(f"SELECT * FROM books WHERE id IN ({marks})", ids)
+                return [dict(row) for row in rows]
+        except sqlite3.Error as exc:
+            raise StorageError(str(exc)) from exc
+
+    def borrow_book(
+        self, student_id: int, book_id: int, borrow_date: str
+    ) -> Dict[str, Any]:
+        try:
+            with self.transaction(operation="borrow_book") as conn:
+                if not _student_exists(conn, student_id):
+                    return {"success": False, "error": "Student does not exist."}
+                return _issue(conn, student_id, book_id, borrow_date)
+        except sqlite3.Error as exc:
+            return {"success": False, "error": str(exc)}
+
+    def return_book(self, record_id: int, return_date: str) -> Dict[str, Any]:
+        try:
+            with self.transaction(operation="return_book") as conn:
+                return _restock(conn, record_id, return_date)
+        except sqlite3.Error as exc:
+            return {"success": False, "error": str(exc)}
+
+    def borrow_books(
+        self, student_id: int, book_ids: List[int], borrow_date: str
+    ) -> Dict[str, Any]:
+        try:
+            with self.transaction(operation="borrow_books") as conn:
+                if not _student_exists(conn, student_id):
+                    return {"success": False, "error": "Student does not exist."}
+                results = [
+                    {"book_id": book_id, **_issue(conn, student_id, book_id, borrow_date)}
+                    for book_id in book_ids
+                ]
+        except sqlite3.Error as exc:
+            return {"success": False, "error": str(exc)}
+        return {"success": True, "results": results}
+
+    def return_books(self, record_ids: List[int], return_date: str) -> Dict[str, Any]:
+        try:
+            with self.transaction(operation="return_books") as conn:
+                results = [
+                    {"record_id": record_id, **_restock(conn, record_id, return_date)}
+                    for record_id in record_ids
+                ]
+        except sqlite3.Error as exc:
+            return {"success": False, "error": str(exc)}
+        return {"success": True, "results": results}
+
+    def place_hold(self, student_id: int, book_id: int) -> Dict[str, Any]:
+        try:
+            with self.transaction(operation="place_hold") as conn:
+                if not _student_exists(conn, student_id):
+                    return {"success": False, "error": "Student does not exist."}
+                return _enqueue_hold(conn, student_id, book_id)
+        except sqlite3.Error as exc:
+            return {"success": False, "error": str(exc)}
+
+    def upsert_books(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        marks = ", ".join("(?, ?, ?, ?, ?)" for _ in rows)
+        params: List[Any] = []
+        for row in rows:
+            params.extend(
+                (
+                    row["title"],
+                    row["author"],
+                    row.get("isbn"),
+                    row["total_copies"],
+                    row["available_copies"],
+                )
+            )
+        sql = (
+            "INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+            f"VALUES {marks} "
+            "ON CONFLICT (isbn) DO UPDATE SET "
+            "title = excluded.title, author = excluded.author, "
+            "available_copies = MAX(0, MIN(excluded.total_copies, "
+            "books.available_copies + excluded.total_copies - books.total_copies)), "
+            "total_copies = excluded.total_copies "
+            "RETURNING id"
+        )
+        try:
+            with self.transaction(operation="upsert_books") as conn:
+                count = len(conn.execute(sql, params).fetchall())
+                _serve_holds(conn, date.today().isoformat())
+        except sqlite3.Error as exc:
+            raise StorageError(str(exc)) from exc
+        return count
+
+    def upsert_students(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        marks = ", ".join("(?, ?)" for _ in rows)
+        params: List[Any] = []
+        for row in rows:
+            params.extend((row["name"], row["email"]))
+        sql = (
+            f"INSERT INTO students (name, email) VALUES {marks} "
+            "ON CONFLICT (email) DO UPDATE SET name = excluded.name "
+            "RETURNING id"
+        )
+        return len(self._query(sql, params, "upsert_students"))
+
+    def refresh_overdue(self, cutoff: str, loan_period_days: int) -> Dict[str, Any]:
+        with self.transaction(operation="refresh_overdue") as conn:
+            row = conn.execute(
+                "SELECT watermark FROM job_state WHERE name = ?", (OVERDUE_JOB,)
+            ).fetchone()
+            previous = row["watermark"] if row else None
+            # Loans borrowed before the previous cutoff were handled by earlier
+            # runs, so each branch is a range seek on (status, borrow_date).
+            # Loans already returned late since the last run are recorded too,
+            # or their fine would be lost.
+            period = f"+{int(loan_period_days)} days"
+            marked = conn.execute(
+                "INSERT OR IGNORE INTO overdue_loans (id, due_date, status, return_date) "
+                "SELECT id, date(borrow_date, ?), 'overdue', NULL FROM borrow_records "
+                "WHERE status = 'borrowed' AND borrow_date >= ? AND borrow_date < ? "
+                "UNION ALL "
+                "SELECT id, date(borrow_date, ?), 'returned', return_date FROM borrow_records "
+                "WHERE status = 'returned' AND borrow_date >= ? AND borrow_date < ? "
+                "AND return_date > date(borrow_date, ?)",
+                (period, previous or "", cutoff, period, previous or "", cutoff, period),
+            ).rowcount
+            settled = conn.execute(
+                "UPDATE overdue_loans SET status = 'returned', return_date = r.return_date "
+                "FROM borrow_records r "
+                "WHERE r.id = overdue_loans.id AND overdue_loans.status = 'overdue' "
+                "AND r.status = 'returned'"
+            ).rowcount
+            watermark = max(previous or "", cutoff)
+            conn.execute(
+                "INSERT INTO job_state (name, watermark) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET watermark = excluded.watermark, "
+                "updated_at = strftime('%Y-%m-%dT%H:%M:%S', 'now')",
+                (OVERDUE_JOB, watermark),
+            )
+        return {
+            "marked": marked,
+            "settled": settled,
+            "watermark": watermark,
+            "previous_watermark": previous,
+        }
+
+    def rebuild_circulation_stats(self) -> Dict[str, int]:
+        with self.transaction(operation="rebuild_circulation_stats") as conn:
+            return _rebuild_stats(conn)
+
+    def search_books(self, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        if not self.has_fts:
+            return None
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Every term must match; each is a prefix query so results update as
+        # the user types.
+        match = " AND ".join(f'"{term}"*' for term in terms)
+        return self._query(
+            "SELECT b.* FROM ("
+            f"  SELECT rowid, {FTS_RANK} AS score FROM books_fts"
+            "   WHERE books_fts MATCH ? ORDER BY score LIMIT ?"
+            ") AS hits JOIN books b ON b.id = hits.rowid "
+            "ORDER BY hits.score, b.title",
+            (match, limit),
+            "search_books",
+        )
+
+    def list_events(self, since: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        if since is None:
+            latest = self._query(
+                "SELECT * FROM events ORDER BY seq DESC LIMIT ?", (limit,), "list_events"
+            )
+            return latest[::-1]
+        return self._query(
+            "SELECT * FROM events WHERE seq > ? ORDER BY seq LIMIT ?",
+            (since, limit),
+            "list_events",
+        )
+
+    def dashboard_summary(
+        self, inventory_limit: int, top_limit: int, recent_limit: int
+    ) -> Dict[str, Any]:
+        with self.transaction("DEFERRED", "dashboard_summary"):
+            return self._dashboard_summary(inventory_limit, top_limit, recent_limit)
+
+    def _dashboard_summary(
+        self, inventory_limit: int, top_limit: int, recent_limit: int
+    ) -> Dict[str, Any]:
+        totals = self._query(
+            "SELECT COUNT(*) AS titles, "
+            "COALESCE(SUM(total_copies), 0) AS total_copies, "
+            "COALESCE(SUM(available_copies), 0) AS available_copies FROM books"
+        )[0]
+        status_counts = {
+            row["status"]: row["count"]
+            for row in self._query(
+                "SELECT status, COUNT(*) AS count FROM borrow_records GROUP BY status"
+            )
+        }
+        inventory = self._query(
+            "SELECT title, author, available_copies, total_copies FROM books "
+            "ORDER BY available_copies DESC, id DESC LIMIT ?",
+            (inventory_limit,),
+        )
+        top_borrowed = self._query(
+            "SELECT title, total_borrows AS borrows FROM book_circulation "
+            "ORDER BY total_borrows DESC, id DESC LIMIT ?",
+            (top_limit,),
+        )
+        top_students = self._query(
+            "SELECT name, total_borrows AS borrows, active_loans FROM student_circulation "
+            "ORDER BY total_borrows DESC, id DESC LIMIT ?",
+            (top_limit,),
+        )
+        recent_activity = self._query(
+            "SELECT * FROM borrow_records ORDER BY borrow_date DESC, id DESC LIMIT ?",
+            (recent_limit,),
+        )
+        return {
+            **totals,
+            "active_loans": status_counts.get("borrowed", 0),
+            "status_counts": status_counts,
+            "inventory": inventory,
+            "top_borrowed": top_borrowed,
+            "top_students": top_students,
+            "recent_activity": recent_activity,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,317 @@
+"""
+Supabase (PostgREST) storage driver.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from postgrest import APIError
+
+from ..db import get_async_client, get_client
+from ..metrics import db_call
+from .base import AsyncRepository, Repository, StorageError
+
+
+def _handle_response(response) -> List[Dict[str, Any]]:
+    error = getattr(response, "error", None)
+    if error:
+        raise StorageError(str(error))
+    data = getattr(response, "data", None)
+    if data is None:
+        return []
+    return data
+
+
+def _execute(query, operation: str) -> List[Dict[str, Any]]:
+    try:
+        with db_call(operation):
+            response = query.execute()
+    except APIError as exc:
+        raise StorageError(str(exc)) from exc
+    return _handle_response(response)
+
+
+async def _aexecute(query, operation: str) -> List[Dict[str, Any]]:
+    try:
+        with db_call(operation):
+            response = await query.execute()
+    except APIError as exc:
+        raise StorageError(str(exc)) from exc
+    return _handle_response(response)
+
+
+def _apply_filters(query, filters: Optional[Dict[str, Any]]):
+    for column, value in (filters or {}).items():
+        query = query.eq(column, value)
+    return query
+
+
+def _quote(value: Any) -> str:
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _keyset_filter(order: str, desc: bool, after: Tuple[Any, int]) -> str:
+    value, last_id = after
+    op = "lt" if desc else "gt"
+    quoted = _quote(value)
+    return f"{order}.{op}.{quoted},and({order}.eq.{quoted},id.{op}.{int(last_id)})"
+
+
+def _apply_bounds(query, bounds: Optional[Dict[str, Tuple[Any, Any]]]):
+    for column, (low, high) in (bounds or {}).items():
+        if low is not None:
+            query = query.gte(column, low)
+        if high is not None:
+            query = query.lte(column, high)
+    return query
+
+
+def _select_query(
+    client, table, filters, order, desc, limit, columns=None, after=None, bounds=None
+):
+    # The sync and async PostgREST builders share this API; only
+    # ``execute()`` differs.
+    query = client.table(table).select(",".join(columns) if columns else "*")
+    query = _apply_bounds(_apply_filters(query, filters), bounds)
+    if order:
+        if after is not None:
+            query = query.or_(_keyset_filter(order, desc, after))
+        query = query.order(order, desc=desc).order("id", desc=desc)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _rpc_payload(response) -> Any:
+    return getattr(response, "data", None)
+
+
+def _rpc_result(function: str, data: Any) -> Dict[str, Any]:
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return data or {"success": False, "error": f"{function} returned no result."}
+
+
+class SupabaseRepository(Repository):
+    """Repository backed by the shared Supabase client from :mod:`backend.db`."""
+
+    # search_books ranks with pg_trgm word similarity, which absorbs typos.
+    fuzzy_search = True
+
+    def select(
+        self,
+        table: str,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        bounds: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        return _execute(
+            _select_query(
+                get_client(), table, filters, order, desc, limit, columns, after, bounds
+            ),
+            f"select {table}",
+        )
+
+    def insert(self, table: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return _execute(get_client().table(table).insert(payload), f"insert {table}")
+
+    def update(
+        self, table: str, data: Dict[str, Any], filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        return _execute(
+            _apply_filters(get_client().table(table).update(data), filters), f"update {table}"
+        )
+
+    def borrow_book(
+        self, student_id: int, book_id: int, borrow_date: str
+    ) -> Dict[str, Any]:
+        return self._rpc(
+            "borrow_book",
+            {"p_student_id": student_id, "p_book_id": book_id, "p_borrow_date": borrow_date},
+        )
+
+    def return_book(self, record_id: int, return_date: str) -> Dict[str, Any]:
+        return self._rpc(
+            "return_book", {"p_record_id": record_id, "p_return_date": return_date}
+        )
+
+    def place_hold(self, student_id: int, book_id: int) -> Dict[str, Any]:
+        return self._rpc("place_hold", {"p_student_id": student_id, "p_book_id": book_id})
+
+    def borrow_books(
+        self, student_id: int, book_ids: List[int], borrow_date: str
+    ) -> Dict[str, Any]:
+        return self._rpc(
+            "borrow_books",
+            {"p_student_id": student_id, "p_book_ids": book_ids, "p_borrow_date": borrow_date},
+        )
+
+    def return_books(self, record_ids: List[int], return_date: str) -> Dict[str, Any]:
+        return self._rpc(
+            "return_books", {"p_record_ids": record_ids, "p_return_date": return_date}
+        )
+
+    def upsert_books(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        return int(self._call("bulk_upsert_books", {"p_rows": rows}) or 0)
+
+    def upsert_students(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        return int(self._call("bulk_upsert_students", {"p_rows": rows}) or 0)
+
+    def refresh_overdue(self, cutoff: str, loan_period_days: int) -> Dict[str, Any]:
+        return self._call(
+            "refresh_overdue", {"p_cutoff": cutoff, "p_loan_period_days": loan_period_days}
+        )
+
+    def rebuild_circulation_stats(self) -> Dict[str, int]:
+        return self._call("rebuild_circulation_stats", {})
+
+    def search_books(self, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        return self._call("search_books", {"p_query": query, "p_limit": limit}) or []
+
+    def list_events(self, since: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        return self._call("list_events", {"p_since": since, "p_limit": limit}) or []
+
+    def dashboard_summary(
+        self, inventory_limit: int, top_limit: int, recent_limit: int
+    ) -> Dict[str, Any]:
+        return self._call(
+            "dashboard_summary",
+            {
+                "p_inventory_limit": inventory_limit,
+                "p_top_limit": top_limit,
+                "p_recent_limit": recent_limit,
+            },
+        )
+
+    def _call(self, function: str, params: Dict[str, Any]) -> Any:
+        """Call a stored procedure from ``sql/`` and return its payload."""
+        try:
+            with db_call(f"rpc {function}"):
+                response = get_client().rpc(function, params).execute()
+        except APIError as exc:
+            raise StorageError(str(exc)) from exc
+        return _rpc_payload(response)
+
+    def _rpc(self, function: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a stored procedure that returns a success/error result object."""
+        try:
+            return _rpc_result(function, self._call(function, params))
+        except StorageError as exc:
+            return {"success": False, "error": str(exc)}
+
+
+class AsyncSupabaseRepository(AsyncRepository):
+    """Async repository served by the async Supabase client, no thread hops."""
+
+    async def select(
+        self,
+        table: str,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        bounds: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        client = await get_async_client()
+        return await _aexecute(
+            _select_query(client, table, filters, order, desc, limit, columns, after, bounds),
+            f"select {table}",
+        )
+
+    async def insert(self, table: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        client = await get_async_client()
+        return await _aexecute(client.table(table).insert(payload), f"insert {table}")
+
+    async def update(
+        self, table: str, data: Dict[str, Any], filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        client = await get_async_client()
+        return await _aexecute(
+            _apply_filters(client.table(table).update(data), filters), f"update {table}"
+        )
+
+    async def borrow_book(
+        self, student_id: int, book_id: int, borrow_date: str
+    ) -> Dict[str, Any]:
+        return await self._rpc(
+            "borrow_book",
+            {"p_student_id": student_id, "p_book_id": book_id, "p_borrow_date": borrow_date},
+        )
+
+    async def return_book(self, record_id: int, return_date: str) -> Dict[str, Any]:
+        return await self._rpc(
+            "return_book", {"p_record_id": record_id, "p_return_date": return_date}
+        )
+
+    async def place_hold(self, student_id: int, book_id: int) -> Dict[str, Any]:
+        return await self._rpc(
+            "place_hold", {"p_student_id": student_id, "p_book_id": book_id}
+        )
+
+    async def borrow_books(
+        self, student_id: int, book_ids: List[int], borrow_date: str
+    ) -> Dict[str, Any]:
+        return await self._rpc(
+            "borrow_books",
+            {"p_student_id": student_id, "p_book_ids": book_ids, "p_borrow_date": borrow_date},
+        )
+
+    async def return_books(self, record_ids: List[int], return_date: str) -> Dict[str, Any]:
+        return await self._rpc(
+            "return_books", {"p_record_ids": record_ids, "p_return_date": return_date}
+        )
+
+    async def refresh_overdue(self, cutoff: str, loan_period_days: int) -> Dict[str, Any]:
+        return await self._call(
+            "refresh_overdue", {"p_cutoff": cutoff, "p_loan_period_days": loan_period_days}
+        )
+
+    async def rebuild_circulation_stats(self) -> Dict[str, int]:
+        return await self._call("rebuild_circulation_stats", {})
+
+    async def search_books(self, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        return await self._call("search_books", {"p_query": query, "p_limit": limit}) or []
+
+    async def list_events(self, since: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        return await self._call("list_events", {"p_since": since, "p_limit": limit}) or []
+
+    async def dashboard_summary(
+        self, inventory_limit: int, top_limit: int, recent_limit: int
+    ) -> Dict[str, Any]:
+        return await self._call(
+            "dashboard_summary",
+            {
+                "p_inventory_limit": inventory_limit,
+                "p_top_limit": top_limit,
+                "p_recent_limit": recent_limit,
+            },
+        )
+
+    async def _call(self, function: str, params: Dict[str, Any]) -> Any:
+        client = await get_async_client()
+        try:
+            with db_call(f"rpc {function}"):
+                response = await client.rpc(function, params).execute()
+        except APIError as exc:
+            raise StorageError(str(exc)) from exc
+        return _rpc_payload(response)
+
+    async def _rpc(self, function: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return _rpc_result(function, await self._call(function, params))
+        except StorageError as exc:
+            return {"success": False, "error": str(exc)}
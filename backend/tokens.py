@@ -0,0 +1,271 @@
+"""
+Local verification of Supabase Auth access tokens.
+
+Asking GoTrue who a token belongs to costs a network round trip per request.
+Supabase access tokens are JWTs, so the API and the Streamlit pages check
+them in-process instead: the signature against ``SUPABASE_JWT_SECRET``
+(HS256 projects) or the project's JWKS (asymmetric signing keys), then
+``exp``/``nbf`` and the ``aud`` claim. Verified claims are kept in a bounded
+LRU keyed by the raw token, so repeat requests with the same token cost a
+dictionary lookup plus an expiry comparison.
+
+Asymmetric keys need the optional ``PyJWT[crypto]`` package; the JWKS
+document is fetched once and refreshed after ``AUTH_JWKS_TTL_SECONDS`` or
+when a token names an unknown key id (at most every 30 seconds).
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import importlib.util
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from . import config, metrics
+
+HMAC_ALGORITHMS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "EdDSA")
+# An unknown key id refetches the JWKS at most this often.
+JWKS_MIN_REFRESH_SECONDS = 30
+
+VERIFICATIONS = metrics.Counter(
+    "lms_auth_verifications_total",
+    "Access token checks; outcome=cached skipped the signature check.",
+)
+metrics.REGISTRY.append(VERIFICATIONS)
+
+
+class TokenError(Exception):
+    """The token is malformed, badly signed, or not valid for this API."""
+
+
+class TokenExpired(TokenError):
+    """The token was valid but its ``exp`` has passed."""
+
+
+def _b64decode(segment: str) -> bytes:
+    try:
+        return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+    except (ValueError, TypeError) as exc:
+        raise TokenError("Token is not valid base64url.") from exc
+
+
+def _split(token: str) -> Tuple[Dict[str, Any], Dict[str, Any], bytes, bytes]:
+    parts = token.split(".")
+    if len(parts) != 3:
+        raise TokenError("Token must have three segments.")
+    try:
+        header = json.loads(_b64decode(parts[0]))
+        claims = json.loads(_b64decode(parts[1]))
+    except ValueError as exc:
+        raise TokenError("Token header or payload is not JSON.") from exc
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise TokenError("Token header and payload must be JSON objects.")
+    return header, claims, f"{parts[0]}.{parts[1]}".encode(), _b64decode(parts[2])
+
+
+class TokenVerifier:
+    """Verify access tokens locally and remember the ones that passed."""
+
+    def __init__(
+        self,
+        secret: str = "",
+        jwks_url: str = "",
+        audience: str = "",
+        leeway: float = 0,
+        max_tokens: int = 10000,
+        jwks_ttl: float = 600,
+    ) -> None:
+        self.secret = secret.encode()
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.leeway = leeway
+        self.max_tokens = max_tokens
+        self.jwks_ttl = jwks_ttl
+        # token -> claims; only tokens whose signature checked out.
+        self._claims: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._keys_fetched = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.secret or self.jwks_url)
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the token's claims, or raise :class:`TokenError`."""
+        claims = self.cached(token)
+        if claims is not None:
+            return claims
+        try:
+            claims = self._verify(token)
+        except TokenError:
+            VERIFICATIONS.inc((("outcome", "rejected"),))
+            raise
+        VERIFICATIONS.inc((("outcome", "verified"),))
+        with self._lock:
+            self._claims[token] = claims
+            while len(self._claims) > self.max_tokens:
+                self._claims.popitem(last=False)
+        return claims
+
+    def cached(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims for a token verified earlier, if it has not expired since."""
+        with self._lock:
+            claims = self._claims.get(token)
+            if claims is None:
+                return None
+            if self._expired(claims):
+                del self._claims[token]
+                return None
+            self._claims.move_to_end(token)
+        VERIFICATIONS.inc((("outcome", "cached"),))
+        return claims
+
+    def needs_network(self, token: str) -> bool:
+        """True if verifying ``token`` may have to fetch the JWKS document."""
+        try:
+            header = json.loads(_b64decode(token.split(".", 1)[0]))
+        except (ValueError, TokenError):
+            return False
+        return isinstance(header, dict) and header.get("alg") not in HMAC_ALGORITHMS
+
+    def clear(self) -> None:
+        with self._lock:
+            self._claims.clear()
+            self._keys = {}
+            self._keys_fetched = 0.0
+
+    def _verify(self, token: str) -> Dict[str, Any]:
+        if not self.configured:
+            raise TokenError("Token verification is not configured.")
+        header, claims, signing_input, signature = _split(token)
+        algorithm = header.get("alg")
+        if algorithm in HMAC_ALGORITHMS:
+            if not self.secret:
+                raise TokenError(f"No secret is configured for {algorithm} tokens.")
+            expected = hmac.new(self.secret, signing_input, HMAC_ALGORITHMS[algorithm]).digest()
+            if not hmac.compare_digest(expected, signature):
+                raise TokenError("Token signature is invalid.")
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            self._verify_with_jwks(token, header)
+        else:
+            raise TokenError(f"Unsupported token algorithm {algorithm!r}.")
+        self._check_claims(claims)
+        return claims
+
+    def _check_claims(self, claims: Dict[str, Any]) -> None:
+        now = time.time()
+        if "exp" not in claims:
+            raise TokenError("Token has no expiry.")
+        if self._expired(claims, now):
+            raise TokenExpired("Token has expired.")
+        not_before = claims.get("nbf")
+        if isinstance(not_before, (int, float)) and not_before > now + self.leeway:
+            raise TokenError("Token is not valid yet.")
+        if self.audience:
+            audience = claims.get("aud")
+            audiences = audience if isinstance(audience, list) else [audience]
+            if self.audience not in audiences:
+                raise TokenError("Token was issued for a different audience.")
+
+    def _expired(self, claims: Dict[str, Any], now: Optional[float] = None) -> bool:
+        expires = claims.get("exp")
+        if not isinstance(expires, (int, float)):
+            return True
+        return expires + self.leeway <= (time.time() if now is None else now)
+
+    def _verify_with_jwks(self, token: str, header: Dict[str, Any]) -> None:
+        if not self.jwks_url:
+            raise TokenError(f"No JWKS URL is configured for {header.get('alg')} tokens.")
+        if importlib.util.find_spec("jwt") is None:
+            raise TokenError(f"Install PyJWT[crypto] to verify {header.get('alg')} tokens.")
+        import jwt
+
+        jwk = self._signing_key(header.get("kid"))
+        try:
+            # Claims are checked by _check_claims so both paths agree on them.
+            jwt.decode(
+                token,
+                jwt.PyJWK(jwk).key,
+                algorithms=[header["alg"]],
+                options={"verify_exp": False, "verify_nbf": False, "verify_aud": False},
+            )
+        except jwt.PyJWTError as exc:
+            raise TokenError(f"Token signature is invalid: {exc}") from exc
+
+    def _signing_key(self, kid: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            age = time.monotonic() - self._keys_fetched
+            key = self._keys.get(kid or "")
+        if key is not None and age < self.jwks_ttl:
+            return key
+        if key is None and age < JWKS_MIN_REFRESH_SECONDS:
+            # Don't let tokens with made-up key ids trigger a fetch each.
+            raise TokenError(f"Token signing key {kid!r} is not in the JWKS.")
+        keys = self._fetch_keys()
+        with self._lock:
+            self._keys, self._keys_fetched = keys, time.monotonic()
+        key = keys.get(kid or "")
+        if key is None:
+            raise TokenError(f"Token signing key {kid!r} is not in the JWKS.")
+        return key
+
+    def _fetch_keys(self) -> Dict[str, Dict[str, Any]]:
+        import httpx
+
+        try:
+            response = httpx.get(self.jwks_url, timeout=config.DB_CONNECT_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            document = response.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            raise TokenError(f"Could not load signing keys: {exc}") from exc
+        return {key.get("kid", ""): key for key in document.get("keys", [])}
+
+
+_verifier: Optional[TokenVerifier] = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier() -> TokenVerifier:
+    """Return the verifier built from the ``SUPABASE_JWT_*``/``AUTH_*`` settings."""
+    global _verifier
+
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = TokenVerifier(
+                    secret=config.SUPABASE_JWT_SECRET,
+                    jwks_url=config.SUPABASE_JWKS_URL,
+                    audience=config.AUTH_AUDIENCE,
+                    leeway=config.AUTH_LEEWAY_SECONDS,
+                    max_tokens=config.AUTH_CACHE_MAX_TOKENS,
+                    jwks_ttl=config.AUTH_JWKS_TTL_SECONDS,
+                )
+    return _verifier
+
+
+def set_verifier(verifier: Optional[TokenVerifier]) -> None:
+    global _verifier
+
+    with _verifier_lock:
+        _verifier = verifier
+
+
+def verify(token: str) -> Dict[str, Any]:
+    return get_verifier().verify(token)
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Extract the token from an ``Authorization: Bearer <token>`` header."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
@@ -0,0 +1,445 @@
+"""
+Load test for the REST API and the service layer.
+
+Seeds a scratch SQLite database at SRS scale (10k books, 5k students, 50k
+borrow records by default), then runs a concurrent mixed workload of list,
+search, borrow, return and dashboard calls for ``--duration`` seconds.
+Reports throughput and p50/p95/p99 latency per operation and can save the
+results as JSON and compare them with an earlier run.
+
+    python benchmarks/api_load.py --concurrency 32 --duration 30 --output run.json
+    python benchmarks/api_load.py --compare run.json --tolerance 0.2
+
+``--target app`` (the default) drives ``server.app`` in-process over ASGI and
+``--target services`` calls :mod:`backend.services` directly. ``--url`` drives
+a running server over HTTP instead; it seeds through ``STORAGE_BACKEND``, so
+point the server at the same database. Exits non-zero when ``--compare``
+finds a p95 regression beyond ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend import services  # noqa: E402
+from backend.pagination import next_cursor  # noqa: E402
+from backend.services import (  # noqa: E402
+    BOOK_SORT_KEY,
+    RECORD_SORT_KEY,
+    STUDENT_SORT_KEY,
+)
+from backend.storage import get_repository, set_repository  # noqa: E402
+from backend.storage.sqlite_store import SQLiteRepository  # noqa: E402
+
+PAGE_SIZE = 50
+MAX_PAGES = 20
+SEED_CHUNK = 1000
+LOANS_PER_CALL = 10
+RETURNED_SHARE = 0.8
+
+# Relative frequency of each operation in the mixed workload.
+MIX = {
+    "list_books": 20,
+    "list_students": 10,
+    "list_records": 15,
+    "search_books": 10,
+    "borrow": 20,
+    "return": 15,
+    "dashboard": 10,
+}
+SEARCH_TERMS = ("history", "scien", "quantm", "garden", "river", "data", "poetry")
+WORDS = (
+    "ancient atlas bridge century chemistry city code data design digital "
+    "empire forest garden history island journey language machine memory "
+    "modern music network ocean physics poetry quantum river science "
+    "society story systems theory universe voyage water world"
+).split()
+
+
+class Rejected(Exception):
+    """The call completed but the API refused it (4xx / success=False)."""
+
+
+# --------------------------- seeding --------------------------- #
+def _ids(table: str, sort_key: str) -> List[int]:
+    repository = get_repository()
+    ids: List[int] = []
+    after = None
+    while True:
+        page = repository.select(
+            table, order=sort_key, limit=SEED_CHUNK, columns=["id", sort_key], after=after
+        )
+        ids.extend(row["id"] for row in page)
+        if len(page) < SEED_CHUNK:
+            return ids
+        after = (page[-1][sort_key], page[-1]["id"])
+
+
+def seed(books: int, students: int, records: int, rng: random.Random) -> List[int]:
+    """Populate the configured backend and return the ids of the open loans."""
+    repository = get_repository()
+    stamp = time.time_ns()
+
+    for start in range(0, books, SEED_CHUNK):
+        rows = []
+        for i in range(start, min(start + SEED_CHUNK, books)):
+            copies = rng.randint(4, 10)
+            rows.append(
+                {
+                    "title": " ".join(rng.sample(WORDS, 3)).title() + f" {i}",
+                    "author": f"Author {rng.randrange(2000)}",
+                    "isbn": f"bench-{stamp}-{i}",
+                    "total_copies": copies,
+                    "available_copies": copies,
+                }
+            )
+        repository.upsert_books(rows)
+
+    for start in range(0, students, SEED_CHUNK):
+        repository.upsert_students(
+            [
+                {"name": f"Student {i}", "email": f"bench-{stamp}-{i}@example.com"}
+                for i in range(start, min(start + SEED_CHUNK, students))
+            ]
+        )
+
+    book_ids = _ids("books", BOOK_SORT_KEY)
+    student_ids = _ids("students", STUDENT_SORT_KEY)
+    today = date.today()
+    loans: List[int] = []
+    for _ in range(0, records, LOANS_PER_CALL):
+        borrowed = today - timedelta(days=rng.randrange(365))
+        result = repository.borrow_books(
+            rng.choice(student_ids), rng.sample(book_ids, LOANS_PER_CALL), str(borrowed)
+        )
+        loans.extend(
+            item["record"]["id"] for item in result.get("results", []) if item.get("success")
+        )
+
+    rng.shuffle(loans)
+    returned = int(len(loans) * RETURNED_SHARE)
+    for start in range(0, returned, SEED_CHUNK // 10):
+        repository.return_books(loans[start : min(start + SEED_CHUNK // 10, returned)], str(today))
+    return loans[returned:]
+
+
+# --------------------------- drivers --------------------------- #
+class HttpDriver:
+    """Issue each operation as a request against the FastAPI app."""
+
+    LISTS = {
+        "list_books": "/books",
+        "list_students": "/students",
+        "list_records": "/borrow-records",
+    }
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+
+    async def _call(self, method: str, path: str, **kwargs) -> httpx.Response:
+        response = await self.client.request(method, path, **kwargs)
+        if response.status_code >= 500:
+            raise RuntimeError(f"{method} {path} -> {response.status_code}")
+        if response.status_code >= 400:
+            raise Rejected(response.text)
+        return response
+
+    async def list_page(self, op: str, cursor: Optional[str]) -> Optional[str]:
+        path = self.LISTS[op]
+        params = {"limit": PAGE_SIZE}
+        if cursor:
+            params["after"] = cursor
+        response = await self._call("GET", path, params=params)
+        return response.headers.get("x-next-cursor")
+
+    async def search(self, query: str) -> None:
+        await self._call("GET", "/books/search", params={"q": query})
+
+    async def borrow(self, student_id: int, book_id: int) -> int:
+        response = await self._call(
+            "POST", "/borrow", json={"student_id": student_id, "book_id": book_id}
+        )
+        return response.json()["record"]["id"]
+
+    async def return_(self, record_id: int) -> None:
+        await self._call("POST", "/return", json={"record_id": record_id})
+
+    async def dashboard(self) -> None:
+        await self._call("GET", "/dashboard")
+
+
+class ServiceDriver:
+    """Call the synchronous service layer from worker threads."""
+
+    LISTS = {
+        "list_books": (services.get_books, BOOK_SORT_KEY),
+        "list_students": (services.get_students, STUDENT_SORT_KEY),
+        "list_records": (services.list_borrow_records, RECORD_SORT_KEY),
+    }
+
+    async def list_page(self, op: str, cursor: Optional[str]) -> Optional[str]:
+        fetch, sort_key = self.LISTS[op]
+        rows = await asyncio.to_thread(fetch, after=cursor, limit=PAGE_SIZE)
+        return next_cursor(rows, sort_key, PAGE_SIZE)
+
+    async def search(self, query: str) -> None:
+        await asyncio.to_thread(services.search_books, query)
+
+    async def borrow(self, student_id: int, book_id: int) -> int:
+        result = await asyncio.to_thread(services.borrow_book, student_id, book_id)
+        if not result.get("success"):
+            raise Rejected(result.get("error"))
+        return result["record"]["id"]
+
+    async def return_(self, record_id: int) -> None:
+        result = await asyncio.to_thread(services.return_book, record_id)
+        if not result.get("success"):
+            raise Rejected(result.get("error"))
+
+    async def dashboard(self) -> None:
+        await asyncio.to_thread(services.dashboard_summary)
+
+
+# --------------------------- workload --------------------------- #
+class Stats:
+    def __init__(self) -> None:
+        self.timings: Dict[str, List[float]] = {op: [] for op in MIX}
+        self.rejected: Dict[str, int] = dict.fromkeys(MIX, 0)
+        self.errors: Dict[str, int] = dict.fromkeys(MIX, 0)
+        self.first_error: Optional[str] = None
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for op, timings in self.timings.items():
+            if not timings:
+                continue
+            timings.sort()
+            pct = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+            endpoints[op] = {
+                "count": len(timings),
+                "rejected": self.rejected[op],
+                "errors": self.errors[op],
+                "throughput": round(len(timings) / elapsed, 1),
+                "mean_ms": round(statistics.fmean(timings), 3),
+                "p50_ms": round(pct[49], 3),
+                "p95_ms": round(pct[94], 3),
+                "p99_ms": round(pct[98], 3),
+                "max_ms": round(timings[-1], 3),
+            }
+        total = sum(len(timings) for timings in self.timings.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "throughput": round(total / elapsed, 1),
+            "errors": sum(self.errors.values()),
+            "endpoints": endpoints,
+        }
+
+
+async def worker(driver, stats: Stats, context: Dict[str, Any], deadline: float, rng) -> None:
+    ops, weights = list(MIX), list(MIX.values())
+    cursors: Dict[str, Optional[str]] = {}
+    pages: Dict[str, int] = {}
+    open_loans: List[int] = context["open_loans"]
+
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        if op == "return" and not open_loans:
+            op = "borrow"
+        started = time.perf_counter()
+        try:
+            if op.startswith("list_"):
+                cursor = await driver.list_page(op, cursors.get(op))
+                pages[op] = pages.get(op, 0) + 1
+                # Walk a few pages deep, then start over from the top.
+                cursors[op] = cursor if pages[op] % MAX_PAGES else None
+            elif op == "search_books":
+                await driver.search(rng.choice(SEARCH_TERMS))
+            elif op == "borrow":
+                record_id = await driver.borrow(
+                    rng.choice(context["student_ids"]), rng.choice(context["book_ids"])
+                )
+                open_loans.append(record_id)
+            elif op == "return":
+                index = rng.randrange(len(open_loans))
+                open_loans[index], open_loans[-1] = open_loans[-1], open_loans[index]
+                await driver.return_(open_loans.pop())
+            else:
+                await driver.dashboard()
+        except Rejected:
+            stats.rejected[op] += 1
+        except Exception as exc:  # pylint: disable=broad-except
+            stats.errors[op] += 1
+            stats.first_error = stats.first_error or f"{op}: {exc}"
+        stats.timings[op].append((time.perf_counter() - started) * 1000)
+
+
+async def run_workload(driver, context, concurrency: int, duration: float, seed_value: int):
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        *(
+            worker(driver, stats, context, deadline, random.Random(seed_value + i))
+            for i in range(concurrency)
+        )
+    )
+    return stats.summary(time.perf_counter() - started), stats.first_error
+
+
+async def drive(args, context) -> tuple:
+    if args.target == "services" and not args.url:
+        return await run_workload(
+            ServiceDriver(), context, args.concurrency, args.duration, args.seed
+        )
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60)
+    else:
+        from server import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60
+        )
+    async with client:
+        return await run_workload(
+            HttpDriver(client), context, args.concurrency, args.duration, args.seed
+        )
+
+
+# --------------------------- reporting --------------------------- #
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(
+        f"{'operation':<14}{'count':>8}{'rej':>6}{'err':>5}{'ops/s':>9}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"
+    )
+    for op, row in result["endpoints"].items():
+        print(
+            f"{op:<14}{row['count']:>8}{row['rejected']:>6}{row['errors']:>5}"
+            f"{row['throughput']:>9.1f}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+            f"{row['p99_ms']:>9.2f}"
+        )
+    print(
+        f"total: {result['requests']} requests in {result['elapsed_s']:.1f}s "
+        f"({result['throughput']:.1f} req/s), {result['errors']} errors"
+    )
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> int:
+    """Print p95 deltas against ``baseline``; return the number of regressions."""
+    regressions = 0
+    print(f"\np95 vs baseline {baseline.get('meta', {}).get('revision') or '?'}:")
+    for op, row in result["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(op)
+        if not before or not before["p95_ms"]:
+            continue
+        change = row["p95_ms"] / before["p95_ms"] - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"  {op:<14}{before['p95_ms']:>9.2f} -> {row['p95_ms']:>9.2f}  {change:+.0%}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--students", type=int, default=5_000)
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--target", choices=("app", "services"), default="app")
+    parser.add_argument("--url", help="drive a running server instead of the in-process app")
+    parser.add_argument(
+        "--configured",
+        action="store_true",
+        help="use STORAGE_BACKEND instead of a scratch SQLite file",
+    )
+    parser.add_argument("--no-seed", action="store_true", help="reuse existing data")
+    parser.add_argument("--seed", type=int, default=7, help="random seed")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        if not args.configured and not args.url:
+            set_repository(SQLiteRepository(str(Path(scratch) / "load.db")))
+        try:
+            rng = random.Random(args.seed)
+            started = time.perf_counter()
+            open_loans = [] if args.no_seed else seed(args.books, args.students, args.records, rng)
+            seed_seconds = time.perf_counter() - started
+            context = {
+                "book_ids": _ids("books", BOOK_SORT_KEY),
+                "student_ids": _ids("students", STUDENT_SORT_KEY),
+                "open_loans": open_loans,
+            }
+            if not args.no_seed:
+                print(
+                    f"seeded {args.books} books, {args.students} students, "
+                    f"{args.records} records in {seed_seconds:.1f}s"
+                )
+            result, first_error = asyncio.run(drive(args, context))
+        finally:
+            set_repository(None)
+
+    result["meta"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "target": args.url or args.target,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "books": args.books,
+        "students": args.students,
+        "records": args.records,
+        "seed_s": round(seed_seconds, 3),
+    }
+    print_report(result)
+    if first_error:
+        print(f"first error: {first_error}")
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote {args.output}")
+
+    failed = 1 if result["errors"] else 0
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        failed |= 1 if compare(result, baseline, args.tolerance) else 0
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Concurrency check for the atomic borrow/return path.
+
+Many threads try to borrow the same book at once. Exactly ``copies`` issues
+must succeed, ``available_copies`` must land on zero, and returning every loan
+in parallel must restore the shelf count. Exits non-zero on any violation.
+
+    python benchmarks/borrow_contention.py --threads 64 --attempts 500 --copies 25
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend import services  # noqa: E402
+from backend.storage import get_repository, set_repository  # noqa: E402
+from backend.storage.sqlite_store import SQLiteRepository  # noqa: E402
+
+
+def run(threads: int, attempts: int, copies: int) -> int:
+    book = services.add_book("Contended Title", "Bench Author", None, copies)
+    students = [
+        services.add_student(f"Student {i}", f"contention-{time.time_ns()}-{i}@example.com")
+        for i in range(attempts)
+    ]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(
+            pool.map(lambda student: services.borrow_book(student["id"], book["id"]), students)
+        )
+    borrow_elapsed = time.perf_counter() - started
+
+    issued = [result["record"] for result in results if result.get("success")]
+    failures = 0
+    shelf = services.get_book(book["id"])["available_copies"]
+    if len(issued) != copies:
+        print(f"FAIL: {len(issued)} borrows succeeded for {copies} copies")
+        failures += 1
+    if shelf != 0:
+        print(f"FAIL: available_copies is {shelf} after draining, expected 0")
+        failures += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        returns = list(pool.map(lambda record: services.return_book(record["id"]), issued))
+    return_elapsed = time.perf_counter() - started
+
+    shelf = services.get_book(book["id"])["available_copies"]
+    if not all(result.get("success") for result in returns):
+        print("FAIL: a return of an issued record was rejected")
+        failures += 1
+    if shelf != copies:
+        print(f"FAIL: available_copies is {shelf} after returns, expected {copies}")
+        failures += 1
+
+    print(
+        f"borrow: {attempts} attempts on {threads} threads in {borrow_elapsed:.3f}s "
+        f"({attempts / borrow_elapsed:.0f} ops/s), {len(issued)} issued"
+    )
+    print(
+        f"return: {len(issued)} returns in {return_elapsed:.3f}s "
+        f"({len(issued) / max(return_elapsed, 1e-9):.0f} ops/s)"
+    )
+    print("OK" if not failures else f"{failures} invariant(s) violated")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--copies", type=int, default=10)
+    parser.add_argument(
+        "--configured",
+        action="store_true",
+        help="run against STORAGE_BACKEND instead of a scratch SQLite file",
+    )
+    args = parser.parse_args()
+
+    if args.configured:
+        get_repository()
+        return run(args.threads, args.attempts, args.copies)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        set_repository(SQLiteRepository(str(Path(scratch) / "contention.db")))
+        try:
+            return run(args.threads, args.attempts, args.copies)
+        finally:
+            set_repository(None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
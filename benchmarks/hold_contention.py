@@ -0,0 +1,162 @@
+"""
+Contention check for the hold queue on one popular title.
+
+Every copy of the title is on loan when many students place holds on it at
+once. The queue must number them gaplessly, a position lookup must cost the
+same at the back of the queue as at the front, and returning loans in
+parallel must hand each copy to the next hold in FIFO order until the queue
+is empty and the shelf is full again. Exits non-zero on any violation.
+
+    python benchmarks/hold_contention.py --threads 64 --holds 2000 --copies 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import queue
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend import services  # noqa: E402
+from backend.storage import get_repository, set_repository  # noqa: E402
+from backend.storage.sqlite_store import SQLiteRepository  # noqa: E402
+
+LOOKUPS = 200
+
+
+def _lookup_ms(hold_id: int) -> float:
+    started = time.perf_counter()
+    for _ in range(LOOKUPS):
+        services.get_hold(hold_id)
+    return (time.perf_counter() - started) / LOOKUPS * 1000
+
+
+def run(threads: int, holds: int, copies: int) -> int:
+    stamp = time.time_ns()
+    book = services.add_book("Popular Title", "Bench Author", None, copies)
+    students = [
+        services.add_student(f"Holder {i}", f"holds-{stamp}-{i}@example.com")
+        for i in range(copies + holds)
+    ]
+    loans = [
+        services.borrow_book(student["id"], book["id"])["record"]
+        for student in students[:copies]
+    ]
+    failures = 0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        placed = list(
+            pool.map(
+                lambda student: services.place_hold(student["id"], book["id"]),
+                students[copies:],
+            )
+        )
+    place_elapsed = time.perf_counter() - started
+
+    queued = [result["hold"] for result in placed if result.get("success")]
+    if len(queued) != holds:
+        print(f"FAIL: {len(queued)} of {holds} holds were queued")
+        failures += 1
+    if sorted(hold["position"] for hold in queued) != list(range(1, len(queued) + 1)):
+        print("FAIL: hold positions are not a gapless 1..n sequence")
+        failures += 1
+
+    by_seq = sorted(queued, key=lambda hold: hold["seq"])
+    front_ms = _lookup_ms(by_seq[0]["id"])
+    back_ms = _lookup_ms(by_seq[-1]["id"])
+    back_position = services.get_hold(by_seq[-1]["id"])["position"]
+    if back_position != len(queued):
+        print(f"FAIL: last hold reports position {back_position}, expected {len(queued)}")
+        failures += 1
+
+    # Each return hands its copy to the next hold, whose new loan is returned
+    # in turn, so `copies` chains drain the queue concurrently.
+    pending: "queue.Queue[int]" = queue.Queue()
+    for loan in loans:
+        pending.put(loan["id"])
+    allocated = []
+
+    def drain() -> None:
+        while True:
+            try:
+                record_id = pending.get(timeout=0.5)
+            except queue.Empty:
+                return
+            result = services.return_book(record_id)
+            if result.get("hold"):
+                allocated.append(result["hold"])
+                pending.put(result["hold"]["record_id"])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(threads):
+            pool.submit(drain)
+    drain_elapsed = time.perf_counter() - started
+
+    if len(allocated) != len(queued):
+        print(f"FAIL: {len(allocated)} holds fulfilled, expected {len(queued)}")
+        failures += 1
+    # Copies are issued as loans in allocation order, so record ids must rise
+    # with the hold sequence if the queue was served first-in, first-out.
+    served = [hold["record_id"] for hold in sorted(allocated, key=lambda hold: hold["seq"])]
+    if served != sorted(served):
+        print("FAIL: holds were not served in FIFO order")
+        failures += 1
+    waiting = services.list_holds(book["id"], limit=1)
+    if waiting:
+        print(f"FAIL: hold {waiting[0]['id']} is still waiting after the drain")
+        failures += 1
+    shelf = services.get_book(book["id"])["available_copies"]
+    if shelf != copies:
+        print(f"FAIL: available_copies is {shelf} after the drain, expected {copies}")
+        failures += 1
+
+    print(
+        f"place: {holds} holds on {threads} threads in {place_elapsed:.3f}s "
+        f"({holds / place_elapsed:.0f} ops/s)"
+    )
+    print(
+        f"position lookup: front {front_ms:.3f}ms, back (#{len(queued)}) {back_ms:.3f}ms"
+    )
+    print(
+        f"drain: {len(allocated)} returns allocated to holds in {drain_elapsed:.3f}s "
+        f"({len(allocated) / max(drain_elapsed, 1e-9):.0f} ops/s)"
+    )
+    print("OK" if not failures else f"{failures} invariant(s) violated")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--holds", type=int, default=500)
+    parser.add_argument("--copies", type=int, default=3)
+    parser.add_argument(
+        "--configured",
+        action="store_true",
+        help="run against STORAGE_BACKEND instead of a scratch SQLite file",
+    )
+    args = parser.parse_args()
+
+    if args.configured:
+        get_repository()
+        return run(args.threads, args.holds, args.copies)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        set_repository(SQLiteRepository(str(Path(scratch) / "holds.db")))
+        try:
+            return run(args.threads, args.holds, args.copies)
+        finally:
+            set_repository(None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Cold-start import time for the API worker and each Streamlit page.
+
+Every target is imported in a fresh interpreter ``--runs`` times and the
+median wall time is reported, together with the slowest modules from one
+``python -X importtime`` run. The API target is ``import server``; a page
+target runs the page's top-level import statements (with the page's
+directory on ``sys.path``, as Streamlit does), which is the part of a page
+run that does not depend on a browser session. Targets whose dependencies
+are not installed are reported as skipped.
+
+    python benchmarks/import_time.py --runs 7 --output imports.json
+    python benchmarks/import_time.py --compare imports.json --tolerance 0.2
+
+Exits non-zero when ``--compare`` finds a target that got slower than
+``--tolerance`` allows, or when ``--budget-ms`` is exceeded by the API.
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FRONTEND_DIR = ROOT_DIR / "frontend"
+
+MARKER = "-- target imports start --"
+
+TIMER = """
+import sys, time
+sys.path[:0] = {paths!r}
+sys.stderr.write({marker!r} + "\\n")
+started = time.perf_counter()
+{body}
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def targets() -> Dict[str, Tuple[List[str], str]]:
+    """Target name -> (sys.path entries, import code)."""
+    found = {"api": ([str(ROOT_DIR)], "import server")}
+    for page in [FRONTEND_DIR / "Home.py", *sorted((FRONTEND_DIR / "pages").glob("*.py"))]:
+        tree = ast.parse(page.read_text(encoding="utf-8"))
+        imports = [
+            ast.unparse(node)
+            for node in tree.body
+            if isinstance(node, ast.Import)
+            or (isinstance(node, ast.ImportFrom) and node.module != "__future__")
+        ]
+        name = page.relative_to(FRONTEND_DIR).with_suffix("").as_posix()
+        found[name] = ([str(page.parent), str(FRONTEND_DIR), str(ROOT_DIR)], "\n".join(imports))
+    return found
+
+
+def _run(paths: List[str], body: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", TIMER.format(paths=paths, marker=MARKER, body=body)]
+    # Run outside the repo so the current directory adds nothing to sys.path.
+    return subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        cwd=str(ROOT_DIR.parent),
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        check=False,
+    )
+
+
+def _slowest(stderr: str, top: int) -> List[Dict[str, Any]]:
+    """The target's own imports and their direct children, slowest first."""
+    rows = []
+    lines = stderr.splitlines()
+    for line in lines[lines.index(MARKER) + 1 :] if MARKER in lines else []:
+        fields = line[len("import time:") :].split("|")
+        if not line.startswith("import time:") or len(fields) != 3:
+            continue
+        if not fields[1].strip().isdigit():
+            continue
+        # importtime indents each nesting level by two spaces.
+        depth = (len(fields[2]) - len(fields[2].lstrip()) - 1) // 2
+        if depth <= 1:
+            rows.append({"module": fields[2].strip(), "ms": int(fields[1]) / 1000})
+    rows.sort(key=lambda row: row["ms"], reverse=True)
+    return [{"module": row["module"], "ms": round(row["ms"], 1)} for row in rows[:top]]
+
+
+def measure(paths: List[str], body: str, runs: int, top: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(runs):
+        result = _run(paths, body)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+            return {"skipped": error}
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    profile = _run(paths, body, importtime=True)
+    return {
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+        "slowest": _slowest(profile.stderr, top),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"{'target':<20}{'median':>9}{'min':>9}{'max':>9}  (ms)")
+    for name, row in result["targets"].items():
+        if "skipped" in row:
+            print(f"{name:<20}  skipped: {row['skipped']}")
+            continue
+        print(f"{name:<20}{row['median_ms']:>9.1f}{row['min_ms']:>9.1f}{row['max_ms']:>9.1f}")
+        for module in row["slowest"]:
+            print(f"{'':<22}{module['ms']:>8.1f}  {module['module']}")
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> int:
+    """Print median deltas against ``baseline``; return the number of regressions."""
+    regressions = 0
+    print(f"\nmedian vs baseline {baseline.get('meta', {}).get('revision') or '?'}:")
+    for name, row in result["targets"].items():
+        before = baseline.get("targets", {}).get(name)
+        if "skipped" in row or not before or not before.get("median_ms"):
+            continue
+        change = row["median_ms"] / before["median_ms"] - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"  {name:<20}{before['median_ms']:>9.1f} -> {row['median_ms']:>9.1f}  "
+            f"{change:+.0%}{flag}"
+        )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=5, help="slowest modules to list")
+    parser.add_argument("--target", action="append", help="only these targets (repeatable)")
+    parser.add_argument("--budget-ms", type=float, help="fail if the API median exceeds this")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed median growth")
+    args = parser.parse_args()
+
+    result: Dict[str, Any] = {"targets": {}}
+    for name, (paths, body) in targets().items():
+        if args.target and name not in args.target:
+            continue
+        result["targets"][name] = measure(paths, body, args.runs, args.top)
+    result["meta"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+    }
+    print_report(result)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote {args.output}")
+
+    failed = 0
+    api = result["targets"].get("api", {})
+    if args.budget_ms and api.get("median_ms", 0) > args.budget_ms:
+        print(f"FAIL: api cold start {api['median_ms']:.1f}ms exceeds {args.budget_ms:.1f}ms")
+        failed = 1
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        failed |= 1 if compare(result, baseline, args.tolerance) else 0
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(main())
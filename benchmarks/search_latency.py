@@ -0,0 +1,132 @@
+"""
+Search latency over a synthetic catalog.
+
+Seeds a scratch SQLite database with ``--titles`` books and times
+``services.search_books`` for a mix of exact, prefix and misspelled queries,
+once through the SQLite FTS5 index and once through the in-process fallback
+index. Reports p50/p95/p99 in milliseconds.
+
+    python benchmarks/search_latency.py --titles 100000 --queries 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend import search, services  # noqa: E402
+from backend.storage import set_repository  # noqa: E402
+from backend.storage.sqlite_store import SQLiteRepository  # noqa: E402
+
+WORDS = (
+    "ancient art atlas beyond bridge century chemistry city code dark data "
+    "design digital dream empire engineering forest garden genetics history "
+    "house island journey kingdom language light machine mathematics memory "
+    "modern mountain music network night ocean physics poetry principles "
+    "programming quantum river science secret shadow silent society stars "
+    "story structure systems theory time truth universe voyage war water world"
+).split()
+SURNAMES = (
+    "adams baker carter davis evans fischer garcia harris ivanova jensen khan "
+    "lopez martin nakamura okafor patel quinn rossi silva tanaka umar vargas "
+    "williams xu yamada zhang"
+).split()
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+
+
+def seed(titles: int, rng: random.Random) -> None:
+    rows = []
+    for i in range(titles):
+        rows.append(
+            {
+                "title": " ".join(rng.sample(WORDS, rng.randint(2, 5))).title() + f" {i}",
+                "author": f"{rng.choice(SURNAMES).title()} {rng.choice(SURNAMES).title()}",
+                "isbn": f"978{i:010d}",
+                "total_copies": rng.randint(1, 5),
+                "available_copies": 1,
+            }
+        )
+        if len(rows) == 1000:
+            services.get_repository().upsert_books(rows)
+            rows = []
+    services.get_repository().upsert_books(rows)
+
+
+def queries(count: int, rng: random.Random):
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            yield " ".join(rng.sample(WORDS, 2))
+        elif kind < 0.7:
+            yield rng.choice(WORDS)[:4]
+        elif kind < 0.9:
+            yield _typo(rng.choice(WORDS), rng)
+        else:
+            yield rng.choice(SURNAMES)
+
+
+def measure(label: str, workload, limit: int) -> None:
+    timings = []
+    for query in workload:
+        started = time.perf_counter()
+        services.search_books(query, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    pct = statistics.quantiles(timings, n=100)
+    print(
+        f"{label:<10} n={len(timings)} p50={pct[49]:.2f}ms "
+        f"p95={pct[94]:.2f}ms p99={pct[98]:.2f}ms max={timings[-1]:.2f}ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--titles", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as scratch:
+        repository = SQLiteRepository(str(Path(scratch) / "search.db"))
+        set_repository(repository)
+        try:
+            started = time.perf_counter()
+            seed(args.titles, rng)
+            print(f"seeded {args.titles} titles in {time.perf_counter() - started:.1f}s")
+
+            # Zero-hit FTS5 queries fall back to the in-process index; build it
+            # up front so its one-time load is not charged to a single query.
+            started = time.perf_counter()
+            search.get_index(repository)
+            print(f"built in-process index in {time.perf_counter() - started:.1f}s")
+
+            workload = list(queries(args.queries, rng))
+            measure("fts5", workload, args.limit)
+
+            repository.has_fts = False
+            measure("in-process", workload, args.limit)
+        finally:
+            search.reset_index()
+            set_repository(None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Offline reporting from row dicts versus a memory-mapped columnar snapshot.
+
+Seeds a scratch SQLite database with a long loan history, then computes the
+same circulation report two ways: the row path pages every record into a
+list of dicts and builds pandas DataFrames from it (what the dashboard and
+ad-hoc analytics do today), the snapshot path writes a columnar snapshot
+once and reports over its memory-mapped columns. Prints time and peak
+Python-heap allocation for each and exits non-zero if the reports disagree.
+
+    python benchmarks/snapshot_report.py --records 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import pandas as pd  # noqa: E402
+
+from backend import snapshot  # noqa: E402
+from backend.export import EXPORTS, iter_pages  # noqa: E402
+from backend.storage import set_repository  # noqa: E402
+from backend.storage.sqlite_store import SQLiteRepository  # noqa: E402
+
+SEED_CHUNK = 10_000
+TOP = 10
+
+
+def seed(path: str, books: int, students: int, records: int, rng: random.Random) -> None:
+    """Bulk-insert straight into the scratch file; the service layer is not under test."""
+    today = date.today()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+            "VALUES (?, ?, ?, 5, 5)",
+            ((f"Title {i}", f"Author {i % 997}", f"snap-{i}") for i in range(books)),
+        )
+        conn.executemany(
+            "INSERT INTO students (name, email) VALUES (?, ?)",
+            ((f"Student {i}", f"snap-{i}@example.com") for i in range(students)),
+        )
+    for start in range(0, records, SEED_CHUNK):
+        rows = []
+        for _ in range(start, min(start + SEED_CHUNK, records)):
+            borrowed = today - timedelta(days=rng.randrange(3 * 365))
+            returned = rng.random() < 0.9
+            rows.append(
+                (
+                    rng.randrange(1, students + 1),
+                    rng.randrange(1, books + 1),
+                    str(borrowed),
+                    str(borrowed + timedelta(days=rng.randrange(30))) if returned else None,
+                    "returned" if returned else "borrowed",
+                )
+            )
+        with conn:
+            conn.executemany(
+                "INSERT INTO borrow_records (student_id, book_id, borrow_date, return_date, "
+                "status) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+    conn.close()
+
+
+def row_report() -> Dict[str, Any]:
+    books = pd.DataFrame([row for page in iter_pages(EXPORTS["books"]) for row in page])
+    records = pd.DataFrame(
+        [row for page in iter_pages(EXPORTS["borrow_records"]) for row in page]
+    )
+    borrows = records.groupby("book_id").size().rename("borrows")
+    leaders = (
+        books.set_index("id")
+        .join(borrows, how="inner")
+        .reset_index()
+        .sort_values(["borrows"], ascending=False, kind="stable")
+        .head(TOP)
+    )
+    borrowed = records[records["status"] == "borrowed"]
+    months = pd.to_datetime(records["borrow_date"]).dt.strftime("%Y-%m")
+    return {
+        "records": len(records),
+        "status_counts": records["status"].value_counts().to_dict(),
+        "active_loans": len(borrowed),
+        "active_borrowers": int(borrowed["student_id"].nunique()),
+        "top_borrows": sorted(leaders["borrows"].tolist(), reverse=True),
+        "borrows_per_month": months.value_counts().sort_index().to_dict(),
+    }
+
+
+def snapshot_report(path: str) -> Dict[str, Any]:
+    result = snapshot.report(snapshot.Snapshot(path), TOP)
+    result["top_borrows"] = [row["borrows"] for row in result.pop("top_borrowed")]
+    return result
+
+
+def measure(fn: Callable[[], Any]) -> Tuple[Any, float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=7, help="random seed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        database = str(Path(scratch) / "history.db")
+        set_repository(SQLiteRepository(database))
+        try:
+            started = time.perf_counter()
+            seed(database, args.books, args.students, args.records, random.Random(args.seed))
+            print(f"seeded {args.records} records in {time.perf_counter() - started:.1f}s")
+
+            rows, row_seconds, row_mib = measure(row_report)
+            target = str(Path(scratch) / "snapshot")
+            _, write_seconds, write_mib = measure(lambda: snapshot.write(target))
+            columns, column_seconds, column_mib = measure(lambda: snapshot_report(target))
+        finally:
+            set_repository(None)
+        size = sum(path.stat().st_size for path in Path(target).iterdir()) / 2**20
+
+    print(f"{'path':<18}{'seconds':>10}{'peak MiB':>10}")
+    print(f"{'rows + pandas':<18}{row_seconds:>10.2f}{row_mib:>10.1f}")
+    print(
+        f"{'snapshot write':<18}{write_seconds:>10.2f}{write_mib:>10.1f}"
+        f"  ({size:.1f} MiB on disk)"
+    )
+    print(f"{'snapshot report':<18}{column_seconds:>10.3f}{column_mib:>10.1f}")
+
+    mismatches = [key for key in rows if rows[key] != columns.get(key)]
+    for key in mismatches:
+        print(f"FAIL: {key} differs: rows={rows[key]!r} snapshot={columns.get(key)!r}")
+    print("OK" if not mismatches else f"{len(mismatches)} field(s) differ")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
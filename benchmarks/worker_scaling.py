@@ -0,0 +1,236 @@
+"""
+API throughput as the number of worker processes grows.
+
+Seeds a scratch SQLite database, then for each worker count starts
+``python server.py --workers N`` with a shared ``STATE_BACKEND=sqlite`` and
+drives it over HTTP from ``--clients`` load processes. Two workloads run for
+``--duration`` seconds each: ``list`` pages ``GET /books`` and ``borrow``
+loops ``POST /borrow`` then ``POST /return``. Prints requests per second per
+workload and the scaling efficiency against one worker
+(``rps(N) / (N * rps(1))``).
+
+    python benchmarks/worker_scaling.py --workers 1,2,4,8 --duration 10
+
+Run it on a machine with at least as many idle cores as the largest worker
+count plus the load clients, or the clients and workers compete for CPU.
+SQLite takes one writer at a time, so ``borrow`` is bounded by the database
+file rather than the workers; against Supabase writes scale on the database
+side. Exits non-zero when ``list`` efficiency at the largest worker count
+falls below ``--min-efficiency``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.storage.sqlite_store import SQLiteRepository  # noqa: E402
+
+PAGE_SIZE = 50
+WORKLOADS = ("list", "borrow")
+
+
+def seed(path: str, books: int, students: int) -> None:
+    SQLiteRepository(path).close()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+            "VALUES (?, ?, ?, 1000, 1000)",
+            ((f"Title {i}", f"Author {i % 97}", f"scale-{i}") for i in range(books)),
+        )
+        conn.executemany(
+            "INSERT INTO students (name, email) VALUES (?, ?)",
+            ((f"Student {i}", f"scale-{i}@example.com") for i in range(students)),
+        )
+    conn.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, database: str, state: str) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": database,
+        "STATE_BACKEND": "sqlite",
+        "STATE_SQLITE_PATH": state,
+        "IDEMPOTENCY_SQLITE_PATH": str(Path(state).with_name("idempotency.db")),
+        "OVERDUE_JOB_INTERVAL_SECONDS": "0",
+        "SLOW_REQUEST_SECONDS": "0",
+    }
+    command = [sys.executable, "server.py", "--workers", str(workers), "--no-reload"]
+    process = subprocess.Popen(
+        command + ["--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                # Every worker must be up, not only the first to bind.
+                time.sleep(0.5 * workers)
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not become healthy")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def _drive(
+    url: str,
+    workload: str,
+    concurrency: int,
+    duration: float,
+    books: int,
+    students: int,
+    seed_value: int,
+) -> Tuple[int, int]:
+    rng = random.Random(seed_value)
+    done = errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        deadline = time.monotonic() + duration
+
+        async def loop() -> None:
+            nonlocal done, errors
+            while time.monotonic() < deadline:
+                try:
+                    if workload == "list":
+                        response = await client.get("/books", params={"limit": PAGE_SIZE})
+                        response.raise_for_status()
+                        done += 1
+                        continue
+                    response = await client.post(
+                        "/borrow",
+                        json={
+                            "student_id": rng.randint(1, students),
+                            "book_id": rng.randint(1, books),
+                        },
+                    )
+                    response.raise_for_status()
+                    record_id = response.json()["record"]["id"]
+                    response = await client.post("/return", json={"record_id": record_id})
+                    response.raise_for_status()
+                    done += 2
+                except httpx.HTTPError:
+                    errors += 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return done, errors
+
+
+def _client(args: Tuple) -> Tuple[int, int]:
+    return asyncio.run(_drive(*args))
+
+
+def measure(url: str, workload: str, args, pool) -> Tuple[float, int]:
+    jobs = [
+        (url, workload, args.concurrency, args.duration, args.books, args.students, args.seed + i)
+        for i in range(args.clients)
+    ]
+    started = time.perf_counter()
+    results = pool.map(_client, jobs)
+    elapsed = time.perf_counter() - started
+    return sum(done for done, _ in results) / elapsed, sum(errors for _, errors in results)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    default_workers = ",".join(
+        str(n) for n in (1, 2, 4, 8, 16, 32) if n <= (os.cpu_count() or 1)
+    )
+    parser.add_argument("--workers", default=default_workers, help="comma-separated counts")
+    parser.add_argument("--clients", type=int, default=0, help="load processes (0 = max workers)")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per client")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per workload")
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7, help="random seed")
+    parser.add_argument("--min-efficiency", type=float, default=0.7)
+    args = parser.parse_args()
+    counts = sorted({int(value) for value in args.workers.split(",") if value.strip()})
+    args.clients = args.clients or max(counts)
+
+    results: Dict[int, Dict[str, Tuple[float, int]]] = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        database = str(Path(scratch) / "library.db")
+        seed(database, args.books, args.students)
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            for workers in counts:
+                process, url = start_server(workers, database, str(Path(scratch) / "state.db"))
+                try:
+                    results[workers] = {
+                        workload: measure(url, workload, args, pool) for workload in WORKLOADS
+                    }
+                finally:
+                    stop_server(process)
+                rates = ", ".join(
+                    f"{name} {rps:.0f} req/s" for name, (rps, _) in results[workers].items()
+                )
+                print(f"workers={workers}: {rates}")
+
+    base = results[counts[0]]
+    header = "".join(f"{name + ' req/s':>14}{'eff':>7}" for name in WORKLOADS)
+    print(f"\n{'workers':>8}{header}")
+    for workers in counts:
+        row = f"{workers:>8}"
+        for name in WORKLOADS:
+            rps, errors = results[workers][name]
+            scale = workers / counts[0]
+            efficiency = rps / (scale * base[name][0]) if base[name][0] else 0.0
+            row += f"{rps:>14.0f}{efficiency:>7.0%}"
+            if errors:
+                row += f" ({errors} errors)"
+        print(row)
+
+    top = counts[-1]
+    scale = top / counts[0]
+    efficiency = results[top]["list"][0] / (scale * base["list"][0]) if base["list"][0] else 0.0
+    if efficiency < args.min_efficiency:
+        print(f"FAIL: list efficiency at {top} workers is {efficiency:.0%}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
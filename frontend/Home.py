@@ -8,17 +8,11 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
-from backend import services
+import data_cache
+from auth_guard import require_admin
 
 st.set_page_config(page_title="Library Dashboard", page_icon="📚", layout="wide")
 
-
-def require_admin() -> None:
-    if not st.session_state.get("supabase_user"):
-        st.error("Please log in via the Login page to access the admin dashboard.")
-        st.stop()
-
-
 require_admin()
 
 st.markdown(
@@ -47,18 +41,8 @@ st.markdown(
 st.title("📚 Library Management – Admin Dashboard")
 st.caption("Bold overview of books, students, and circulation activity.")
 
-books = services.get_books()
-students = services.get_students()
-borrowed_records = services.list_borrow_records()
-
-books_df = pd.DataFrame(books)
-students_df = pd.DataFrame(students)
-borrow_df = pd.DataFrame(borrowed_records)
-
-active_loans = borrow_df[borrow_df["status"] == "borrowed"] if not borrow_df.empty else pd.DataFrame()
-
-total_books = int(books_df["total_copies"].sum()) if not books_df.empty else 0
-available_books = int(books_df["available_copies"].sum()) if not books_df.empty else 0
+data_cache.sync_events()
+summary = data_cache.dashboard_summary()
 
 col1, col2, col3, col4 = st.columns(4)
 with col1:
@@ -66,7 +50,7 @@ with col1:
         f"""
         <div class="metric-card">
             <div class="metric-label">Titles</div>
-            <div class="metric-value">{len(books)}</div>
+            <div class="metric-value">{summary["titles"]}</div>
         </div>
         """,
         unsafe_allow_html=True,
@@ -76,7 +60,7 @@ with col2:
         f"""
         <div class="metric-card">
             <div class="metric-label">Total Copies</div>
-            <div class="metric-value">{total_books}</div>
+            <div class="metric-value">{summary["total_copies"]}</div>
         </div>
         """,
         unsafe_allow_html=True,
@@ -86,7 +70,7 @@ with col3:
         f"""
         <div class="metric-card">
             <div class="metric-label">Available Copies</div>
-            <div class="metric-value">{available_books}</div>
+            <div class="metric-value">{summary["available_copies"]}</div>
         </div>
         """,
         unsafe_allow_html=True,
@@ -96,7 +80,7 @@ with col4:
         f"""
         <div class="metric-card">
             <div class="metric-label">Active Loans</div>
-            <div class="metric-value">{len(active_loans)}</div>
+            <div class="metric-value">{summary["active_loans"]}</div>
         </div>
         """,
         unsafe_allow_html=True,
@@ -105,38 +89,50 @@ with col4:
 col_a, col_b = st.columns(2)
 with col_a:
     st.subheader("Inventory Snapshot")
-    if books_df.empty:
+    if not summary["inventory"]:
         st.info("No book data yet.")
     else:
-        top_titles = books_df.sort_values("available_copies", ascending=False)[["title", "author", "available_copies", "total_copies"]].head(10)
+        top_titles = pd.DataFrame(summary["inventory"])
         st.dataframe(top_titles, use_container_width=True, height=320)
 with col_b:
     st.subheader("Borrow Status Split")
-    if borrow_df.empty:
+    if not summary["status_counts"]:
         st.info("No borrow records yet.")
     else:
-        status_counts = borrow_df["status"].value_counts()
+        status_counts = pd.Series(summary["status_counts"], name="count")
         st.bar_chart(status_counts)
 
 st.subheader("Top Borrowed Books")
-if borrow_df.empty:
+if not summary["top_borrowed"]:
     st.info("No borrow data yet.")
 else:
-    book_lookup = {book["id"]: book["title"] for book in books}
-    top_books = (
-        borrow_df["book_id"]
-        .map(book_lookup)
-        .value_counts()
-        .head(5)
-        .rename_axis("Title")
-        .reset_index(name="Borrows")
+    top_books = pd.DataFrame(summary["top_borrowed"]).rename(
+        columns={"title": "Title", "borrows": "Borrows"}
     )
     st.table(top_books)
 
+st.subheader("Most Active Students")
+if not summary.get("top_students"):
+    st.info("No borrow data yet.")
+else:
+    top_students = pd.DataFrame(summary["top_students"]).rename(
+        columns={"name": "Student", "borrows": "Borrows", "active_loans": "On Loan"}
+    )
+    st.table(top_students)
+
 st.subheader("Recent Borrow Activity")
-if borrow_df.empty:
+recent_loans = data_cache.recent_activity()
+if not recent_loans:
     st.info("No transactions yet.")
 else:
-    recent_activity = borrow_df.sort_values("borrow_date", ascending=False).head(15)
+    recent_activity = pd.DataFrame(recent_loans).rename(
+        columns={
+            "id": "Record",
+            "borrow_date": "Borrowed",
+            "return_date": "Returned",
+            "status": "Status",
+            "student_name": "Student",
+            "book_title": "Book",
+        }
+    )
     st.dataframe(recent_activity, use_container_width=True, height=360)
-
@@ -0,0 +1,62 @@
+"""
+Admin gate shared by the Streamlit pages.
+
+The access token saved at login is verified locally with
+:mod:`backend.tokens` on every rerun, so a page interaction costs no GoTrue
+call. Only when the token has expired is the refresh token exchanged for a
+new session; if that fails the admin is sent back to the Login page.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import streamlit as st
+
+from backend import auth, tokens
+
+LOGIN_MESSAGE = "Please log in via the Login page to access the admin dashboard."
+
+
+def _deny(message: str) -> None:
+    st.session_state.pop("supabase_user", None)
+    st.session_state.pop("supabase_session", None)
+    st.error(message)
+    st.stop()
+
+
+def _refresh(session: Dict[str, Any]) -> Dict[str, Any]:
+    response = auth.refresh_session(session.get("refresh_token"))
+    fresh = response.get("session")
+    if fresh is None:
+        raise tokens.TokenError("Supabase did not return a new session.")
+    session = {
+        "access_token": getattr(fresh, "access_token", None),
+        "refresh_token": getattr(fresh, "refresh_token", None),
+        "expires_at": getattr(fresh, "expires_at", None),
+        "token_type": getattr(fresh, "token_type", None),
+    }
+    st.session_state["supabase_session"] = session
+    return tokens.verify(session["access_token"])
+
+
+def require_admin() -> Dict[str, Any]:
+    """Stop the page unless a verified admin session is present; return its claims."""
+    user = st.session_state.get("supabase_user")
+    session = st.session_state.get("supabase_session") or {}
+    if not user or not session.get("access_token"):
+        _deny(LOGIN_MESSAGE)
+    verifier = tokens.get_verifier()
+    if not verifier.configured:
+        # No secret or JWKS to check against: trust the login as before.
+        return {"sub": user.get("id"), "email": user.get("email")}
+    try:
+        return verifier.verify(session["access_token"])
+    except tokens.TokenExpired:
+        try:
+            return _refresh(session)
+        except Exception:  # pylint: disable=broad-except
+            _deny("Your session has expired. " + LOGIN_MESSAGE)
+    except tokens.TokenError as exc:
+        _deny(f"Your session is not valid ({exc}). " + LOGIN_MESSAGE)
+    return {}
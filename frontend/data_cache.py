@@ -0,0 +1,197 @@
+"""
+Cached data access for the Streamlit pages.
+
+Streamlit reruns a page script on every interaction, so each fetch here is
+wrapped in ``st.cache_data`` with a TTL and lists are read one keyset page at a
+time. The mutation wrappers clear only the entries a change can make stale:
+a new book clears the catalog, a borrow or return also clears loans and the
+dashboard (available copies move).
+
+Changes made elsewhere (through the API, or by another Streamlit process)
+are picked up from the event log: :func:`sync_events` reads the events
+logged since the last call and clears the same entries, so a TTL is only the
+upper bound on staleness when the log cannot be read.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from backend import bulk_import, services
+from backend.events import MAX_EVENTS
+from backend.pagination import next_cursor
+
+PAGE_SIZE = 100
+CATALOG_TTL_SECONDS = 60
+LOAN_TTL_SECONDS = 15
+DASHBOARD_TTL_SECONDS = 30
+RECENT_ACTIVITY = 15
+LOAN_EVENTS = ("borrowed", "returned")
+RECENT_ACTIVITY_FIELDS = (
+    "id",
+    "borrow_date",
+    "return_date",
+    "status",
+    "student_name",
+    "book_title",
+)
+
+Page = Tuple[List[Dict[str, Any]], Optional[str]]
+
+
+# ------------------------- CACHED READS ------------------------- #
+@st.cache_data(ttl=DASHBOARD_TTL_SECONDS, show_spinner=False)
+def dashboard_summary() -> Dict[str, Any]:
+    # Recent activity is read separately by recent_activity().
+    return services.dashboard_summary(recent_limit=0)
+
+
+@st.cache_data(ttl=DASHBOARD_TTL_SECONDS, show_spinner=False)
+def recent_activity() -> List[Dict[str, Any]]:
+    """The latest loans with student and book names, newest first.
+
+    Refetched when :func:`sync_events` sees a borrow or return, not on every
+    page load.
+    """
+    return services.list_loans(limit=RECENT_ACTIVITY, fields=RECENT_ACTIVITY_FIELDS)
+
+
+@st.cache_data(ttl=CATALOG_TTL_SECONDS, show_spinner=False)
+def books_page(after: Optional[str] = None, limit: int = PAGE_SIZE) -> Page:
+    rows = services.get_books(after=after, limit=limit)
+    return rows, next_cursor(rows, services.BOOK_SORT_KEY, limit)
+
+
+@st.cache_data(ttl=CATALOG_TTL_SECONDS, show_spinner=False)
+def search_books(query: str, limit: int = 50) -> List[Dict[str, Any]]:
+    return services.search_books(query, limit=limit)
+
+
+@st.cache_data(ttl=CATALOG_TTL_SECONDS, show_spinner=False)
+def students_page(after: Optional[str] = None, limit: int = PAGE_SIZE) -> Page:
+    rows = services.get_students(after=after, limit=limit)
+    return rows, next_cursor(rows, services.STUDENT_SORT_KEY, limit)
+
+
+@st.cache_data(ttl=LOAN_TTL_SECONDS, show_spinner=False)
+def loans_page(
+    status: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Page:
+    rows = services.list_loans(status=status, after=after, limit=limit, fields=fields)
+    return rows, next_cursor(rows, services.RECORD_SORT_KEY, limit)
+
+
+# ------------------------- INVALIDATION ------------------------- #
+def invalidate_books() -> None:
+    books_page.clear()
+    search_books.clear()
+    dashboard_summary.clear()
+
+
+def invalidate_students() -> None:
+    students_page.clear()
+
+
+def invalidate_loans() -> None:
+    loans_page.clear()
+    recent_activity.clear()
+    invalidate_books()
+
+
+# ------------------------- CHANGE FEED ------------------------- #
+# Shared by every session in this Streamlit process, like st.cache_data.
+_feed_lock = threading.Lock()
+_feed: Dict[str, Any] = {"seq": None}
+
+
+def sync_events() -> None:
+    """Clear cache entries made stale by changes logged since the last call."""
+    with _feed_lock:
+        if _feed["seq"] is None:
+            latest = services.list_events(limit=1)
+            _feed["seq"] = latest[-1]["seq"] if latest else 0
+            return
+        while True:
+            events = services.list_events(_feed["seq"], limit=MAX_EVENTS)
+            if not events:
+                return
+            _feed["seq"] = events[-1]["seq"]
+            kinds = {event["kind"] for event in events}
+            if kinds & set(LOAN_EVENTS):
+                invalidate_loans()
+            elif "book_added" in kinds:
+                invalidate_books()
+            if "student_added" in kinds:
+                invalidate_students()
+            if len(events) < MAX_EVENTS:
+                return
+
+
+# ------------------------- MUTATIONS ------------------------- #
+def add_book(title: str, author: str, isbn: Optional[str], total_copies: int) -> Dict[str, Any]:
+    book = services.add_book(title, author, isbn, total_copies)
+    invalidate_books()
+    return book
+
+
+def add_student(name: str, email: str) -> Dict[str, Any]:
+    student = services.add_student(name, email)
+    invalidate_students()
+    return student
+
+
+def borrow_book(student_id: int, book_id: int) -> Dict[str, Any]:
+    result = services.borrow_book(student_id, book_id)
+    if result.get("success"):
+        invalidate_loans()
+    return result
+
+
+def return_book(record_id: int) -> Dict[str, Any]:
+    result = services.return_book(record_id)
+    if result.get("success"):
+        invalidate_loans()
+    return result
+
+
+def import_books(lines, fmt: str) -> Dict[str, Any]:
+    report = bulk_import.import_books(lines, fmt)
+    if report["upserted"]:
+        invalidate_books()
+    return report
+
+
+def import_students(lines, fmt: str) -> Dict[str, Any]:
+    report = bulk_import.import_students(lines, fmt)
+    if report["upserted"]:
+        invalidate_students()
+    return report
+
+
+# ------------------------- PAGINATION ------------------------- #
+def paginate(key: str, fetch: Callable[[Optional[str]], Page]) -> List[Dict[str, Any]]:
+    """Return the current page for ``key`` and draw Previous/Next controls.
+
+    The cursors of the pages visited so far are kept in session state, so
+    paging back is a cache hit rather than a refetch. Include any filter value
+    in ``key`` so changing the filter starts again from the first page.
+    """
+    cursors: List[Optional[str]] = st.session_state.setdefault(f"{key}-cursors", [None])
+    rows, cursor = fetch(cursors[-1])
+
+    previous_col, label_col, next_col = st.columns([1, 2, 1])
+    if previous_col.button("◀ Previous", key=f"{key}-previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    label_col.caption(f"Page {len(cursors)} · {len(rows)} rows")
+    if next_col.button("Next ▶", key=f"{key}-next", disabled=cursor is None):
+        cursors.append(cursor)
+        st.rerun()
+    return rows
+
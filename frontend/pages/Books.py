@@ -1,3 +1,4 @@
+import io
 import sys
 from pathlib import Path
 
@@ -7,18 +8,14 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
-from backend import services
+import data_cache
+from auth_guard import require_admin
+from backend import bulk_import
 
 st.set_page_config(page_title="Manage Books", page_icon="📘")
 
-
-def require_admin() -> None:
-    if not st.session_state.get("supabase_user"):
-        st.error("Please log in via the Login page to access the admin dashboard.")
-        st.stop()
-
-
 require_admin()
+data_cache.sync_events()
 
 st.title("📘 Manage Books")
 st.caption("Bold controls for adding and reviewing library inventory.")
@@ -36,14 +33,43 @@ with st.form("add-book-form"):
             st.error("Title and Author are required.")
         else:
             try:
-                services.add_book(title, author, isbn, int(total_copies))
+                data_cache.add_book(title, author, isbn, int(total_copies))
                 st.success("Book added successfully.")
             except Exception as exc:  # pylint: disable=broad-except
                 st.error(f"Failed to add book: {exc}")
 
+with st.expander("Bulk Import (CSV or JSONL)"):
+    st.caption("Columns: title, author, isbn, total_copies. Existing rows are updated in place.")
+    upload = st.file_uploader(
+        "Books file", type=["csv", "jsonl", "ndjson"], key="books-bulk-upload"
+    )
+    if upload is not None and st.button("Import Books"):
+        fmt = bulk_import.detect_format(upload.name)
+        lines = io.TextIOWrapper(upload, encoding="utf-8", newline="")
+        try:
+            report = data_cache.import_books(lines, fmt)
+        except Exception as exc:  # pylint: disable=broad-except
+            st.error(f"Import failed: {exc}")
+        else:
+            st.success(
+                f"Imported {report['upserted']} of {report['processed']} rows."
+            )
+            if report["errors"]:
+                st.warning(f"{report['failed']} rows were skipped.")
+                st.dataframe(report["errors"], use_container_width=True)
+
 st.divider()
 
+st.subheader("Search Catalog")
+query = st.text_input("Title, author or ISBN", placeholder="e.g. pragmatic programmer").strip()
+if query:
+    results = data_cache.search_books(query, limit=50)
+    if results:
+        st.dataframe(results, use_container_width=True)
+    else:
+        st.info("No matching books.")
+
 st.subheader("Inventory Overview")
-books = services.get_books()
+books = data_cache.paginate("books", data_cache.books_page)
 st.dataframe(books, use_container_width=True, height=500)
 
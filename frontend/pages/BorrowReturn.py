@@ -7,18 +7,13 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
-from backend import services
+import data_cache
+from auth_guard import require_admin
 
 st.set_page_config(page_title="Borrow & Return", page_icon="🔄")
 
-
-def require_admin() -> None:
-    if not st.session_state.get("supabase_user"):
-        st.error("Please log in via the Login page to access the admin dashboard.")
-        st.stop()
-
-
 require_admin()
+data_cache.sync_events()
 
 st.title("🔄 Borrow & Return")
 st.caption("Bold actions for circulation control.")
@@ -30,7 +25,7 @@ with left:
     student_id = st.number_input("Student ID", min_value=1, step=1)
     book_id = st.number_input("Book ID", min_value=1, step=1)
     if st.button("Issue Book"):
-        result = services.borrow_book(int(student_id), int(book_id))
+        result = data_cache.borrow_book(int(student_id), int(book_id))
         if result.get("success"):
             st.success(result.get("message"))
         else:
@@ -40,7 +35,7 @@ with right:
     st.subheader("Return Book")
     record_id = st.number_input("Borrow Record ID", min_value=1, step=1)
     if st.button("Return Book"):
-        result = services.return_book(int(record_id))
+        result = data_cache.return_book(int(record_id))
         if result.get("success"):
             st.success(result.get("message"))
         else:
@@ -48,7 +43,38 @@ with right:
 
 st.divider()
 
+LOAN_COLUMNS = {
+    "id": "Record ID",
+    "student_name": "Student",
+    "student_email": "Email",
+    "book_title": "Title",
+    "book_author": "Author",
+    "borrow_date": "Borrowed",
+    "return_date": "Returned",
+    "status": "Status",
+}
+
 st.subheader("Active Loans")
-active_loans = services.list_borrow_records(status="borrowed")
-st.dataframe(active_loans, use_container_width=True, height=400)
+active_loans = data_cache.paginate(
+    "active-loans",
+    lambda after: data_cache.loans_page("borrowed", after, fields=tuple(LOAN_COLUMNS)),
+)
+st.dataframe(
+    [{label: loan.get(key) for key, label in LOAN_COLUMNS.items()} for loan in active_loans],
+    use_container_width=True,
+    height=400,
+)
+
+st.subheader("Loan History")
+status_filter = st.selectbox("Status", ["All", "borrowed", "returned"])
+history_status = None if status_filter == "All" else status_filter
+history = data_cache.paginate(
+    f"loan-history-{status_filter}",
+    lambda after: data_cache.loans_page(history_status, after, fields=tuple(LOAN_COLUMNS)),
+)
+st.dataframe(
+    [{label: loan.get(key) for key, label in LOAN_COLUMNS.items()} for loan in history],
+    use_container_width=True,
+    height=400,
+)
 
@@ -1,3 +1,4 @@
+import io
 import sys
 from pathlib import Path
 
@@ -7,18 +8,14 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
-from backend import services
+import data_cache
+from auth_guard import require_admin
+from backend import bulk_import
 
 st.set_page_config(page_title="Manage Students", page_icon="👥")
 
-
-def require_admin() -> None:
-    if not st.session_state.get("supabase_user"):
-        st.error("Please log in via the Login page to access the admin dashboard.")
-        st.stop()
-
-
 require_admin()
+data_cache.sync_events()
 
 st.title("👥 Manage Students")
 st.caption("Bold administrative tools for student enrollment and tracking.")
@@ -34,14 +31,34 @@ with st.form("add-student-form"):
             st.error("Both name and email are required.")
         else:
             try:
-                services.add_student(name, email)
+                data_cache.add_student(name, email)
                 st.success("Student added successfully.")
             except Exception as exc:  # pylint: disable=broad-except
                 st.error(f"Failed to add student: {exc}")
 
+with st.expander("Bulk Import (CSV or JSONL)"):
+    st.caption("Columns: name, email. Existing rows are updated in place.")
+    upload = st.file_uploader(
+        "Students file", type=["csv", "jsonl", "ndjson"], key="students-bulk-upload"
+    )
+    if upload is not None and st.button("Import Students"):
+        fmt = bulk_import.detect_format(upload.name)
+        lines = io.TextIOWrapper(upload, encoding="utf-8", newline="")
+        try:
+            report = data_cache.import_students(lines, fmt)
+        except Exception as exc:  # pylint: disable=broad-except
+            st.error(f"Import failed: {exc}")
+        else:
+            st.success(
+                f"Imported {report['upserted']} of {report['processed']} rows."
+            )
+            if report["errors"]:
+                st.warning(f"{report['failed']} rows were skipped.")
+                st.dataframe(report["errors"], use_container_width=True)
+
 st.divider()
 
 st.subheader("Student Directory")
-students = services.get_students()
+students = data_cache.paginate("students", data_cache.students_page)
 st.dataframe(students, use_container_width=True, height=500)
 
@@ -4,22 +4,119 @@ FastAPI server exposing backend services as REST endpoints.
 
 from __future__ import annotations
 
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import os
 import sys
+import tempfile
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 from typing import List
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 ROOT_DIR = Path(__file__).resolve().parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
-from backend import services  # noqa: E402
-
-app = FastAPI(title="Library Management API", version="1.0.0")
-
+from backend import (  # noqa: E402
+    async_services,
+    bulk_import,
+    config,
+    events,
+    export,
+    idempotency,
+    metrics,
+    ratelimit,
+    services,
+    shared_state,
+    tokens,
+)
+from backend.cache import catalog_cache, relay  # noqa: E402
+from backend.pagination import MAX_PAGE_SIZE, next_cursor  # noqa: E402
+from backend.services import (  # noqa: E402
+    BOOK_SORT_KEY,
+    HOLD_SORT_KEY,
+    OVERDUE_SORT_KEY,
+    RECORD_SORT_KEY,
+    STATS_SORT_KEY,
+    STUDENT_SORT_KEY,
+)
+from backend.storage import StorageError  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+async def _refresh_overdue_periodically(interval: float) -> None:
+    state = shared_state.get_state()
+    while True:
+        try:
+            # With several workers only the lease holder runs the job; the
+            # lease outlasts one interval so a dead holder is replaced.
+            if state is None or await asyncio.to_thread(
+                state.try_lease, "overdue", shared_state.OWNER, interval * 2
+            ):
+                await async_services.refresh_overdue()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Overdue refresh failed")
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    config.validate_auth_config()
+    state = shared_state.get_state()
+    if state is None and config.API_WORKERS > 1:
+        logger.warning(
+            "API_WORKERS=%d with STATE_BACKEND=memory: rate limits, idempotency keys "
+            "and cache invalidations are not shared between workers.",
+            config.API_WORKERS,
+        )
+    tasks = []
+    if config.OVERDUE_JOB_INTERVAL_SECONDS > 0:
+        tasks.append(
+            asyncio.create_task(
+                _refresh_overdue_periodically(config.OVERDUE_JOB_INTERVAL_SECONDS)
+            )
+        )
+    if catalog_cache.enabled:
+        # Other workers and the Streamlit app write too; follow the change
+        # feed so their writes evict our cached pages without waiting for TTL.
+        follower = events.EventFollower(async_services.list_events)
+        follower.subscribe(events.invalidate_cache)
+        tasks.append(asyncio.create_task(follower.run()))
+    if catalog_cache.enabled and state is not None:
+        tasks.append(asyncio.create_task(relay.run(state, config.STATE_POLL_SECONDS)))
+    yield
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+app = FastAPI(title="Library Management API", version="1.0.0", lifespan=lifespan)
+
+# Mutations a client may retry safely by sending an Idempotency-Key header.
+IDEMPOTENT_PATHS = (
+    "/books",
+    "/students",
+    "/borrow",
+    "/return",
+    "/borrow/batch",
+    "/return/batch",
+    "/holds",
+)
+app.add_middleware(idempotency.IdempotencyMiddleware, paths=IDEMPOTENT_PATHS)
+app.add_middleware(ratelimit.RateLimitMiddleware, exempt_paths=("/health", "/metrics"))
+# Added after the middleware above so it wraps them: replays, conflicts and 429s
+# they answer themselves still carry the CORS headers a browser needs to read them.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -27,6 +124,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+async def require_user(authorization: str | None = Header(None)) -> dict | None:
+    """Verify the bearer token on mutations when ``AUTH_REQUIRED`` is set."""
+    if not config.AUTH_REQUIRED:
+        return None
+    token = tokens.bearer_token(authorization)
+    if token is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Missing bearer token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    verifier = tokens.get_verifier()
+    try:
+        claims = verifier.cached(token)
+        if claims is None:
+            if verifier.needs_network(token):
+                claims = await asyncio.to_thread(verifier.verify, token)
+            else:
+                claims = verifier.verify(token)
+    except tokens.TokenError as exc:
+        raise HTTPException(
+            status_code=401,
+            detail=str(exc),
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+        ) from exc
+    return claims
+
+
+# Every mutation requires a verified token when AUTH_REQUIRED is set.
+AUTHENTICATED = [Depends(require_user)]
 
 
 class BookPayload(BaseModel):
@@ -50,62 +180,361 @@ class ReturnPayload(BaseModel):
     record_id: int
 
 
+class HoldPayload(BaseModel):
+    student_id: int
+    book_id: int
+
+
+MAX_BATCH_SIZE = 100
+
+
+class BatchBorrowPayload(BaseModel):
+    student_id: int
+    book_ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class BatchReturnPayload(BaseModel):
+    record_ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+def _split_fields(fields: str | None) -> List[str] | None:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
+
+async def _list_page(response: Response, sort_key: str, limit: int | None, fetch) -> List[dict]:
+    """Run a paged list call and advertise the next cursor in ``X-Next-Cursor``."""
+    try:
+        rows = await fetch
+    except (ValueError, StorageError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    cursor = next_cursor(rows, sort_key, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return rows
+
+
+async def _bulk_import(request: Request, fmt: str | None, importer) -> dict:
+    """Spool an upload to disk-backed storage, then import it off the event loop."""
+    fmt = fmt or bulk_import.detect_format(request.headers.get("content-type", ""))
+    if fmt not in bulk_import.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format {fmt!r}.")
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        try:
+            return await asyncio.to_thread(importer, lines, fmt)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        finally:
+            lines.detach()
+
+
 @app.get("/health")
-def health_check() -> dict:
+async def health_check() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/dashboard")
+async def dashboard(
+    inventory_limit: int = Query(10, ge=1, le=100),
+    top_limit: int = Query(5, ge=1, le=100),
+    recent_limit: int = Query(15, ge=1, le=100),
+) -> dict:
+    return await async_services.dashboard_summary(inventory_limit, top_limit, recent_limit)
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/cache/stats")
+async def cache_stats() -> dict:
+    return services.cache_stats()
+
+
+@app.get("/db/pool")
+async def db_pool_stats() -> dict:
+    # Imported here: the Supabase transport has no business in a SQLite worker.
+    from backend import db
+
+    return db.pool_stats()
+
+
 @app.get("/books")
-def list_books() -> List[dict]:
-    return services.get_books()
+async def list_books(
+    response: Response,
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+) -> List[dict]:
+    fetch = async_services.get_books(after=after, limit=limit, fields=_split_fields(fields))
+    return await _list_page(response, BOOK_SORT_KEY, limit, fetch)
+
+
+@app.get("/books/search")
+async def search_books(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+) -> List[dict]:
+    try:
+        return await async_services.search_books(q, limit)
+    except StorageError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
-@app.post("/books", status_code=201)
-def create_book(payload: BookPayload) -> dict:
+@app.post("/books", status_code=201, dependencies=AUTHENTICATED)
+async def create_book(payload: BookPayload) -> dict:
     try:
-        return services.add_book(
+        return await async_services.add_book(
             payload.title, payload.author, payload.isbn, payload.total_copies
         )
     except Exception as exc:  # pylint: disable=broad-except
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
-@app.get("/students")
-def list_students() -> List[dict]:
-    return services.get_students()
+@app.post("/books/bulk", dependencies=AUTHENTICATED)
+async def bulk_import_books(request: Request, format: str | None = None) -> dict:
+    return await _bulk_import(request, format, bulk_import.import_books)
 
 
-@app.post("/students", status_code=201)
-def create_student(payload: StudentPayload) -> dict:
+@app.get("/students")
+async def list_students(
+    response: Response,
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+) -> List[dict]:
+    fetch = async_services.get_students(after=after, limit=limit, fields=_split_fields(fields))
+    return await _list_page(response, STUDENT_SORT_KEY, limit, fetch)
+
+
+@app.post("/students", status_code=201, dependencies=AUTHENTICATED)
+async def create_student(payload: StudentPayload) -> dict:
     try:
-        return services.add_student(payload.name, payload.email)
+        return await async_services.add_student(payload.name, payload.email)
     except Exception as exc:  # pylint: disable=broad-except
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
-@app.post("/borrow", status_code=201)
-def borrow_book(payload: BorrowPayload) -> dict:
-    result = services.borrow_book(payload.student_id, payload.book_id)
+@app.post("/students/bulk", dependencies=AUTHENTICATED)
+async def bulk_import_students(request: Request, format: str | None = None) -> dict:
+    return await _bulk_import(request, format, bulk_import.import_students)
+
+
+@app.post("/borrow", status_code=201, dependencies=AUTHENTICATED)
+async def borrow_book(payload: BorrowPayload) -> dict:
+    result = await async_services.borrow_book(payload.student_id, payload.book_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=400, detail=result.get("error"))
+    return result
+
+
+@app.post("/return", dependencies=AUTHENTICATED)
+async def return_book(payload: ReturnPayload) -> dict:
+    result = await async_services.return_book(payload.record_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=400, detail=result.get("error"))
+    return result
+
+
+@app.post("/borrow/batch", status_code=201, dependencies=AUTHENTICATED)
+async def borrow_books(payload: BatchBorrowPayload) -> dict:
+    result = await async_services.borrow_books(payload.student_id, payload.book_ids)
+    if not result.get("success"):
+        raise HTTPException(status_code=400, detail=result.get("error"))
+    return result
+
+
+@app.post("/return/batch", dependencies=AUTHENTICATED)
+async def return_books(payload: BatchReturnPayload) -> dict:
+    result = await async_services.return_books(payload.record_ids)
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("error"))
     return result
 
 
-@app.post("/return")
-def return_book(payload: ReturnPayload) -> dict:
-    result = services.return_book(payload.record_id)
+@app.post("/holds", status_code=201, dependencies=AUTHENTICATED)
+async def place_hold(payload: HoldPayload) -> dict:
+    result = await async_services.place_hold(payload.student_id, payload.book_id)
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("error"))
     return result
 
 
+@app.get("/holds")
+async def list_holds(
+    response: Response,
+    book_id: int,
+    status: str = Query("waiting", pattern="^(waiting|fulfilled|all)$"),
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+) -> List[dict]:
+    fetch = async_services.list_holds(
+        book_id,
+        status=None if status == "all" else status,
+        after=after,
+        limit=limit,
+        fields=_split_fields(fields),
+    )
+    return await _list_page(response, HOLD_SORT_KEY, limit, fetch)
+
+
+@app.get("/holds/{hold_id}")
+async def get_hold(hold_id: int) -> dict:
+    hold = await async_services.get_hold(hold_id)
+    if hold is None:
+        raise HTTPException(status_code=404, detail="Hold not found.")
+    return hold
+
+
 @app.get("/borrow-records")
-def list_borrow_records(status: str | None = None) -> List[dict]:
-    return services.list_borrow_records(status=status)
+async def list_borrow_records(
+    response: Response,
+    status: str | None = None,
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+) -> List[dict]:
+    fetch = async_services.list_borrow_records(
+        status=status, after=after, limit=limit, fields=_split_fields(fields)
+    )
+    return await _list_page(response, RECORD_SORT_KEY, limit, fetch)
+
+
+@app.get("/loans")
+async def list_loans(
+    response: Response,
+    status: str | None = None,
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+) -> List[dict]:
+    fetch = async_services.list_loans(
+        status=status, after=after, limit=limit, fields=_split_fields(fields)
+    )
+    return await _list_page(response, RECORD_SORT_KEY, limit, fetch)
+
+
+@app.get("/overdue")
+async def list_overdue(
+    response: Response,
+    status: str = Query("overdue", pattern="^(overdue|returned|all)$"),
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+) -> List[dict]:
+    fetch = async_services.list_overdue(
+        status=None if status == "all" else status,
+        after=after,
+        limit=limit,
+        fields=_split_fields(fields),
+    )
+    return await _list_page(response, OVERDUE_SORT_KEY, limit, fetch)
+
+
+@app.post("/overdue/refresh", dependencies=AUTHENTICATED)
+async def refresh_overdue() -> dict:
+    try:
+        return await async_services.refresh_overdue()
+    except StorageError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
-if __name__ == "__main__":
+@app.get("/stats/books")
+async def book_stats(
+    response: Response,
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+) -> List[dict]:
+    fetch = async_services.top_books(after=after, limit=limit, fields=_split_fields(fields))
+    return await _list_page(response, STATS_SORT_KEY, limit, fetch)
+
+
+@app.get("/stats/students")
+async def student_stats(
+    response: Response,
+    after: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+) -> List[dict]:
+    fetch = async_services.top_students(after=after, limit=limit, fields=_split_fields(fields))
+    return await _list_page(response, STATS_SORT_KEY, limit, fetch)
+
+
+@app.post("/stats/rebuild", dependencies=AUTHENTICATED)
+async def rebuild_stats() -> dict:
+    try:
+        return await async_services.rebuild_circulation_stats()
+    except StorageError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@app.get("/events")
+async def list_events(
+    since: int | None = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=events.MAX_EVENTS),
+    wait: float = Query(0, ge=0),
+) -> dict:
+    """Events after ``since`` (latest if omitted), long-polling up to ``wait`` seconds."""
+    batch = await events.wait_for_events(
+        async_services.list_events, since, limit, min(wait, config.EVENTS_MAX_WAIT_SECONDS)
+    )
+    return {"events": batch, "next_since": batch[-1]["seq"] if batch else since}
+
+
+@app.get("/export/{table}")
+async def export_table(
+    table: str,
+    format: str = "ndjson",
+    since: str | None = None,
+    until: str | None = None,
+) -> StreamingResponse:
+    """Stream a whole table page by page; ``since``/``until`` bound ``borrow_date``."""
+    try:
+        spec, bounds = export.resolve(table, format, since, until)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return StreamingResponse(
+        export.astream(spec, format, bounds),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
+
+
+def main() -> None:
+    """Run the API; ``--workers N`` starts N processes (0 = one per CPU)."""
     import uvicorn
 
-    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True)
+    parser = argparse.ArgumentParser(description="Run the Library Management API.")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--workers", type=int, default=config.API_WORKERS)
+    parser.add_argument(
+        "--reload",
+        action=argparse.BooleanOptionalAction,
+        default=config.API_RELOAD,
+        help="restart on code changes (single worker only)",
+    )
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    # Workers re-import this module; tell them how many of them there are.
+    os.environ["API_WORKERS"] = str(workers)
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=workers if workers > 1 else None,
+        reload=args.reload and workers == 1,
+    )
+
+
+if __name__ == "__main__":
+    main()
 
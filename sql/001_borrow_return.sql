@@ -0,0 +1,80 @@
+-- Atomic borrow/return procedures called by backend.storage.supabase_store.
+--
+-- Each function runs as a single transaction behind one PostgREST RPC call.
+-- The conditional decrement takes a row lock on the book, so concurrent
+-- issues of the last copy serialize instead of both reading the same
+-- available_copies value.
+
+create or replace function public.borrow_book(
+    p_student_id bigint,
+    p_book_id bigint,
+    p_borrow_date date default current_date
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_record public.borrow_records;
+begin
+    if not exists (select 1 from public.students where id = p_student_id) then
+        return jsonb_build_object('success', false, 'error', 'Student does not exist.');
+    end if;
+
+    update public.books
+       set available_copies = available_copies - 1
+     where id = p_book_id
+       and available_copies > 0;
+
+    if not found then
+        if exists (select 1 from public.books where id = p_book_id) then
+            return jsonb_build_object('success', false, 'error', 'No copies available.');
+        end if;
+        return jsonb_build_object('success', false, 'error', 'Book does not exist.');
+    end if;
+
+    insert into public.borrow_records (student_id, book_id, borrow_date, status)
+    values (p_student_id, p_book_id, p_borrow_date, 'borrowed')
+    returning * into v_record;
+
+    return jsonb_build_object('success', true, 'record', to_jsonb(v_record));
+end;
+$$;
+
+create or replace function public.return_book(
+    p_record_id bigint,
+    p_return_date date default current_date
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_record public.borrow_records;
+begin
+    select * into v_record
+      from public.borrow_records
+     where id = p_record_id
+       for update;
+
+    if not found then
+        return jsonb_build_object('success', false, 'error', 'Record not found.');
+    end if;
+
+    if v_record.status = 'returned' then
+        return jsonb_build_object('success', false, 'error', 'Book already returned.');
+    end if;
+
+    update public.books
+       set available_copies = least(available_copies + 1, total_copies)
+     where id = v_record.book_id;
+
+    if not found then
+        return jsonb_build_object('success', false, 'error', 'Book does not exist.');
+    end if;
+
+    update public.borrow_records
+       set status = 'returned',
+           return_date = p_return_date
+     where id = p_record_id
+    returning * into v_record;
+
+    return jsonb_build_object('success', true, 'record', to_jsonb(v_record));
+end;
+$$;
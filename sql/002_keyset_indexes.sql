@@ -0,0 +1,9 @@
+-- Composite indexes backing keyset pagination on the list endpoints.
+--
+-- Lists are ordered by (sort key, id); these let PostgreSQL seek straight to
+-- the cursor position instead of scanning and discarding earlier rows.
+
+create index if not exists books_title_id_idx on public.books (title, id);
+create index if not exists students_name_id_idx on public.students (name, id);
+create index if not exists borrow_records_borrow_date_id_idx
+    on public.borrow_records (borrow_date, id);
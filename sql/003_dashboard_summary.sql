@@ -0,0 +1,73 @@
+-- Dashboard KPIs computed in one round trip with SQL aggregates.
+--
+-- The response size depends only on the limits passed in, not on how many
+-- books or borrow records the library holds.
+
+create index if not exists books_available_copies_id_idx
+    on public.books (available_copies, id);
+
+create or replace function public.dashboard_summary(
+    p_inventory_limit integer default 10,
+    p_top_limit integer default 5,
+    p_recent_limit integer default 15
+) returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'titles', (select count(*) from public.books),
+        'total_copies', (select coalesce(sum(total_copies), 0) from public.books),
+        'available_copies', (select coalesce(sum(available_copies), 0) from public.books),
+        'active_loans', (
+            select count(*) from public.borrow_records where status = 'borrowed'
+        ),
+        'status_counts', coalesce((
+            select jsonb_object_agg(status, n)
+              from (
+                  select status, count(*) as n
+                    from public.borrow_records
+                   group by status
+              ) s
+        ), '{}'::jsonb),
+        'inventory', coalesce((
+            select jsonb_agg(
+                       jsonb_build_object(
+                           'title', i.title,
+                           'author', i.author,
+                           'available_copies', i.available_copies,
+                           'total_copies', i.total_copies
+                       )
+                       order by i.available_copies desc, i.id desc
+                   )
+              from (
+                  select id, title, author, available_copies, total_copies
+                    from public.books
+                   order by available_copies desc, id desc
+                   limit p_inventory_limit
+              ) i
+        ), '[]'::jsonb),
+        'top_borrowed', coalesce((
+            select jsonb_agg(
+                       jsonb_build_object('title', t.title, 'borrows', t.borrows)
+                       order by t.borrows desc, t.title
+                   )
+              from (
+                  select b.title, count(*) as borrows
+                    from public.borrow_records r
+                    join public.books b on b.id = r.book_id
+                   group by b.id, b.title
+                   order by borrows desc, b.title
+                   limit p_top_limit
+              ) t
+        ), '[]'::jsonb),
+        'recent_activity', coalesce((
+            select jsonb_agg(to_jsonb(a) order by a.borrow_date desc, a.id desc)
+              from (
+                  select *
+                    from public.borrow_records
+                   order by borrow_date desc, id desc
+                   limit p_recent_limit
+              ) a
+        ), '[]'::jsonb)
+    );
+$$;
@@ -0,0 +1,48 @@
+-- Multi-row upserts used by the bulk import pipeline (backend.bulk_import).
+--
+-- One RPC writes a whole batch. Books are keyed on isbn and students on
+-- email; re-importing a title adjusts available_copies by the change in
+-- total_copies so copies already on loan stay accounted for.
+
+create or replace function public.bulk_upsert_books(p_rows jsonb)
+returns integer
+language sql
+as $$
+    with upserted as (
+        insert into public.books (title, author, isbn, total_copies, available_copies)
+        select r.title, r.author, r.isbn, r.total_copies, r.available_copies
+          from jsonb_to_recordset(p_rows) as r(
+              title text,
+              author text,
+              isbn text,
+              total_copies integer,
+              available_copies integer
+          )
+        on conflict (isbn) do update
+           set title = excluded.title,
+               author = excluded.author,
+               available_copies = greatest(0, least(
+                   excluded.total_copies,
+                   public.books.available_copies
+                       + excluded.total_copies - public.books.total_copies
+               )),
+               total_copies = excluded.total_copies
+        returning 1
+    )
+    select count(*)::integer from upserted;
+$$;
+
+create or replace function public.bulk_upsert_students(p_rows jsonb)
+returns integer
+language sql
+as $$
+    with upserted as (
+        insert into public.students (name, email)
+        select r.name, r.email
+          from jsonb_to_recordset(p_rows) as r(name text, email text)
+        on conflict (email) do update
+           set name = excluded.name
+        returning 1
+    )
+    select count(*)::integer from upserted;
+$$;
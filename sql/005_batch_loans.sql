@@ -0,0 +1,75 @@
+-- Batch borrow/return for checkout desks, one RPC and one transaction each.
+--
+-- Items are applied through the single-item procedures from
+-- 001_borrow_return.sql, so the availability rules are identical. Items are
+-- visited in book id order (returns look up each record's book first) so
+-- concurrent batches lock book rows in the same order and cannot deadlock;
+-- results are returned in request order.
+
+create or replace function public.borrow_books(
+    p_student_id bigint,
+    p_book_ids bigint[],
+    p_borrow_date date default current_date
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_item record;
+    v_results jsonb := '[]'::jsonb;
+begin
+    if not exists (select 1 from public.students where id = p_student_id) then
+        return jsonb_build_object('success', false, 'error', 'Student does not exist.');
+    end if;
+
+    for v_item in
+        select t.book_id, t.ord
+          from unnest(p_book_ids) with ordinality as t(book_id, ord)
+         order by t.book_id, t.ord
+    loop
+        v_results := v_results || jsonb_build_array(
+            public.borrow_book(p_student_id, v_item.book_id, p_borrow_date)
+                || jsonb_build_object('book_id', v_item.book_id, 'ord', v_item.ord)
+        );
+    end loop;
+
+    return jsonb_build_object(
+        'success', true,
+        'results', coalesce((
+            select jsonb_agg(item - 'ord' order by (item ->> 'ord')::bigint)
+              from jsonb_array_elements(v_results) as item
+        ), '[]'::jsonb)
+    );
+end;
+$$;
+
+create or replace function public.return_books(
+    p_record_ids bigint[],
+    p_return_date date default current_date
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_item record;
+    v_results jsonb := '[]'::jsonb;
+begin
+    for v_item in
+        select t.record_id, t.ord
+          from unnest(p_record_ids) with ordinality as t(record_id, ord)
+          left join public.borrow_records br on br.id = t.record_id
+         order by br.book_id, t.record_id, t.ord
+    loop
+        v_results := v_results || jsonb_build_array(
+            public.return_book(v_item.record_id, p_return_date)
+                || jsonb_build_object('record_id', v_item.record_id, 'ord', v_item.ord)
+        );
+    end loop;
+
+    return jsonb_build_object(
+        'success', true,
+        'results', coalesce((
+            select jsonb_agg(item - 'ord' order by (item ->> 'ord')::bigint)
+              from jsonb_array_elements(v_results) as item
+        ), '[]'::jsonb)
+    );
+end;
+$$;
@@ -0,0 +1,39 @@
+-- Trigram search over title, author and ISBN for services.search_books.
+--
+-- word_similarity (<%) tolerates typos and partial words; ILIKE catches exact
+-- substrings such as ISBN fragments. Both are served by the GIN index.
+
+create extension if not exists pg_trgm;
+
+create or replace function public.book_search_document(
+    p_title text, p_author text, p_isbn text
+) returns text
+language sql
+immutable
+as $$
+    select lower(p_title || ' ' || p_author || ' ' || coalesce(p_isbn, ''));
+$$;
+
+create index if not exists books_search_trgm_idx
+    on public.books
+    using gin (public.book_search_document(title, author, isbn) gin_trgm_ops);
+
+create or replace function public.search_books(
+    p_query text,
+    p_limit integer default 20
+) returns setof public.books
+language sql
+stable
+as $$
+    select b.*
+      from public.books b
+     where lower(p_query) <% public.book_search_document(b.title, b.author, b.isbn)
+        or public.book_search_document(b.title, b.author, b.isbn)
+               ilike '%' || lower(p_query) || '%'
+     order by word_similarity(
+                  lower(p_query),
+                  public.book_search_document(b.title, b.author, b.isbn)
+              ) desc,
+              b.title
+     limit p_limit;
+$$;
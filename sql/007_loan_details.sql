@@ -0,0 +1,25 @@
+-- Loans joined with their student and book.
+--
+-- PostgREST serves views like tables, so GET /loan_details supports the same
+-- filters, ordering and keyset pagination as borrow_records while returning
+-- names and titles in the same round trip. security_invoker keeps the row
+-- level security policies of the underlying tables in force.
+
+create index if not exists borrow_records_status_borrow_date_id_idx
+    on public.borrow_records (status, borrow_date, id);
+
+create or replace view public.loan_details
+with (security_invoker = true) as
+select r.id,
+       r.student_id,
+       r.book_id,
+       r.borrow_date,
+       r.return_date,
+       r.status,
+       s.name as student_name,
+       s.email as student_email,
+       b.title as book_title,
+       b.author as book_author
+  from public.borrow_records r
+  join public.students s on s.id = r.student_id
+  join public.books b on b.id = r.book_id;
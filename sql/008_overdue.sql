@@ -0,0 +1,100 @@
+-- Overdue tracking maintained incrementally by refresh_overdue().
+--
+-- A loan is overdue once it is still borrowed past its due date
+-- (borrow_date + loan period). Each run only scans the borrow_date range
+-- between the previous cutoff, kept in job_state, and the new one, using the
+-- (status, borrow_date) index from 007; loans in that range already returned
+-- after their due date are recorded as returned, so a late return between
+-- two runs keeps its fine. It also scans open overdue rows to pick up returns. Fines are computed by the API from due_date and
+-- return_date, so nothing needs rewriting as days pass.
+
+create table if not exists public.overdue_loans (
+    id bigint primary key references public.borrow_records (id),
+    due_date date not null,
+    return_date date,
+    status text not null check (status in ('overdue', 'returned'))
+);
+
+create index if not exists overdue_loans_status_due_date_id_idx
+    on public.overdue_loans (status, due_date, id);
+
+create table if not exists public.job_state (
+    name text primary key,
+    watermark date,
+    updated_at timestamptz not null default now()
+);
+
+create or replace view public.overdue_details
+with (security_invoker = true) as
+select o.id,
+       r.student_id,
+       r.book_id,
+       r.borrow_date,
+       o.due_date,
+       o.return_date,
+       o.status,
+       s.name as student_name,
+       s.email as student_email,
+       b.title as book_title
+  from public.overdue_loans o
+  join public.borrow_records r on r.id = o.id
+  join public.students s on s.id = r.student_id
+  join public.books b on b.id = r.book_id;
+
+create or replace function public.refresh_overdue(
+    p_cutoff date,
+    p_loan_period_days integer
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_previous date;
+    v_watermark date;
+    v_marked integer;
+    v_settled integer;
+begin
+    select watermark into v_previous
+      from public.job_state
+     where name = 'overdue'
+       for update;
+
+    insert into public.overdue_loans (id, due_date, status, return_date)
+    select id, borrow_date + p_loan_period_days, 'overdue', null::date
+      from public.borrow_records
+     where status = 'borrowed'
+       and borrow_date >= coalesce(v_previous, '-infinity'::date)
+       and borrow_date < p_cutoff
+    union all
+    select id, borrow_date + p_loan_period_days, 'returned', return_date
+      from public.borrow_records
+     where status = 'returned'
+       and borrow_date >= coalesce(v_previous, '-infinity'::date)
+       and borrow_date < p_cutoff
+       and return_date > borrow_date + p_loan_period_days
+    on conflict (id) do nothing;
+    get diagnostics v_marked = row_count;
+
+    update public.overdue_loans o
+       set status = 'returned',
+           return_date = r.return_date
+      from public.borrow_records r
+     where r.id = o.id
+       and o.status = 'overdue'
+       and r.status = 'returned';
+    get diagnostics v_settled = row_count;
+
+    v_watermark := greatest(coalesce(v_previous, p_cutoff), p_cutoff);
+    insert into public.job_state (name, watermark, updated_at)
+    values ('overdue', v_watermark, now())
+    on conflict (name) do update
+        set watermark = excluded.watermark,
+            updated_at = excluded.updated_at;
+
+    return jsonb_build_object(
+        'marked', v_marked,
+        'settled', v_settled,
+        'watermark', v_watermark,
+        'previous_watermark', v_previous
+    );
+end;
+$$;
@@ -0,0 +1,203 @@
+-- Per-book and per-student circulation counters.
+--
+-- Triggers on borrow_records keep total_borrows, active_loans and
+-- last_borrowed current inside the same transaction as borrow_book(),
+-- return_book() and the batch variants, so "top borrowed" and "most active
+-- students" read a short index scan instead of aggregating every loan. The
+-- book counter row is updated right after the book row itself is locked by
+-- the copy decrement, so it adds no new contention point.
+--
+-- rebuild_circulation_stats() recomputes everything from history; this
+-- script calls it once to backfill existing data.
+
+create table if not exists public.book_stats (
+    book_id bigint primary key references public.books (id),
+    total_borrows integer not null default 0,
+    active_loans integer not null default 0,
+    last_borrowed date
+);
+
+create index if not exists book_stats_total_borrows_book_id_idx
+    on public.book_stats (total_borrows, book_id);
+
+create table if not exists public.student_stats (
+    student_id bigint primary key references public.students (id),
+    total_borrows integer not null default 0,
+    active_loans integer not null default 0,
+    last_borrowed date
+);
+
+create index if not exists student_stats_total_borrows_student_id_idx
+    on public.student_stats (total_borrows, student_id);
+
+create or replace function public.circulation_stats_apply()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_borrows integer := case when tg_op = 'INSERT' then 1 else 0 end;
+    v_active integer := (new.status = 'borrowed')::integer
+        - case when tg_op = 'UPDATE' then (old.status = 'borrowed')::integer else 0 end;
+begin
+    insert into public.book_stats as s (book_id, total_borrows, active_loans, last_borrowed)
+    values (new.book_id, v_borrows, greatest(v_active, 0), new.borrow_date)
+    on conflict (book_id) do update
+        set total_borrows = s.total_borrows + v_borrows,
+            active_loans = s.active_loans + v_active,
+            last_borrowed = greatest(s.last_borrowed, excluded.last_borrowed);
+
+    insert into public.student_stats as s (student_id, total_borrows, active_loans, last_borrowed)
+    values (new.student_id, v_borrows, greatest(v_active, 0), new.borrow_date)
+    on conflict (student_id) do update
+        set total_borrows = s.total_borrows + v_borrows,
+            active_loans = s.active_loans + v_active,
+            last_borrowed = greatest(s.last_borrowed, excluded.last_borrowed);
+
+    return null;
+end;
+$$;
+
+drop trigger if exists circulation_stats_insert on public.borrow_records;
+create trigger circulation_stats_insert
+    after insert on public.borrow_records
+    for each row execute function public.circulation_stats_apply();
+
+drop trigger if exists circulation_stats_status on public.borrow_records;
+create trigger circulation_stats_status
+    after update of status on public.borrow_records
+    for each row
+    when (old.status is distinct from new.status)
+    execute function public.circulation_stats_apply();
+
+create or replace view public.book_circulation
+with (security_invoker = true) as
+select s.book_id as id,
+       b.title,
+       b.author,
+       s.total_borrows,
+       s.active_loans,
+       s.last_borrowed
+  from public.book_stats s
+  join public.books b on b.id = s.book_id;
+
+create or replace view public.student_circulation
+with (security_invoker = true) as
+select s.student_id as id,
+       st.name,
+       st.email,
+       s.total_borrows,
+       s.active_loans,
+       s.last_borrowed
+  from public.student_stats s
+  join public.students st on st.id = s.student_id;
+
+create or replace function public.rebuild_circulation_stats()
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_books integer;
+    v_students integer;
+begin
+    lock table public.borrow_records in share mode;
+
+    delete from public.book_stats;
+    insert into public.book_stats (book_id, total_borrows, active_loans, last_borrowed)
+    select book_id, count(*), count(*) filter (where status = 'borrowed'), max(borrow_date)
+      from public.borrow_records
+     group by book_id;
+    get diagnostics v_books = row_count;
+
+    delete from public.student_stats;
+    insert into public.student_stats (student_id, total_borrows, active_loans, last_borrowed)
+    select student_id, count(*), count(*) filter (where status = 'borrowed'), max(borrow_date)
+      from public.borrow_records
+     group by student_id;
+    get diagnostics v_students = row_count;
+
+    return jsonb_build_object('book_stats', v_books, 'student_stats', v_students);
+end;
+$$;
+
+select public.rebuild_circulation_stats();
+
+-- Supersedes the version in 003: top lists now read the counters.
+create or replace function public.dashboard_summary(
+    p_inventory_limit integer default 10,
+    p_top_limit integer default 5,
+    p_recent_limit integer default 15
+) returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'titles', (select count(*) from public.books),
+        'total_copies', (select coalesce(sum(total_copies), 0) from public.books),
+        'available_copies', (select coalesce(sum(available_copies), 0) from public.books),
+        'active_loans', (
+            select count(*) from public.borrow_records where status = 'borrowed'
+        ),
+        'status_counts', coalesce((
+            select jsonb_object_agg(status, n)
+              from (
+                  select status, count(*) as n
+                    from public.borrow_records
+                   group by status
+              ) s
+        ), '{}'::jsonb),
+        'inventory', coalesce((
+            select jsonb_agg(
+                       jsonb_build_object(
+                           'title', i.title,
+                           'author', i.author,
+                           'available_copies', i.available_copies,
+                           'total_copies', i.total_copies
+                       )
+                       order by i.available_copies desc, i.id desc
+                   )
+              from (
+                  select id, title, author, available_copies, total_copies
+                    from public.books
+                   order by available_copies desc, id desc
+                   limit p_inventory_limit
+              ) i
+        ), '[]'::jsonb),
+        'top_borrowed', coalesce((
+            select jsonb_agg(
+                       jsonb_build_object('title', t.title, 'borrows', t.total_borrows)
+                       order by t.total_borrows desc, t.id desc
+                   )
+              from (
+                  select id, title, total_borrows
+                    from public.book_circulation
+                   order by total_borrows desc, id desc
+                   limit p_top_limit
+              ) t
+        ), '[]'::jsonb),
+        'top_students', coalesce((
+            select jsonb_agg(
+                       jsonb_build_object(
+                           'name', t.name,
+                           'borrows', t.total_borrows,
+                           'active_loans', t.active_loans
+                       )
+                       order by t.total_borrows desc, t.id desc
+                   )
+              from (
+                  select id, name, total_borrows, active_loans
+                    from public.student_circulation
+                   order by total_borrows desc, id desc
+                   limit p_top_limit
+              ) t
+        ), '[]'::jsonb),
+        'recent_activity', coalesce((
+            select jsonb_agg(to_jsonb(a) order by a.borrow_date desc, a.id desc)
+              from (
+                  select *
+                    from public.borrow_records
+                   order by borrow_date desc, id desc
+                   limit p_recent_limit
+              ) a
+        ), '[]'::jsonb)
+    );
+$$;
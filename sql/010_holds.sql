@@ -0,0 +1,230 @@
+-- FIFO hold queue for books with no copies on the shelf.
+--
+-- Each book has a hold_queues row: next_seq numbers new holds and head_seq
+-- is the next one to serve, so a hold's position is seq - head_seq + 1 (two
+-- primary-key lookups, independent of queue length). place_hold() and
+-- return_book() both lock the book row first, so a hold can never be queued
+-- while a concurrent return is putting a copy back on the shelf.
+--
+-- return_book() is redefined to hand the returned copy straight to the head
+-- of the queue in the same transaction; return_books() from 005 calls it, so
+-- batch returns allocate holds too. Copies that reach the shelf any other way
+-- (an edited count, bulk_upsert_books) are served by the books_serve_holds
+-- trigger, so borrow_book() never hands one to a walk-in while holds wait.
+
+create table if not exists public.hold_queues (
+    book_id bigint primary key references public.books (id),
+    next_seq bigint not null default 1,
+    head_seq bigint not null default 1
+);
+
+create table if not exists public.holds (
+    id bigint generated by default as identity primary key,
+    book_id bigint not null references public.books (id),
+    student_id bigint not null references public.students (id),
+    seq bigint not null,
+    status text not null default 'waiting' check (status in ('waiting', 'fulfilled')),
+    created_at timestamptz not null default now(),
+    fulfilled_at date,
+    record_id bigint references public.borrow_records (id),
+    unique (book_id, seq)
+);
+
+create unique index if not exists holds_waiting_book_id_student_id_idx
+    on public.holds (book_id, student_id)
+    where status = 'waiting';
+
+create or replace view public.hold_details
+with (security_invoker = true) as
+select h.id,
+       h.book_id,
+       h.student_id,
+       h.seq,
+       h.status,
+       h.created_at,
+       h.fulfilled_at,
+       h.record_id,
+       case when h.status = 'waiting' then h.seq - q.head_seq + 1 end as position
+  from public.holds h
+  join public.hold_queues q on q.book_id = h.book_id;
+
+create or replace function public.place_hold(
+    p_student_id bigint,
+    p_book_id bigint
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_available integer;
+    v_queue public.hold_queues;
+    v_hold public.holds;
+begin
+    if not exists (select 1 from public.students where id = p_student_id) then
+        return jsonb_build_object('success', false, 'error', 'Student does not exist.');
+    end if;
+
+    select available_copies into v_available
+      from public.books
+     where id = p_book_id
+       for update;
+
+    if not found then
+        return jsonb_build_object('success', false, 'error', 'Book does not exist.');
+    end if;
+
+    if v_available > 0 then
+        return jsonb_build_object(
+            'success', false, 'error', 'Copies are available; borrow the book instead.'
+        );
+    end if;
+
+    if exists (
+        select 1 from public.holds
+         where book_id = p_book_id and student_id = p_student_id and status = 'waiting'
+    ) then
+        return jsonb_build_object(
+            'success', false, 'error', 'Student already has a hold on this book.'
+        );
+    end if;
+
+    insert into public.hold_queues as q (book_id, next_seq)
+    values (p_book_id, 2)
+    on conflict (book_id) do update set next_seq = q.next_seq + 1
+    returning * into v_queue;
+
+    insert into public.holds (book_id, student_id, seq)
+    values (p_book_id, p_student_id, v_queue.next_seq - 1)
+    returning * into v_hold;
+
+    return jsonb_build_object(
+        'success', true,
+        'hold', to_jsonb(v_hold) || jsonb_build_object(
+            'position', v_hold.seq - v_queue.head_seq + 1
+        )
+    );
+end;
+$$;
+
+-- Issue one copy of p_book_id to the head of its queue. The caller has just
+-- restocked the book and holds its row lock. Returns null when nobody waits.
+create or replace function public.allocate_hold(
+    p_book_id bigint,
+    p_borrow_date date
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_hold public.holds;
+    v_record public.borrow_records;
+begin
+    select h.* into v_hold
+      from public.hold_queues q
+      join public.holds h on h.book_id = q.book_id and h.seq = q.head_seq
+     where q.book_id = p_book_id
+       and h.status = 'waiting'
+       for update of q, h;
+
+    if not found then
+        return null;
+    end if;
+
+    update public.books
+       set available_copies = available_copies - 1
+     where id = p_book_id
+       and available_copies > 0;
+
+    if not found then
+        return null;
+    end if;
+
+    insert into public.borrow_records (student_id, book_id, borrow_date, status)
+    values (v_hold.student_id, p_book_id, p_borrow_date, 'borrowed')
+    returning * into v_record;
+
+    update public.holds
+       set status = 'fulfilled',
+           fulfilled_at = p_borrow_date,
+           record_id = v_record.id
+     where id = v_hold.id
+    returning * into v_hold;
+
+    update public.hold_queues
+       set head_seq = v_hold.seq + 1
+     where book_id = p_book_id;
+
+    return to_jsonb(v_hold) || jsonb_build_object('position', null);
+end;
+$$;
+
+create or replace function public.return_book(
+    p_record_id bigint,
+    p_return_date date default current_date
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_record public.borrow_records;
+    v_hold jsonb;
+    v_result jsonb;
+begin
+    select * into v_record
+      from public.borrow_records
+     where id = p_record_id
+       for update;
+
+    if not found then
+        return jsonb_build_object('success', false, 'error', 'Record not found.');
+    end if;
+
+    if v_record.status = 'returned' then
+        return jsonb_build_object('success', false, 'error', 'Book already returned.');
+    end if;
+
+    -- This copy is allocated below with the return date; keep the trigger out.
+    perform set_config('library.restocking', 'on', true);
+    update public.books
+       set available_copies = least(available_copies + 1, total_copies)
+     where id = v_record.book_id;
+    perform set_config('library.restocking', 'off', true);
+
+    if not found then
+        return jsonb_build_object('success', false, 'error', 'Book does not exist.');
+    end if;
+
+    update public.borrow_records
+       set status = 'returned',
+           return_date = p_return_date
+     where id = p_record_id
+    returning * into v_record;
+
+    v_result := jsonb_build_object('success', true, 'record', to_jsonb(v_record));
+    v_hold := public.allocate_hold(v_record.book_id, p_return_date);
+    if v_hold is not null then
+        v_result := v_result || jsonb_build_object('hold', v_hold);
+    end if;
+    return v_result;
+end;
+$$;
+
+-- Serve waiting holds whenever a book's shelf count goes up outside
+-- return_book(). allocate_hold() lowers the count, which does not re-fire it.
+create or replace function public.books_serve_holds()
+returns trigger
+language plpgsql
+as $$
+begin
+    if current_setting('library.restocking', true) is distinct from 'on' then
+        for i in 1..new.available_copies loop
+            exit when public.allocate_hold(new.id, current_date) is null;
+        end loop;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists books_serve_holds on public.books;
+create trigger books_serve_holds
+    after update of available_copies on public.books
+    for each row
+    when (new.available_copies > old.available_copies)
+    execute function public.books_serve_holds();
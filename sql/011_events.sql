@@ -0,0 +1,110 @@
+-- Append-only change feed for books, students, borrows and returns.
+--
+-- Triggers append one row per change inside the same transaction, so an
+-- event exists exactly when its change committed. seq comes from an identity
+-- sequence, and concurrent transactions can commit out of seq order: a
+-- reader that saw seq 12 must not move past 11 while 11 is still in flight.
+-- Each event records the writing transaction id, and list_events() only
+-- returns events below the first one whose transaction may still be running
+-- (at or above the snapshot's xmin). Readers can therefore resume from the
+-- last seq they saw without skipping anything.
+
+create table if not exists public.events (
+    seq bigint generated always as identity primary key,
+    kind text not null,
+    record_id bigint,
+    book_id bigint,
+    student_id bigint,
+    occurred_at timestamptz not null default now(),
+    tx xid8 not null default pg_current_xact_id()
+);
+
+create index if not exists events_tx_idx on public.events (tx);
+
+create or replace function public.events_append()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_table_name = 'books' then
+        insert into public.events (kind, book_id) values ('book_added', new.id);
+    elsif tg_table_name = 'students' then
+        insert into public.events (kind, student_id) values ('student_added', new.id);
+    elsif tg_op = 'INSERT' then
+        insert into public.events (kind, record_id, book_id, student_id)
+        values ('borrowed', new.id, new.book_id, new.student_id);
+    else
+        insert into public.events (kind, record_id, book_id, student_id)
+        values ('returned', new.id, new.book_id, new.student_id);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists events_book_added on public.books;
+create trigger events_book_added
+    after insert on public.books
+    for each row execute function public.events_append();
+
+drop trigger if exists events_student_added on public.students;
+create trigger events_student_added
+    after insert on public.students
+    for each row execute function public.events_append();
+
+drop trigger if exists events_borrowed on public.borrow_records;
+create trigger events_borrowed
+    after insert on public.borrow_records
+    for each row execute function public.events_append();
+
+drop trigger if exists events_returned on public.borrow_records;
+create trigger events_returned
+    after update of status on public.borrow_records
+    for each row
+    when (new.status = 'returned' and old.status is distinct from 'returned')
+    execute function public.events_append();
+
+-- Up to p_limit events after p_since, or the latest p_limit when p_since is
+-- null, in seq order. The horizon is the first event whose transaction may
+-- still be in flight; nothing at or after it is returned yet.
+create or replace function public.list_events(
+    p_since bigint default null,
+    p_limit integer default 100
+) returns table (
+    seq bigint,
+    kind text,
+    record_id bigint,
+    book_id bigint,
+    student_id bigint,
+    occurred_at timestamptz
+)
+language plpgsql
+stable
+as $$
+declare
+    v_horizon bigint;
+begin
+    select min(e.seq) into v_horizon
+      from public.events e
+     where e.tx >= pg_snapshot_xmin(pg_current_snapshot());
+
+    if p_since is null then
+        return query
+        select t.* from (
+            select e.seq, e.kind, e.record_id, e.book_id, e.student_id, e.occurred_at
+              from public.events e
+             where v_horizon is null or e.seq < v_horizon
+             order by e.seq desc
+             limit p_limit
+        ) t
+        order by t.seq;
+    else
+        return query
+        select e.seq, e.kind, e.record_id, e.book_id, e.student_id, e.occurred_at
+          from public.events e
+         where e.seq > p_since
+           and (v_horizon is null or e.seq < v_horizon)
+         order by e.seq
+         limit p_limit;
+    end if;
+end;
+$$;